@@ -1,51 +1,325 @@
 import os
 import json
+import logging
 import sqlite3
 import cv2
 import numpy as np
 import tensorflow as tf
-import tensorflow_hub as hub
 import google.generativeai as genai
 import tempfile
-from dtw import dtw
+import queue
+import zlib
+import threading
+import time
+import contextvars
+import multiprocessing
+import uuid
+from contextlib import closing, nullcontext
+from functools import cached_property
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_EXCEPTION
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context, g
 from flask_cors import CORS
+import golden_format
+from golden_format import METRIC_NAMES, METRIC_COLUMNS, NUM_METRIC_COLUMNS
+from dtw_engine import dtw_distance_batch, dtw_lower_bound, envelope
+from result_cache import ResultCache, file_digest, make_key
+from plan_cache import PlanCache, canonical_nutrition_request, canonical_workout_request, make_plan_key
+from frame_sampler import AdaptiveFrameSampler, interpolate_keypoints
+from crop_tracker import CropTracker
+from progress import ProgressReporter
+from rep_segmentation import RepModel
+from live_session import LiveSession, LiveSessionLimit, LiveSessionStore
+from jobs import TERMINAL_STATUSES, JobManager, JobCancelled, JobQueueFull, exit_with_parent
+from model_bundle import (
+    VARIANTS as MOVENET_VARIANTS, TFLITE_FILE, TFLITE_PRECISIONS, BundleError, bundle_path, verify_bundle
+)
+from pose_backends import TFLiteBackend, TFSavedModelBackend
+from inference_service import InferenceService
+from llm_client import (
+    CircuitBreaker, GeminiBackend, LLMClient, LLMTimeout, LLMUnavailable, StubBackend
+)
+from upload_stream import PIPES_SUPPORTED, UploadSpool, discard_upload, growing_file_pipe, wait_for_upload
+from telemetry import MetricsRegistry, StageTimer, configure_logging, new_trace_id, set_trace_id, valid_trace_id
 
 # --- App Setup & Config ---
 load_dotenv()
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+# --- Logging Config ---
+# Log level (DEBUG also logs every 10th processed frame) and format:
+# 'text' lines or 'json' (one object per line, for log collectors).
+# Every record carries the trace ID of its request / analysis job.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+configure_logging(LOG_LEVEL, LOG_FORMAT)
+log = logging.getLogger("app")
+
+# --- Metrics (exported by GET /metrics) ---
+# Analyses run in job worker processes report their stage timings with
+# their last event, so they are recorded here in the web process
+metrics_registry = MetricsRegistry(prefix="jimbo_")
+http_requests = metrics_registry.counter(
+    "http_requests", "HTTP requests by route, method and status.", ("endpoint", "method", "status")
+)
+http_latency = metrics_registry.histogram(
+    "http_request_duration_seconds", "Time until the response headers (streamed bodies continue after).",
+    ("endpoint",)
+)
+analyses_finished = metrics_registry.counter(
+    "analyses", "Finished video analyses by outcome.", ("status", "cached")
+)
+analysis_stage_seconds = metrics_registry.histogram(
+    "analysis_stage_seconds",
+    "Time spent per video analysis stage (decode and inference overlap when pipelined).", ("stage",)
+)
+llm_calls = metrics_registry.counter("llm_calls", "LLM calls by endpoint.", ("endpoint",))
+llm_retries = metrics_registry.counter("llm_retries", "LLM call retries by endpoint.", ("endpoint",))
+llm_errors = metrics_registry.counter("llm_errors", "Failed LLM calls by endpoint and error.", ("endpoint", "error"))
+llm_latency = metrics_registry.histogram(
+    "llm_call_duration_seconds", "Duration of successful LLM calls, retries included.", ("endpoint",)
+)
+llm_first_chunk = metrics_registry.histogram(
+    "llm_first_chunk_seconds", "Time to the first chunk of streamed LLM calls.", ("endpoint",)
+)
+live_frames = metrics_registry.counter(
+    "live_frames", "Frames posted to live sessions, processed or dropped over the latency budget.", ("status",)
+)
+live_reps = metrics_registry.counter("live_reps", "Reps completed and scored in live sessions.")
+live_batch_seconds = metrics_registry.histogram(
+    "live_batch_duration_seconds", "Time to analyze one batch of frames posted to a live session."
+)
+
+def _observe_llm(endpoint, changes):
+    """LLMClient observer: mirror its per-endpoint counters in the metrics."""
+    for key, value in changes.items():
+        if key == 'calls':
+            llm_calls.inc(value, endpoint=endpoint)
+        elif key == 'retries':
+            llm_retries.inc(value, endpoint=endpoint)
+        elif key == 'error':
+            llm_errors.inc(endpoint=endpoint, error=value)
+        elif key == 'latency':
+            llm_latency.observe(value, endpoint=endpoint)
+        elif key == 'ttfb':
+            llm_first_chunk.observe(value, endpoint=endpoint)
+
 # --- Gemini API Configuration ---
+GEMINI_MODEL = 'gemini-2.5-flash-preview-09-2025'
 try:
     # Use GOOGLE_API_KEY for consistency with coach_app,
     # or fallback to GEMINI_API_KEY
     api_key = os.environ.get("GOOGLE_API_KEY") or os.environ["GEMINI_API_KEY"]
     genai.configure(api_key=api_key)
     
-    text_model = genai.GenerativeModel('gemini-2.5-flash-preview-09-2025')
+    text_model = genai.GenerativeModel(GEMINI_MODEL)
     json_model = genai.GenerativeModel(
-        'gemini-2.5-flash-preview-09-2025',
+        GEMINI_MODEL,
         generation_config={"response_mime_type": "application/json"}
     )
 except KeyError:
-    print("Error: GOOGLE_API_KEY or GEMINI_API_KEY environment variable not set.")
+    log.error("GOOGLE_API_KEY or GEMINI_API_KEY environment variable not set.")
     text_model = None
     json_model = None
 except Exception as e:
-    print(f"Error configuring Gemini: {e}")
+    log.error("Error configuring Gemini: %s", e)
     text_model = None
     json_model = None
 
+# --- LLM Client Config ---
+# 'gemini', or 'stub' to answer locally without an API key or network
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini").lower()
+# Deadline of one LLM call in seconds, retries included
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 60))
+# Retries of timeouts and transient errors (rate limits, 5xx)
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+# Most LLM calls in flight at once across all endpoints
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+# Consecutive failures that open the circuit breaker, and how long it
+# stays open before a trial call
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get("LLM_BREAKER_RESET_SECONDS", 30))
+# Stream the coach analysis to the client as it is generated
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") != "0"
+
+def _create_llm_client():
+    """Build the shared LLM client, or None if Gemini is not configured."""
+    if LLM_BACKEND == 'stub':
+        backend = StubBackend(
+            delay=float(os.environ.get("LLM_STUB_DELAY", 0)),
+            chunk_delay=float(os.environ.get("LLM_STUB_CHUNK_DELAY", 0))
+        )
+    elif text_model is not None and json_model is not None:
+        backend = GeminiBackend(text_model, json_model)
+    else:
+        return None
+    return LLMClient(
+        backend,
+        timeout=LLM_TIMEOUT_SECONDS,
+        max_retries=LLM_MAX_RETRIES,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS),
+        observer=_observe_llm,
+    )
+
+llm_client = _create_llm_client()
+
 # --- MoveNet Config & Model Loading (from coach_app) ---
 DB_NAME = "correct_movement.db"
-INPUT_SIZE = 256 # Thunder model uses 256x256
+# 'thunder' (256x256 input, most accurate; the golden data was recorded
+# with it) or 'lightning' (192x192, faster)
+MOVENET_VARIANT = os.environ.get("MOVENET_VARIANT", "thunder").lower()
+if MOVENET_VARIANT not in MOVENET_VARIANTS:
+    log.warning("Unknown MOVENET_VARIANT '%s'; using 'thunder'.", MOVENET_VARIANT)
+    MOVENET_VARIANT = "thunder"
+MOVENET_MODEL_URL, INPUT_SIZE = MOVENET_VARIANTS[MOVENET_VARIANT]
+# Local model bundles written by fetch_movenet_model.py; TF-Hub is only
+# used when there is no bundle for the variant (and MOVENET_ALLOW_HUB)
+MOVENET_MODEL_DIR = os.environ.get("MOVENET_MODEL_DIR", "models")
+MOVENET_ALLOW_HUB = os.environ.get("MOVENET_ALLOW_HUB", "1") != "0"
+# Start loading MoveNet in the background at start-up (0 = on first use)
+MOVENET_PRELOAD = os.environ.get("MOVENET_PRELOAD", "1") != "0"
+# Inference backend: 'tf' (SavedModel, TensorFlow runtime) or 'tflite'
+# (needs a TFLite bundle: fetch_movenet_model.py --tflite <precision>)
+MOVENET_BACKEND = os.environ.get("MOVENET_BACKEND", "tf").lower()
+if MOVENET_BACKEND not in ('tf', 'tflite'):
+    log.warning("Unknown MOVENET_BACKEND '%s'; using 'tf'.", MOVENET_BACKEND)
+    MOVENET_BACKEND = "tf"
+# TFLite model precision: 'float16' or 'int8' (quantized, fastest)
+MOVENET_TFLITE_PRECISION = os.environ.get("MOVENET_TFLITE_PRECISION", "float16").lower()
+if MOVENET_TFLITE_PRECISION not in TFLITE_PRECISIONS:
+    log.warning("Unknown MOVENET_TFLITE_PRECISION '%s'; using 'float16'.", MOVENET_TFLITE_PRECISION)
+    MOVENET_TFLITE_PRECISION = "float16"
+# Inference threads per process (0 = the runtime's default)
+MOVENET_NUM_THREADS = int(os.environ.get("MOVENET_NUM_THREADS", 0))
 MIN_CONFIDENCE = 0.3
 # --- OPTIMIZATION 1: PROCESS EVERY Nth FRAME ---
 # 1 = process every frame (slow)
 # 3 = process 1/3 of frames (much faster)
 FRAME_SKIP_RATE = 1 
+# --- OPTIMIZATION 2: BATCHED INFERENCE ---
+# Number of decoded frames sent through MoveNet in one call.
+# 1 = old one-frame-per-call behaviour
+INFERENCE_BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", 8))
+# --- OPTIMIZATION 3: PIPELINED DECODE / INFERENCE ---
+# Max decoded frames buffered between the decoder thread and inference.
+# Bounds memory on long uploads (each 1080p RGB frame is ~6 MB).
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", 32))
+# --- OPTIMIZATION 4: SHARDED DECODE / INFERENCE OF LONG VIDEOS ---
+# Videos longer than one shard are split into frame ranges processed by
+# this many worker processes, each with its own MoveNet (0 = off)
+VIDEO_SHARD_WORKERS = int(os.environ.get("VIDEO_SHARD_WORKERS", 0))
+VIDEO_SHARD_FRAMES = int(os.environ.get("VIDEO_SHARD_FRAMES", 600))
+# --- OPTIMIZATION 5: ADAPTIVE FRAME SAMPLING ---
+# Replaces FRAME_SKIP_RATE when on: aim for POSE_TARGET_FPS poses per
+# second, skip near-static frames, sample every frame during fast
+# movement, and interpolate keypoints for the skipped frames
+ADAPTIVE_SAMPLING = os.environ.get("ADAPTIVE_SAMPLING", "0") != "0"
+POSE_TARGET_FPS = float(os.environ.get("POSE_TARGET_FPS", 15))
+# Mean gray-level change (0-255) of a 64px thumbnail since the last
+# inferred frame: below MIN = static, at or above FAST = fast movement
+MOTION_MIN_THRESHOLD = float(os.environ.get("MOTION_MIN_THRESHOLD", 1.0))
+MOTION_FAST_THRESHOLD = float(os.environ.get("MOTION_FAST_THRESHOLD", 6.0))
+# --- OPTIMIZATION 6: REGION-OF-INTEREST CROPPING ---
+# Run MoveNet on a square crop around the lifter found in the previous
+# frames instead of the whole letterboxed frame; frames where the torso
+# is lost fall back to the full frame
+ROI_CROP = os.environ.get("ROI_CROP", "0") != "0"
+# Keypoint confidence needed to place (and keep) a crop
+ROI_MIN_SCORE = float(os.environ.get("ROI_MIN_SCORE", 0.2))
+# --- OPTIMIZATION 7: CROSS-REQUEST MICRO-BATCHING ---
+# Analyses running in this process send their frames to one shared
+# inference service, which runs them through MoveNet together in
+# batches of up to INFERENCE_MAX_BATCH frames, waiting at most
+# INFERENCE_MAX_WAIT_MS for other analyses to fill a batch (0 = off).
+# Only analyses in the same process share batches: a job worker runs one
+# upload at a time, so concurrent uploads are batched together only with
+# JOB_WORKERS=0 (the default)
+INFERENCE_SERVICE = os.environ.get("INFERENCE_SERVICE", "1") != "0"
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", 32))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get("INFERENCE_MAX_WAIT_MS", 5))
+
+# --- DTW Config ---
+# Window constraint for scoring DTW: unset = full DTW,
+# 'sakoechiba' = band around the diagonal, 'itakura' = parallelogram
+DTW_WINDOW = os.environ.get("DTW_WINDOW") or None
+# Sakoe-Chiba band half-width, as a fraction of the longer track
+DTW_BAND_FRACTION = float(os.environ.get("DTW_BAND_FRACTION", 0.1))
+# Skip / abandon DTW when a lower bound (LB_Keogh + LB_Kim) already
+# guarantees a Stability or Control score of 0. Off by default: tracks
+# are z-scored, so the bound rarely gets near the zero-score line
+# (see `benchmark.py lb-prefilter`) and computing it costs more than it saves
+DTW_LB_PREFILTER = os.environ.get("DTW_LB_PREFILTER", "0") == "1"
+
+# --- Result Cache Config ---
+# Bump when the scoring rules change so cached results are not reused
+SCORING_VERSION = "v5.1+reps"
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") != "0"
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(".cache", "analyze-form"))
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", 512))
+
+# --- Plan Cache Config ---
+# Generated workout / nutrition plans, reused for identical requests
+PLAN_CACHE_ENABLED = os.environ.get("PLAN_CACHE_ENABLED", "1") != "0"
+PLAN_CACHE_PATH = os.environ.get("PLAN_CACHE_PATH", os.path.join(".cache", "plans.sqlite3"))
+PLAN_CACHE_TTL_HOURS = float(os.environ.get("PLAN_CACHE_TTL_HOURS", 24 * 7))
+PLAN_CACHE_MAX_ENTRIES = int(os.environ.get("PLAN_CACHE_MAX_ENTRIES", 5000))
+
+# --- Job Queue Config ---
+# Video analyses run in this many worker processes. 0 (the default) runs
+# them inside the request, as before; /jobs needs at least 1
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 0))
+# Max analyses waiting for a worker before new ones are rejected
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 16))
+# How long finished jobs stay available through /jobs/<id>
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", 600))
+
+# --- Progress Config ---
+# Least time between two progress events while frames are analyzed
+PROGRESS_INTERVAL_SECONDS = float(os.environ.get("PROGRESS_INTERVAL_SECONDS", 0.5))
+# Cancel the analysis job of an /analyze-form request whose client
+# disconnects (jobs submitted through /jobs always run to the end;
+# analyses inside the request always stop with it)
+CANCEL_ON_DISCONNECT = os.environ.get("CANCEL_ON_DISCONNECT", "1") != "0"
+# Share of the progress bar covered by the pose stage
+POSE_PROGRESS_START, POSE_PROGRESS_END = 10, 60
+
+# --- Rep Segmentation Config ---
+# Moving-average window (frames) of the rep signal, and how far in from
+# the bottom / top of the golden clip's swing its thresholds sit
+REP_SMOOTH_FRAMES = int(os.environ.get("REP_SMOOTH_FRAMES", 7))
+REP_HYSTERESIS = float(os.environ.get("REP_HYSTERESIS", 0.3))
+# Shorter "reps" are jitter (scoring DTW also needs 10 valid frames)
+REP_MIN_FRAMES = int(os.environ.get("REP_MIN_FRAMES", 10))
+
+# --- Live Mode Config ---
+# Live sessions run MoveNet in the web process (loaded on the first
+# session when analyses otherwise run in job workers)
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", 4))
+# Sessions without a request for this long are closed
+LIVE_SESSION_IDLE_SECONDS = float(os.environ.get("LIVE_SESSION_IDLE_SECONDS", 60))
+# Latency budget of one posted batch: older frames beyond what fits at
+# the measured cost per frame are dropped (0 = never drop)
+LIVE_FRAME_BUDGET_MS = float(os.environ.get("LIVE_FRAME_BUDGET_MS", 150))
+# Most frames one request may post
+LIVE_MAX_BATCH_FRAMES = int(os.environ.get("LIVE_MAX_BATCH_FRAMES", 8))
+# Per-session memory: recent metric rows (running metrics), rows of the
+# rep in progress (longer reps are scored on their end) and rep results
+LIVE_MAX_FRAMES = int(os.environ.get("LIVE_MAX_FRAMES", 300))
+LIVE_MAX_REP_FRAMES = int(os.environ.get("LIVE_MAX_REP_FRAMES", 300))
+LIVE_MAX_REPS = int(os.environ.get("LIVE_MAX_REPS", 50))
+
+# --- Upload Config ---
+# Decode /analyze-form/stream uploads while they arrive (needs a container
+# readable front to back, e.g. faststart MP4 or WebM; others fall back
+# to decoding the complete file)
+STREAMING_UPLOAD = os.environ.get("STREAMING_UPLOAD", "1") != "0"
+# Where uploads are spooled (None = system temp dir); a tmpfs such as
+# /dev/shm keeps them in memory
+UPLOAD_SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR") or None
+# Give up on an upload that sends no data for this many seconds
+UPLOAD_IDLE_TIMEOUT = float(os.environ.get("UPLOAD_IDLE_TIMEOUT", 60))
 
 
 KEYPOINT_DICT = {
@@ -55,233 +329,1120 @@ KEYPOINT_DICT = {
     'left_knee': 13, 'right_knee': 14, 'left_ankle': 15, 'right_ankle': 16
 }
 
-METRIC_NAMES = [
-    'torso_angle', 'spine_curvature', 'armpit_angle',
-    'shoulder_vec_norm', 'elbow_vec_norm', 'hip_vec_norm', 'knee_vec_norm'
-]
+# Body-side joints used by the metrics, in the order they are gathered
+SIDE_JOINTS = ['shoulder', 'elbow', 'hip', 'knee', 'ankle']
+# Joints whose minimum confidence decides which body side is used
+SIDE_CONFIDENCE_JOINTS = ['shoulder', 'hip', 'knee', 'ankle']
 
-def load_movenet_model():
-    """Load MoveNet model once at startup."""
-    print("Loading MoveNet model...")
-    
-    # --- Using THUNDER MODEL per user request ---
-    model_url = "https://tfhub.dev/google/movenet/singlepose/thunder/4"
-    
+movenet_model = None
+# Where the model in this process came from and how long it took to load
+movenet_status = {
+    'state': 'not_loaded', 'variant': MOVENET_VARIANT, 'backend': MOVENET_BACKEND,
+    'source': None, 'load_seconds': None, 'error': None
+}
+_movenet_lock = threading.Lock()
+_movenet_ready = threading.Event()
+_movenet_thread = None
+# Shared micro-batching front of movenet_model (web process only)
+inference_service = None
+
+def _load_tflite_backend(num_threads):
+    """Load the verified TFLite bundle of MOVENET_VARIANT / MOVENET_TFLITE_PRECISION."""
+    path = bundle_path(MOVENET_MODEL_DIR, MOVENET_VARIANT, MOVENET_TFLITE_PRECISION)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(
+            f"No MoveNet TFLite bundle at {path}. "
+            f"Run fetch_movenet_model.py --tflite {MOVENET_TFLITE_PRECISION}."
+        )
+    verify_bundle(path, MOVENET_VARIANT, MOVENET_TFLITE_PRECISION)
+    return TFLiteBackend(os.path.join(path, TFLITE_FILE), num_threads, MOVENET_TFLITE_PRECISION), path
+
+def load_movenet_model(num_threads=None):
+    """Load the MoveNet pose backend, or return None on failure.
+
+    With MOVENET_BACKEND=tflite, loads the verified TFLite bundle.
+    Otherwise uses the verified local SavedModel bundle for
+    MOVENET_VARIANT when there is one, else downloads the model from
+    TF-Hub (if allowed). `num_threads` defaults to MOVENET_NUM_THREADS.
+    """
+    num_threads = num_threads or MOVENET_NUM_THREADS or None
+    log.info("Loading MoveNet '%s' model (%s backend)...", MOVENET_VARIANT, MOVENET_BACKEND)
+    started = time.perf_counter()
+    path = bundle_path(MOVENET_MODEL_DIR, MOVENET_VARIANT)
+    model, source, error = None, None, None
     try:
-        module = hub.load(model_url)
-        model = module.signatures['serving_default']
-        print("MoveNet 'Thunder' model loaded successfully.")
-        return model
+        if MOVENET_BACKEND == 'tflite':
+            model, source = _load_tflite_backend(num_threads)
+        elif os.path.isdir(path):
+            try:
+                verify_bundle(path, MOVENET_VARIANT)
+                model = tf.saved_model.load(path).signatures['serving_default']
+                source = path
+            except BundleError as e:
+                if not MOVENET_ALLOW_HUB:
+                    raise
+                log.error("%s Falling back to TF-Hub.", e)
+        elif not MOVENET_ALLOW_HUB:
+            raise FileNotFoundError(
+                f"No MoveNet bundle at {path} and MOVENET_ALLOW_HUB=0. Run fetch_movenet_model.py."
+            )
+        else:
+            log.warning("No MoveNet bundle at %s; loading from TF-Hub (run fetch_movenet_model.py to start offline).", path)
+
+        if model is None:
+            # Imported here: it adds about a second to start-up and a
+            # bundle does not need it
+            import tensorflow_hub as hub
+            module = hub.load(MOVENET_MODEL_URL)
+            model = module.signatures['serving_default']
+            source = MOVENET_MODEL_URL
+        if MOVENET_BACKEND == 'tf':
+            if num_threads:
+                try:
+                    tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+                except RuntimeError:
+                    pass  # TF already initialized
+            model = TFSavedModelBackend(model, INPUT_SIZE, num_threads)
+        log.info("MoveNet '%s' model loaded from %s in %.1fs.", MOVENET_VARIANT, source, time.perf_counter() - started)
     except Exception as e:
-        print(f"CRITICAL ERROR: Could not load MoveNet model: {e}")
-        return None
-
-# Load the model at global scope
-movenet_model = load_movenet_model()
+        log.critical("Could not load MoveNet model: %s", e)
+        model, error = None, str(e)
+
+    movenet_status.update({
+        'state': 'ready' if model is not None else 'error',
+        'source': source,
+        'num_threads': num_threads,
+        'load_seconds': round(time.perf_counter() - started, 3),
+        'error': error,
+    })
+    return model
+
+def _load_movenet_in_background():
+    global movenet_model, inference_service
+    model = load_movenet_model()
+    service = None
+    if model is not None and INFERENCE_SERVICE:
+        service = InferenceService(model, max_batch_size=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS)
+    with _movenet_lock:
+        movenet_model = model
+        inference_service = service
+    _movenet_ready.set()
+
+def start_movenet_loading():
+    """Start loading MoveNet in a background thread (once per process)."""
+    global _movenet_thread
+    with _movenet_lock:
+        if _movenet_thread is not None or movenet_model is not None:
+            return
+        movenet_status['state'] = 'loading'
+        _movenet_thread = threading.Thread(target=_load_movenet_in_background, name="movenet-load", daemon=True)
+        _movenet_thread.start()
+
+def wait_for_movenet(timeout=None):
+    """Load MoveNet if needed and wait for it. Returns the model or None."""
+    start_movenet_loading()
+    if movenet_model is None:
+        _movenet_ready.wait(timeout)
+    return movenet_model
+
+# Serve right away and load the model in the background, unless analyses
+# run in job workers (they load it in _init_analysis_worker). Worker
+# processes importing this module leave loading to their initializers.
+if JOB_WORKERS > 0:
+    log.info("MoveNet runs in %d job worker process(es); not loading it in the web process.", JOB_WORKERS)
+elif MOVENET_PRELOAD and multiprocessing.current_process().name == 'MainProcess':
+    start_movenet_loading()
 
 # --- Helper Functions (from coach_app) ---
 
 def run_inference(model, frame):
     """Run MoveNet inference on a frame."""
-    image_tensor = tf.convert_to_tensor(frame)
-    image_tensor = tf.expand_dims(image_tensor, axis=0)
-    image_tensor = tf.cast(image_tensor, dtype=tf.int32)
-    # Note: INPUT_SIZE is now 256 for Thunder model
-    resized_image = tf.image.resize_with_pad(image_tensor, INPUT_SIZE, INPUT_SIZE)
-    outputs = model(tf.cast(resized_image, dtype=tf.int32))
-    return outputs['output_0'].numpy()[0, 0]
-
-def calc_angle(A, B, C):
-    """Calculate angle ABC in degrees."""
-    A, B, C = np.array(A), np.array(B), np.array(C)
+    return model.infer_batch([frame])[0]
+
+def run_inference_batch(model, frames):
+    """Run MoveNet inference on a list of same-sized frames.
+
+    `model` is a pose backend (see pose_backends.py). Returns an array
+    of shape (len(frames), 17, 3), identical to calling run_inference
+    on each frame.
+    """
+    if not frames:
+        return np.zeros((0, 17, 3), dtype=np.float32)
+    return model.infer_batch(frames)
+
+def calc_angles(A, B, C):
+    """Calculate angles ABC in degrees for arrays of points (..., 2)."""
     BA = A - B
     BC = C - B
-    dot_product = np.dot(BA, BC)
-    mag_BA = np.linalg.norm(BA)
-    mag_BC = np.linalg.norm(BC)
-    if mag_BA == 0 or mag_BC == 0:
-        return 0.0
-    cosine_angle = np.clip(dot_product / (mag_BA * mag_BC), -1.0, 1.0)
-    return np.degrees(np.arccos(cosine_angle))
-
-def calc_distance(A, B):
-    """Compute Euclidean distance between two points."""
-    return np.linalg.norm(np.array(A) - np.array(B))
-
-def get_side_keypoints(kps, side_prefix):
-    """Extract keypoints of one body side (left or right)."""
+    dot_product = np.sum(BA * BC, axis=-1)
+    mag_BA = np.linalg.norm(BA, axis=-1)
+    mag_BC = np.linalg.norm(BC, axis=-1)
+    degenerate = (mag_BA == 0) | (mag_BC == 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine_angle = np.clip(dot_product / (mag_BA * mag_BC), -1.0, 1.0)
+    return np.where(degenerate, 0.0, np.degrees(np.arccos(cosine_angle))).astype(A.dtype)
+
+def compute_metrics_array(keypoints):
+    """Compute movement metrics for a whole clip at once.
+
+    Takes a (T, 17, 3) MoveNet keypoint array and returns a
+    (T, 11) float32 metrics array laid out as METRIC_COLUMNS, plus a
+    (T,) validity mask. Rows of frames below MIN_CONFIDENCE are NaN.
+    """
+    kps = np.asarray(keypoints, dtype=np.float32).reshape(-1, 17, 3)
     k = KEYPOINT_DICT
-    pts = {
-        'shoulder': kps[k[f'{side_prefix}_shoulder']],
-        'elbow':    kps[k[f'{side_prefix}_elbow']],
-        'wrist':    kps[k[f'{side_prefix}_wrist']],
-        'hip':      kps[k[f'{side_prefix}_hip']],
-        'knee':     kps[k[f'{side_prefix}_knee']],
-        'ankle':    kps[k[f'{side_prefix}_ankle']],
-    }
-    min_conf = min(
-        pts['shoulder'][2], pts['hip'][2], pts['knee'][2], pts['ankle'][2]
-    )
-    return pts, min_conf
 
-def normalize_vector(vec, scale):
-    """Normalize vector using scale factor."""
-    if scale == 0:
-        return [0.0, 0.0]
-    return (vec / scale).tolist()
+    left = kps[:, [k[f'left_{joint}'] for joint in SIDE_JOINTS]]
+    right = kps[:, [k[f'right_{joint}'] for joint in SIDE_JOINTS]]
+
+    conf_idx = [SIDE_JOINTS.index(joint) for joint in SIDE_CONFIDENCE_JOINTS]
+    conf_left = left[:, conf_idx, 2].min(axis=1)
+    conf_right = right[:, conf_idx, 2].min(axis=1)
+
+    # Use whichever side the model is more confident about
+    pts = np.where((conf_right > conf_left)[:, None, None], right, left)[..., :2]
+    valid = np.maximum(conf_left, conf_right) >= MIN_CONFIDENCE
+
+    p_s, p_e, p_h, p_k, p_a = (pts[:, i] for i in range(len(SIDE_JOINTS)))
+
+    torso_angle = calc_angles(p_s, p_h, p_k)
+    angle_hip_ankle = calc_angles(p_s, p_h, p_a)
+    spine_curvature = np.abs(angle_hip_ankle - torso_angle)
+    armpit_angle = calc_angles(p_e, p_s, p_h)
+
+    torso_length = np.maximum(np.linalg.norm(p_s - p_h, axis=-1), 0.01)[:, None]
+
+    metrics = np.empty((len(kps), NUM_METRIC_COLUMNS), dtype=np.float32)
+    metrics[:, METRIC_COLUMNS['torso_angle']] = torso_angle
+    metrics[:, METRIC_COLUMNS['spine_curvature']] = spine_curvature
+    metrics[:, METRIC_COLUMNS['armpit_angle']] = armpit_angle
+    metrics[:, METRIC_COLUMNS['shoulder_vec_norm']] = (p_s - p_h) / torso_length
+    metrics[:, METRIC_COLUMNS['elbow_vec_norm']] = (p_e - p_s) / torso_length
+    metrics[:, METRIC_COLUMNS['hip_vec_norm']] = (p_h - p_k) / torso_length
+    metrics[:, METRIC_COLUMNS['knee_vec_norm']] = (p_k - p_a) / torso_length
+    metrics[~valid] = np.nan
+
+    return metrics, valid
+
+def metrics_to_dict(metrics):
+    """Split a (T, 11) metrics array into per-metric column views."""
+    return {name: metrics[:, METRIC_COLUMNS[name]] for name in METRIC_NAMES}
+
+# Sentinel that marks the end of a pipeline queue
+_PIPELINE_END = object()
+
+def _queue_put(q, item, stop_event):
+    """Put an item on a bounded queue, giving up if the pipeline is stopping."""
+    while not stop_event.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _queue_get(q, stop_event):
+    """Get an item from a queue, returning _PIPELINE_END if the pipeline is stopping."""
+    while not stop_event.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _PIPELINE_END
+
+def _open_video_at(video_path, start_frame):
+    """Open a video positioned at `start_frame`, or return None.
+
+    Seeks with CAP_PROP_POS_FRAMES; if the backend does not land exactly
+    on the frame, falls back to reading up to it from the start.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return None
+    if start_frame <= 0:
+        return cap
 
-def process_video_to_metrics(model, video_path):
-    """Process video and compute normalized movement metrics."""
-    print(f"Processing video: {os.path.basename(video_path)}...")
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start_frame:
+        return cap
 
+    log.warning("Inexact seek to frame %d in %s; reading up to it instead.", start_frame, os.path.basename(video_path))
+    cap.release()
     cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"ERROR: Cannot open video {video_path}")
+    for _ in range(start_frame):
+        if not cap.grab():
+            break
+    return cap
+
+def make_frame_sampler(video_path=None, source_fps=None):
+    """Return an AdaptiveFrameSampler for a video, or None when disabled."""
+    if not ADAPTIVE_SAMPLING:
         return None
+    if source_fps is None:
+        cap = cv2.VideoCapture(video_path)
+        source_fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+        cap.release()
+    return AdaptiveFrameSampler(
+        source_fps, POSE_TARGET_FPS, min_motion=MOTION_MIN_THRESHOLD, fast_motion=MOTION_FAST_THRESHOLD
+    )
 
-    all_frame_metrics = []
-    frame_count = 0
-    processed_frame_count = 0 
+def extract_keypoints(model, video_path, batch_size=None, stats=None, cancelled=None,
+                      start_frame=0, end_frame=None, progress=None):
+    """Decode a video and run MoveNet on every sampled frame.
+
+    Returns a (T, 17, 3) keypoint array, or None if the video cannot be
+    opened. With adaptive sampling, T is the number of decoded frames
+    and skipped frames are interpolated; otherwise T is the number of
+    frames kept by FRAME_SKIP_RATE. See extract_keypoint_samples for
+    the other arguments.
+    """
+    samples = extract_keypoint_samples(
+        model, video_path, batch_size=batch_size, stats=stats, cancelled=cancelled,
+        start_frame=start_frame, end_frame=end_frame, progress=progress
+    )
+    if samples is None:
+        return None
+    return keypoints_from_samples(*samples)
+
+def keypoints_from_samples(frame_indices, keypoints, first_frame, n_frames):
+    """Turn extract_keypoint_samples output into per-frame keypoints."""
+    if not ADAPTIVE_SAMPLING:
+        return keypoints
+    return interpolate_keypoints(frame_indices, keypoints, n_frames, first_frame=first_frame)
+
+def video_frame_count(cap, start_frame=0, end_frame=None):
+    """Frames in [start_frame, end_frame) per the container, or None if unknown."""
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total <= 0:
+        return None
+    if end_frame is not None:
+        total = min(total, end_frame)
+    return max(total - start_frame, 0)
+
+def extract_keypoint_samples(model, video_path, batch_size=None, stats=None, cancelled=None,
+                             start_frame=0, end_frame=None, progress=None):
+    """Decode a video and run MoveNet on the frames the sampler picks.
+
+    Runs as a two-stage pipeline: a decoder thread feeds (index, RGB
+    frame) pairs into a bounded queue while the calling thread runs batched MoveNet
+    inference. Frames are picked by the adaptive sampler when enabled,
+    else every FRAME_SKIP_RATE-th frame. Returns (frame_indices,
+    keypoints, start_frame, n_frames_decoded), with keypoints of shape
+    (len(frame_indices), 17, 3), or None if the video cannot be opened.
+    If `stats` is a dict it is filled with per-stage timings. If
+    `cancelled()` turns true, JobCancelled is raised after the current
+    batch. `progress(frames_done, frames_total)` is called after every
+    batch with the frames of the range read so far and the range's
+    frame count (None if the container does not say).
+
+    `start_frame`/`end_frame` restrict decoding to the frame range
+    [start_frame, end_frame) (end_frame None = to the end of the file).
+    Frames are sampled by their index in the whole video, so the shards
+    of a video give the same keypoints as one sequential pass.
+    """
+    log.info("Processing video: %s...", os.path.basename(video_path))
+
+    if batch_size is None:
+        batch_size = INFERENCE_BATCH_SIZE
+    batch_size = max(1, int(batch_size))
+
+    cap = _open_video_at(video_path, start_frame)
+    if cap is None:
+        log.error("Cannot open video %s", video_path)
+        return None
+
+    sampler = make_frame_sampler(source_fps=cap.get(cv2.CAP_PROP_FPS))
+    frames_total = video_frame_count(cap, start_frame, end_frame) if progress is not None else None
+    # With ROI cropping the decoder hands over BGR frames and only the
+    # crops are converted, at inference time
+    tracker = CropTracker(INPUT_SIZE, min_score=ROI_MIN_SCORE) if ROI_CROP else None
+    keypoint_batches = []
+    frame_indices = []
+    counts = {'frames': 0, 'processed': 0}
+    timings = {'decode': 0.0, 'inference': 0.0}
+
+    frame_queue = queue.Queue(maxsize=max(1, PIPELINE_QUEUE_SIZE))
+    stop_event = threading.Event()
+    errors = []
+
+    def decode_stage():
+        try:
+            while not stop_event.is_set():
+                if end_frame is not None and start_frame + counts['frames'] >= end_frame:
+                    break
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                counts['frames'] += 1
+                frame_count = start_frame + counts['frames']
+                if sampler is not None:
+                    keep = sampler.should_sample(frame_count - 1, frame)
+                else:
+                    keep = frame_count % FRAME_SKIP_RATE == 0
+                if not keep:
+                    timings['decode'] += time.perf_counter() - started
+                    continue
+
+                if tracker is None:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                timings['decode'] += time.perf_counter() - started
+
+                if not _queue_put(frame_queue, (frame_count - 1, frame), stop_event):
+                    break
+                counts['processed'] += 1
+                if counts['processed'] % 10 == 0:
+                    log.debug("Processing frame %d (processed %d)", frame_count, counts['processed'])
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _queue_put(frame_queue, _PIPELINE_END, stop_event)
+
+    decoder = threading.Thread(target=decode_stage, name="video-decode", daemon=True)
+    wall_started = time.perf_counter()
+    decoder.start()
 
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-            if frame_count % FRAME_SKIP_RATE != 0:
-                continue
-                
-            processed_frame_count += 1
-            
-            if processed_frame_count % 10 == 0:
-                print(f"--- Processing frame {frame_count} (processed {processed_frame_count}) ---", flush=True)
+        done = False
+        while not done:
+            indices = []
+            frames = []
+            while len(frames) < batch_size:
+                item = _queue_get(frame_queue, stop_event)
+                if item is _PIPELINE_END:
+                    done = True
+                    break
+                indices.append(item[0])
+                frames.append(item[1])
+
+            if cancelled is not None and cancelled():
+                raise JobCancelled()
+            if frames:
+                started = time.perf_counter()
+                if tracker is not None:
+                    keypoint_batches.append(tracker.track(frames, lambda crops: run_inference_batch(model, crops)))
+                else:
+                    keypoint_batches.append(run_inference_batch(model, frames))
+                timings['inference'] += time.perf_counter() - started
+                # Indices are recorded only for frames that reached inference
+                frame_indices.extend(indices)
+                if progress is not None:
+                    progress(int(frame_indices[-1]) + 1 - start_frame, frames_total)
+    except Exception as e:
+        errors.append(e)
+        stop_event.set()
+    finally:
+        stop_event.set()
+        decoder.join()
+        cap.release()
+        wall_seconds = time.perf_counter() - wall_started
+        log.info("Analyzed %d frames out of %d total.", counts['processed'], counts['frames'])
+        log.info(
+            "Pipeline timings: decode %.2fs, inference %.2fs, wall %.2fs",
+            timings['decode'], timings['inference'], wall_seconds
+        )
+        if tracker is not None:
+            log.info(
+                "ROI cropping: %d cropped, %d full frame, %d fell back to the full frame",
+                tracker.cropped, tracker.full_frame, tracker.fallbacks
+            )
+        if stats is not None:
+            stats.update({
+                'frames_decoded': counts['frames'],
+                'frames_processed': counts['processed'],
+                'decode_seconds': timings['decode'],
+                'inference_seconds': timings['inference'],
+                'wall_seconds': wall_seconds,
+                'fps': counts['processed'] / wall_seconds if wall_seconds > 0 else 0.0,
+            })
+            if tracker is not None:
+                stats.update({
+                    'roi_cropped': tracker.cropped,
+                    'roi_full_frame': tracker.full_frame,
+                    'roi_fallbacks': tracker.fallbacks,
+                })
+
+    if errors:
+        raise errors[0]
+
+    if keypoint_batches:
+        keypoints = np.concatenate(keypoint_batches)
+    else:
+        keypoints = np.zeros((0, 17, 3), dtype=np.float32)
+    return np.asarray(frame_indices), keypoints, start_frame, counts['frames']
 
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+def process_video_to_metrics(model, video_path, batch_size=None, stats=None, cancelled=None, progress=None):
+    """Process video and compute normalized movement metrics.
 
-            keypoints_17 = run_inference(model, rgb_frame)
+    Returns (metrics, valid): a (T, 11) float32 array laid out as
+    METRIC_COLUMNS and a (T,) validity mask, or None on failure.
+    `cancelled` and `progress` are as for extract_keypoint_samples.
+    """
+    keypoints = extract_keypoints(
+        model, video_path, batch_size=batch_size, stats=stats, cancelled=cancelled, progress=progress
+    )
+    if keypoints is None:
+        return None
+    return keypoints_to_metrics(keypoints, stats=stats)
+
+def keypoints_to_metrics(keypoints, stats=None):
+    """Compute (metrics, valid) from (T, 17, 3) keypoints."""
+    started = time.perf_counter()
+    metrics, valid = compute_metrics_array(keypoints)
+    metrics_seconds = time.perf_counter() - started
+    log.info("Extracted %d valid frames of %d in %.1fms.", int(valid.sum()), len(valid), metrics_seconds * 1000)
+    if stats is not None:
+        stats['metrics_seconds'] = metrics_seconds
+
+    return metrics, valid
+
+# --- Sharded Video Processing ---
+
+_shard_pool = None
+_shard_pool_lock = threading.Lock()
+
+def _init_shard_worker():
+    """Shard worker start-up: load MoveNet once per worker process."""
+    global movenet_model
+    exit_with_parent()
+    # Split the cores between shard workers instead of each runtime
+    # claiming all of them
+    if movenet_model is None:
+        movenet_model = load_movenet_model(
+            MOVENET_NUM_THREADS or max(1, (os.cpu_count() or 1) // max(1, VIDEO_SHARD_WORKERS))
+        )
 
-            pts_left, conf_left = get_side_keypoints(keypoints_17, 'left')
-            pts_right, conf_right = get_side_keypoints(keypoints_17, 'right')
+def _extract_shard(video_path, start_frame, end_frame):
+    """Shard worker task: keypoint samples and stats of one frame range."""
+    if movenet_model is None:
+        raise RuntimeError("MoveNet model is not loaded in the shard worker.")
+    stats = {}
+    samples = extract_keypoint_samples(
+        movenet_model, video_path, stats=stats, start_frame=start_frame, end_frame=end_frame
+    )
+    if samples is None:
+        raise RuntimeError(f"Cannot open video {video_path} in the shard worker.")
+    return samples, stats
+
+def _get_shard_pool():
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            _shard_pool = ProcessPoolExecutor(
+                max_workers=VIDEO_SHARD_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_shard_worker
+            )
+        return _shard_pool
 
-            pts = pts_right if conf_right > conf_left else pts_left
+def video_shards(video_path, shard_frames=None):
+    """Split a video into [(start_frame, end_frame), ...] ranges.
 
-            if max(conf_left, conf_right) < MIN_CONFIDENCE:
-                all_frame_metrics.append(None)
-                continue
+    The last range is open-ended (end_frame None) so frames beyond an
+    underestimated CAP_PROP_FRAME_COUNT are still read. With adaptive
+    sampling, shards start on the sampler's anchor grid so they pick
+    the same frames as a sequential pass.
+    """
+    if shard_frames is None:
+        shard_frames = VIDEO_SHARD_FRAMES
+    shard_frames = max(1, int(shard_frames))
 
-            p_s = pts['shoulder'][:2]
-            p_e = pts['elbow'][:2]
-            p_h = pts['hip'][:2]
-            p_k = pts['knee'][:2]
-            p_a = pts['ankle'][:2]
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    source_fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0
+    cap.release()
 
-            try:
-                torso_angle = calc_angle(p_s, p_h, p_k)
-                angle_hip_ankle = calc_angle(p_s, p_h, p_a)
-                
-                spine_curvature = abs(angle_hip_ankle - torso_angle)
-                armpit_angle = calc_angle(p_e, p_s, p_h)
-
-                torso_length = np.linalg.norm(p_s - p_h)
-                if torso_length < 0.01:
-                    torso_length = 0.01
-
-                shoulder_vec_norm = normalize_vector(p_s - p_h, torso_length)
-                elbow_vec_norm = normalize_vector(p_e - p_s, torso_length)
-                hip_vec_norm = normalize_vector(p_h - p_k, torso_length)
-                knee_vec_norm = normalize_vector(p_k - p_a, torso_length)
-
-                frame_metrics = [
-                    float(torso_angle),
-                    float(spine_curvature),
-                    float(armpit_angle),
-                    shoulder_vec_norm,
-                    elbow_vec_norm,
-                    hip_vec_norm,
-                    knee_vec_norm
-                ]
-                all_frame_metrics.append(frame_metrics)
+    sampler = make_frame_sampler(source_fps=source_fps)
+    if sampler is not None:
+        anchor = sampler.anchor_interval
+        shard_frames = -(-shard_frames // anchor) * anchor
 
-            except Exception as e:
-                print(f"--- Error processing frame {frame_count}: {e} ---", flush=True)
-                all_frame_metrics.append(None)
-    
-    finally:
+    starts = list(range(0, max(total_frames, 1), shard_frames))
+    return [(start, start + shard_frames) for start in starts[:-1]] + [(starts[-1], None)]
+
+def extract_keypoints_sharded(video_path, shard_frames=None, stats=None, cancelled=None, progress=None):
+    """Like extract_keypoints, but spread over the shard worker pool.
+
+    Each shard is decoded and run through MoveNet in its own worker
+    process; the keypoint samples are stitched back in frame order, so
+    the result is identical to a sequential extract_keypoints call.
+    `progress` is called as each shard finishes.
+    """
+    shards = video_shards(video_path, shard_frames)
+    log.info("Processing video: %s in %d shards...", os.path.basename(video_path), len(shards))
+    wall_started = time.perf_counter()
+
+    frames_total = None
+    if progress is not None:
+        cap = cv2.VideoCapture(video_path)
+        frames_total = video_frame_count(cap) if cap.isOpened() else None
         cap.release()
-        print(f"Analyzed {processed_frame_count} frames out of {frame_count} total. Extracted {len(all_frame_metrics)} valid sequences.")
+    frames_done = 0
+
+    pool = _get_shard_pool()
+    futures = [pool.submit(_extract_shard, video_path, start, end) for start, end in shards]
+    try:
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_EXCEPTION)
+            if any(f.exception() is not None for f in done):
+                break
+            if cancelled is not None and cancelled():
+                raise JobCancelled()
+            if progress is not None and done:
+                frames_done += sum(f.result()[1]['frames_decoded'] for f in done)
+                progress(frames_done, frames_total)
+        results = [f.result() for f in futures]
+    finally:
+        for f in futures:
+            f.cancel()
+
+    wall_seconds = time.perf_counter() - wall_started
+    shard_samples = [samples for samples, _ in results]
+    shard_stats = [st for _, st in results]
+    frames_processed = sum(st['frames_processed'] for st in shard_stats)
+    log.info("Sharded pipeline: %d shards, %d frames, wall %.2fs", len(shards), frames_processed, wall_seconds)
+    if stats is not None:
+        stats.update({
+            'shards': len(shards),
+            'frames_decoded': sum(st['frames_decoded'] for st in shard_stats),
+            'frames_processed': frames_processed,
+            'decode_seconds': sum(st['decode_seconds'] for st in shard_stats),
+            'inference_seconds': sum(st['inference_seconds'] for st in shard_stats),
+            'wall_seconds': wall_seconds,
+            'fps': frames_processed / wall_seconds if wall_seconds > 0 else 0.0,
+        })
+
+    # Stitch the samples first, so frames skipped at the end of a shard
+    # are interpolated towards the next shard's first sample
+    return keypoints_from_samples(
+        np.concatenate([indices for indices, _, _, _ in shard_samples]),
+        np.concatenate([keypoints for _, keypoints, _, _ in shard_samples]),
+        0,
+        sum(n_frames for _, _, _, n_frames in shard_samples)
+    )
+
+def _pose_session():
+    """Context manager yielding the model an analysis should run frames through.
+
+    That is the shared inference service when there is one (registering
+    the analysis with it for the duration), else movenet_model itself.
+    """
+    if inference_service is None:
+        return nullcontext(movenet_model)
+    return inference_service.session()
+
+def extract_video_keypoints(video_path, stats=None, cancelled=None, progress=None):
+    """Extract keypoints with the shard pool when enabled and worthwhile."""
+    if VIDEO_SHARD_WORKERS > 0 and len(video_shards(video_path)) > 1:
+        return extract_keypoints_sharded(video_path, stats=stats, cancelled=cancelled, progress=progress)
+    if not movenet_model:
+        raise Exception("MoveNet model is not loaded. Cannot process video.")
+    with _pose_session() as model:
+        return extract_keypoints(model, video_path, stats=stats, cancelled=cancelled, progress=progress)
+
+def extract_streaming_keypoints(spool_path, stats=None, cancelled=None, progress=None):
+    """Extract keypoints from an upload that may still be arriving.
+
+    Decodes the growing spool file through a pipe, so inference overlaps
+    the upload. If the pipe cannot be decoded, waits for the upload to
+    finish and decodes the complete (seekable) file instead. Without
+    named pipes (non-POSIX), the complete file is always decoded once the
+    upload ends. Raises UploadAborted if the upload never completes.
+    """
+    if not movenet_model:
+        raise Exception("MoveNet model is not loaded. Cannot process video.")
+    if not PIPES_SUPPORTED:
+        wait_for_upload(spool_path, idle_timeout=UPLOAD_IDLE_TIMEOUT)
+        return extract_video_keypoints(spool_path, stats=stats, cancelled=cancelled)
+    with growing_file_pipe(spool_path, idle_timeout=UPLOAD_IDLE_TIMEOUT) as pipe_path, _pose_session() as model:
+        keypoints = extract_keypoints(model, pipe_path, stats=stats, cancelled=cancelled, progress=progress)
+    # A truncated upload also ends the pipe early, so this check is needed
+    # even when decoding succeeded
+    wait_for_upload(spool_path, idle_timeout=UPLOAD_IDLE_TIMEOUT)
+    if keypoints is None or len(keypoints) == 0:
+        log.warning("Streaming decode failed; decoding the complete upload instead.")
+        return extract_video_keypoints(spool_path, stats=stats, cancelled=cancelled, progress=progress)
+    return keypoints
+
+# --- Golden Sequence Store ---
+
+class GoldenSequence(dict):
+    """Preparsed golden-standard metrics for one exercise.
+
+    Behaves like the old {metric_name: track} dict (tracks are column
+    views of a (T, 11) float32 array with NaN rows for invalid frames)
+    and also carries the validity mask and precomputed z-score data.
+    """
+
+    def __init__(self, exercise_name, metrics, fingerprint):
+        super().__init__(metrics_to_dict(metrics))
+        self.exercise_name = exercise_name
+        self.metrics = metrics
+        self.valid = ~np.isnan(metrics).any(axis=1)
+        self.fingerprint = fingerprint
+        # Z-scored valid frames of each metric, ready for DTW, and their
+        # global LB_Keogh envelopes (valid for any DTW window). Envelopes
+        # are not stored in the database: the global one is a min/max over
+        # the track, and banded ones depend on the upload's length.
+        self.zscored = {}
+        self.zscore_stats = {}
+        self.envelopes = {}
+        for name in METRIC_NAMES:
+            track = valid_track(self[name])
+            if len(track) == 0:
+                continue
+            mean = np.mean(track, axis=0)
+            std = np.std(track, axis=0)
+            self.zscored[name] = normalize_sequence_zscore(track)
+            self.zscore_stats[name] = (mean, std)
+            self.envelopes[name] = envelope(self.zscored[name])
+        # Sakoe-Chiba envelopes, computed on first use per band radius
+        self._banded_envelopes = {}
+
+    @cached_property
+    def rep_model(self):
+        """RepModel of this clip (None if it has too few valid frames)."""
+        return RepModel.fit(self, REP_HYSTERESIS, REP_SMOOTH_FRAMES, REP_MIN_FRAMES)
+
+    @cached_property
+    def rep_template(self):
+        """GoldenSequence of the golden rep template that single reps are scored against."""
+        if self.rep_model is None:
+            return self
+        start, end = self.rep_model.template
+        return GoldenSequence(self.exercise_name, self.metrics[start:end], self.fingerprint)
+
+    def envelope(self, name, radius=None):
+        """Return the LB_Keogh envelope of a z-scored golden metric."""
+        if radius is None:
+            return self.envelopes[name]
+        key = (name, radius)
+        if key not in self._banded_envelopes:
+            if len(self._banded_envelopes) >= 64:
+                self._banded_envelopes.clear()
+            self._banded_envelopes[key] = envelope(self.zscored[name], radius)
+        return self._banded_envelopes[key]
+
+class GoldenStore:
+    """In-memory cache of every golden sequence in the database.
+
+    Rows are parsed once into NumPy arrays. Lookups are served from
+    memory; when the DB file's mtime changes, only rows whose content
+    changed are loaded again. Binary GoldenSequencesBinary rows are
+    read zero-copy; exercises without one fall back to the JSON table.
+    """
 
-    return all_frame_metrics
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._sequences = {}
+        self._exercise_names = []
+        self._mtime = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.rows_parsed = 0
+
+    def _db_mtime(self):
+        try:
+            return os.stat(self.db_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_if_changed(self):
+        mtime = self._db_mtime()
+        if mtime is not None and mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime is not None and mtime == self._mtime:
+                return
+            self._reload(mtime)
+
+    def _reload(self, mtime):
+        if mtime is None:
+            log.error("Golden store: database file '%s' not found.", self.db_path)
+            self._sequences = {}
+            self._exercise_names = []
+            self._mtime = None
+            return
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            sequences, parsed = self._load_binary_rows(conn)
+            json_parsed = self._load_json_rows(conn, sequences)
+        finally:
+            conn.close()
+
+        self._sequences = sequences
+        self._exercise_names = sorted(sequences)
+        self._mtime = mtime
+        self.reloads += 1
+        self.rows_parsed += parsed + json_parsed
+        log.info(
+            "Golden store: loaded %d exercises (%d binary, %d JSON rows parsed) from %s.",
+            len(sequences), parsed, json_parsed, self.db_path
+        )
+
+    def _load_binary_rows(self, conn):
+        """Load changed GoldenSequencesBinary rows.
+
+        A binary row is only used while its source_checksum matches the
+        current JSON row; stale rows are skipped (with a warning) so the
+        JSON row is loaded instead.
+        """
+        sequences = {}
+        parsed = 0
+        if not golden_format.has_binary_table(conn):
+            return sequences, parsed
+
+        table = golden_format.BINARY_TABLE
+        if not golden_format.has_source_checksums(conn):
+            print(f"Golden store: {table} predates source checksums, using JSON; run migrate_golden_db.py.")
+            return sequences, parsed
+
+        stale = []
+        rows = conn.execute(
+            f"SELECT b.exercise_name, b.checksum, b.source_checksum, g.metric_names, g.metric_data "
+            f"FROM {table} b LEFT JOIN GoldenSequences g ON g.exercise_name = b.exercise_name"
+        )
+        for exercise_name, checksum, source_checksum, metric_names_json, metric_data_json in rows:
+            if (metric_names_json is None or metric_data_json is None or
+                    source_checksum != golden_format.json_row_checksum(metric_names_json, metric_data_json)):
+                stale.append(exercise_name)
+                continue
+            fingerprint = ('binary', checksum)
+            cached = self._sequences.get(exercise_name)
+            if cached is not None and cached.fingerprint == fingerprint:
+                sequences[exercise_name] = cached
+                continue
+
+            row = conn.execute(
+                f"SELECT metric_layout, n_frames, n_columns, dtype, data FROM {table} WHERE exercise_name = ?",
+                (exercise_name,)
+            ).fetchone()
+            metric_layout, n_frames, n_columns, dtype, data = row
+            if not golden_format.layout_matches(metric_layout):
+                log.warning("Golden store: binary layout mismatch for '%s', using JSON.", exercise_name)
+                continue
+            metrics = golden_format.decode_metrics(data, n_frames, n_columns, dtype)
+            sequences[exercise_name] = GoldenSequence(exercise_name, metrics, fingerprint)
+            parsed += 1
+
+        if stale:
+            print(
+                f"Golden store: {len(stale)} binary rows do not match their JSON rows "
+                f"({', '.join(sorted(stale))}), using JSON; run migrate_golden_db.py."
+            )
+        return sequences, parsed
+
+    def _load_json_rows(self, conn, sequences):
+        """Load changed JSON rows for exercises without a binary row."""
+        names = [
+            row[0] for row in conn.execute("SELECT exercise_name FROM GoldenSequences")
+            if row[0] not in sequences
+        ]
+        parsed = 0
+        for exercise_name in names:
+            metric_names_json, metric_data_json = conn.execute(
+                "SELECT metric_names, metric_data FROM GoldenSequences WHERE exercise_name = ?",
+                (exercise_name,)
+            ).fetchone()
+            fingerprint = ('json', golden_format.json_row_checksum(metric_names_json, metric_data_json))
+            cached = self._sequences.get(exercise_name)
+            if cached is not None and cached.fingerprint == fingerprint:
+                sequences[exercise_name] = cached
+                continue
+            metrics = golden_format.parse_json_row(metric_names_json, metric_data_json)
+            sequences[exercise_name] = GoldenSequence(exercise_name, metrics, fingerprint)
+            parsed += 1
+
+        return parsed
+
+    def get(self, exercise_name):
+        """Return the GoldenSequence for an exercise, or None."""
+        reloads = self.reloads
+        self._refresh_if_changed()
+        sequence = self._sequences.get(exercise_name)
+        # Counted under the lock: concurrent requests share the store
+        with self._lock:
+            if sequence is None or self.reloads != reloads:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return sequence
+
+    def exercise_names(self):
+        """Return all exercise names, sorted."""
+        self._refresh_if_changed()
+        return list(self._exercise_names)
+
+    def stats(self):
+        """Return cache counters."""
+        with self._lock:
+            return {
+                'exercises': len(self._sequences),
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'rows_parsed': self.rows_parsed,
+            }
+
+golden_store = GoldenStore(DB_NAME)
 
 def get_available_exercises():
     """Load list of available exercises from database."""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("SELECT exercise_name FROM GoldenSequences ORDER BY exercise_name ASC")
-        exercises = [row[0] for row in cursor.fetchall()]
-        conn.close()
-        return exercises
+        return golden_store.exercise_names()
     except Exception as e:
-        print(f"Database read error: {e}")
+        log.error("Database read error: %s", e)
         return []
 
 def get_golden_data(exercise_name):
-    """Retrieve processed golden-standard metrics from database."""
+    """Retrieve processed golden-standard metrics (served from memory)."""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT metric_names, metric_data FROM GoldenSequences WHERE exercise_name = ?",
-            (exercise_name,)
-        )
-        row = cursor.fetchone()
-        conn.close()
+        sequence = golden_store.get(exercise_name)
     except Exception as e:
-        print(f"Error reading from DB {DB_NAME}: {e}")
+        log.error("Error reading from DB %s: %s", DB_NAME, e)
         return {}
 
-    if row:
-        metric_names = json.loads(row[0])
-        metric_data = json.loads(row[1])
-
-        golden_metrics_dict = {}
-        for i, name in enumerate(metric_names):
-            golden_metrics_dict[name] = [
-                frame[i] if frame is not None else None
-                for frame in metric_data
-            ]
-        return golden_metrics_dict
-
-    return {}
+    return sequence if sequence is not None else {}
 
 def normalize_sequence_zscore(track_data):
     """Z-score normalize a metric sequence."""
     track_np = np.array(track_data)
     mean = np.mean(track_np, axis=0)
     std = np.std(track_np, axis=0)
-    std[std == 0] = 1
+    std = np.where(std == 0, 1, std)
     return (track_np - mean) / std
 
-def calculate_dtw_error(golden_track, user_track):
-    """Compute DTW error between two sequences."""
-    g_track = [t for t in golden_track if t is not None]
-    u_track = [t for t in user_track if t is not None]
+def valid_track(track):
+    """Return the valid frames of a metric track as a float64 array.
 
-    if len(g_track) < 10 or len(u_track) < 10:
-        return 0.0
+    Accepts either an array with NaN rows for invalid frames or
+    a list with None for invalid frames.
+    """
+    if isinstance(track, np.ndarray):
+        rows = track.reshape(len(track), -1)
+        return track[~np.isnan(rows).any(axis=1)].astype(np.float64)
+    return np.array([t for t in track if t is not None], dtype=np.float64)
 
-    try:
-        norm_golden = normalize_sequence_zscore(g_track)
-        norm_user = normalize_sequence_zscore(u_track)
-        alignment = dtw(norm_golden, norm_user, keep_internals=True)
-        return alignment.normalizedDistance
-    except Exception as e:
-        print(f"DTW calculation error: {e}")
-        return 0.0
+def dtw_window_size(n, m):
+    """Sakoe-Chiba band half-width (frames) for tracks of length n and m.
 
-def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
-    """Compute 4 category scores + final score (v5.1 rules)."""
+    Never narrower than |n - m|, so the end cell stays reachable.
+    """
+    return max(abs(n - m), int(np.ceil(DTW_BAND_FRACTION * max(n, m))))
+
+def zscore_tracks(tracks):
+    """Filter and z-score several metric tracks in one pass.
+
+    Array tracks of equal length with the same validity mask (always
+    true for the column views from process_video_to_metrics) are
+    stacked, so NaN filtering and z-scoring run once over all of them.
+    Returns {name: z-scored valid frames}; empty tracks stay empty.
+    """
+    arrays = list(tracks.values())
+    if arrays and all(isinstance(a, np.ndarray) for a in arrays) and len({len(a) for a in arrays}) == 1:
+        columns = [a.reshape(len(a), -1) for a in arrays]
+        masks = [~np.isnan(c).any(axis=1) for c in columns]
+        if all(np.array_equal(masks[0], mask) for mask in masks[1:]):
+            stacked = np.hstack(columns)[masks[0]].astype(np.float64)
+            if len(stacked):
+                stacked = normalize_sequence_zscore(stacked)
+            zscored = {}
+            start = 0
+            for (name, track), column in zip(tracks.items(), columns):
+                stop = start + column.shape[1]
+                zscored[name] = stacked[:, start:stop].reshape((len(stacked),) + track.shape[1:])
+                start = stop
+            return zscored
+
+    zscored = {}
+    for name, track in tracks.items():
+        track = valid_track(track)
+        zscored[name] = normalize_sequence_zscore(track) if len(track) else track
+    return zscored
+
+def prepare_dtw_pairs(golden_metrics, user_metrics, metric_names, golden_zscored=None):
+    """Return {metric_name: (golden, user)} z-scored (T, D) tracks for DTW.
+
+    User tracks are filtered and z-scored together, golden tracks come
+    pre-z-scored from the golden store when available. A pair is None
+    when either track has fewer than 10 valid frames.
+    """
+    if golden_zscored is None:
+        golden_zscored = getattr(golden_metrics, 'zscored', {})
+    user_zscored = zscore_tracks({name: user_metrics.get(name, []) for name in metric_names})
+
+    pairs = {}
+    for name in metric_names:
+        golden = golden_zscored.get(name)
+        if golden is None:
+            golden = valid_track(golden_metrics.get(name, []))
+            if len(golden) >= 10:
+                golden = normalize_sequence_zscore(golden)
+        user = user_zscored[name]
+
+        if len(golden) < 10 or len(user) < 10:
+            pairs[name] = None
+        else:
+            pairs[name] = (golden.reshape(len(golden), -1), user.reshape(len(user), -1))
+    return pairs
+
+def dtw_lower_bounds(golden_metrics, pairs):
+    """Return {metric_name: lower bound on its DTW error} (0.0 for None pairs).
+
+    Golden envelopes come precomputed from the golden store when available.
+    """
+    bounds = {}
+    for name, pair in pairs.items():
+        if pair is None:
+            bounds[name] = 0.0
+            continue
+        golden, user = pair
+        radius = dtw_window_size(len(golden), len(user)) if DTW_WINDOW == 'sakoechiba' else None
+        if hasattr(golden_metrics, 'envelope') and name in golden_metrics.envelopes:
+            golden_envelope = golden_metrics.envelope(name, radius)
+        else:
+            golden_envelope = envelope(golden, radius)
+        bounds[name] = dtw_lower_bound(golden, user, golden_envelope, envelope(user, radius))
+    return bounds
+
+def run_dtw_pairs(pairs, cutoffs=None):
+    """Run DTW on prepared pairs, batching pairs of the same shape.
+
+    Returns {metric_name: error}. None pairs and failed DTW give 0.0.
+    A pair with a cutoff gives inf once its error is known to exceed it.
+    """
+    cutoffs = cutoffs or {}
+    errors = {}
+    groups = {}
+    for name, pair in pairs.items():
+        if pair is None:
+            errors[name] = 0.0
+            continue
+        golden, user = pair
+        groups.setdefault((golden.shape, user.shape), []).append((name, golden, user))
+
+    for (golden_shape, user_shape), items in groups.items():
+        try:
+            distances = dtw_distance_batch(
+                np.stack([golden for _, golden, _ in items]),
+                np.stack([user for _, _, user in items]),
+                window_type=DTW_WINDOW,
+                window_size=dtw_window_size(golden_shape[0], user_shape[0]),
+                cutoff=np.array([cutoffs.get(name, np.inf) for name, _, _ in items])
+            )
+        except Exception as e:
+            log.error("DTW calculation error: %s", e)
+            distances = [None] * len(items)
+
+        for (name, _, _), distance in zip(items, distances):
+            if distance is None:
+                errors[name] = 0.0
+            elif np.isinf(distance) and name not in cutoffs:
+                log.error("DTW calculation error: no warping path found for '%s'.", name)
+                errors[name] = 0.0
+            else:
+                errors[name] = float(distance)
+
+    return errors
+
+def calculate_dtw_errors(golden_metrics, user_metrics, metric_names, golden_zscored=None):
+    """Compute DTW errors for several metrics in one batched pass.
+
+    Returns {metric_name: error}; like calculate_dtw_error, an error is
+    0.0 when a track has fewer than 10 valid frames or DTW fails.
+    """
+    pairs = prepare_dtw_pairs(golden_metrics, user_metrics, metric_names, golden_zscored)
+    return run_dtw_pairs(pairs)
+
+def calculate_dtw_error(golden_track, user_track, golden_zscored=None):
+    """Compute DTW error between two sequences.
+
+    `golden_zscored` may carry the golden track's precomputed
+    z-scored valid frames (see GoldenSequence.zscored).
+    """
+    errors = calculate_dtw_errors(
+        {'track': golden_track}, {'track': user_track}, ['track'],
+        golden_zscored={} if golden_zscored is None else {'track': golden_zscored}
+    )
+    return errors['track']
+
+# A score of int(100 - min(dtw * scale, 100)) is 0 once dtw * scale > 99
+STABILITY_DTW_SCALE = 33.3
+CONTROL_DTW_SCALE = 50
+SCORE_ZERO_AT = 99
+
+def _prefiltered_dtw_errors(golden_metrics, pairs, stability_metrics, control_metric):
+    """Run the scoring DTW, skipping work a lower bound makes pointless.
+
+    When the lower bounds already push the Stability or Control score
+    to 0, that DTW is skipped and the bound stands in for the error.
+    Otherwise DTW runs with cutoffs past which the score is 0 anyway,
+    and an abandoned metric reports its cutoff (also a lower bound).
+    The scores are always the same as with plain DTW. Returns
+    (errors, stability_capped); stability_capped is True when the
+    stability errors are lower bounds rather than exact values.
+    """
+    bounds = dtw_lower_bounds(golden_metrics, pairs)
+    to_run = {}
+    cutoffs = {}
+    errors = {}
+
+    def stability_is_zero(values):
+        return np.mean(values) * STABILITY_DTW_SCALE > SCORE_ZERO_AT
+
+    stability_zero_at = len(stability_metrics) * SCORE_ZERO_AT / STABILITY_DTW_SCALE
+    stability_bound = sum(bounds[name] for name in stability_metrics)
+    stability_capped = stability_is_zero([bounds[name] for name in stability_metrics])
+    for name in stability_metrics:
+        if stability_capped:
+            errors[name] = bounds[name]
+        else:
+            to_run[name] = pairs[name]
+            # Past this, the stability average is over the zero-score line
+            # whatever the other metrics turn out to be.
+            cutoffs[name] = (stability_zero_at - (stability_bound - bounds[name])) * (1 + 1e-9)
+
+    if control_metric:
+        if bounds[control_metric] * CONTROL_DTW_SCALE > SCORE_ZERO_AT:
+            errors[control_metric] = bounds[control_metric]
+        else:
+            to_run[control_metric] = pairs[control_metric]
+            cutoffs[control_metric] = SCORE_ZERO_AT / CONTROL_DTW_SCALE * (1 + 1e-9)
+
+    abandoned = []
+    for name, error in run_dtw_pairs(to_run, cutoffs).items():
+        if np.isinf(error):
+            error = cutoffs[name]
+            abandoned.append(name)
+        errors[name] = error
+
+    stability_abandoned = [name for name in abandoned if name in stability_metrics]
+    if stability_abandoned:
+        stability_capped = True
+        if not stability_is_zero([errors[name] for name in stability_metrics]):
+            # Only reachable through float rounding right at the line
+            errors.update(run_dtw_pairs({name: pairs[name] for name in stability_metrics}))
+            stability_capped = False
+
+    return errors, stability_capped
+
+def scoring_dtw_metrics(exercise_name):
+    """Return (stability_metrics, control_metric) that the v5 rules compare with DTW."""
+    stability_metrics = ['shoulder_vec_norm', 'hip_vec_norm']
+    control_metric = None
+    if 'curl' in exercise_name or 'raise' in exercise_name:
+        control_metric = 'elbow_vec_norm'
+    elif 'squat' in exercise_name:
+        control_metric = 'knee_vec_norm'
+    return stability_metrics, control_metric
+
+def scores_from_dtw_errors(user_metrics, exercise_name, dtw_errors):
+    """Compute 4 category scores + final score (v5.1 rules) from the DTW errors."""
     scores = {
         'Spine Score': 0,
         'Stability Score': 0,
@@ -290,11 +1451,8 @@ def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
         'Final Score': 0
     }
 
-    user_spine_curve = [
-        m for m in user_metrics.get('spine_curvature', [])
-        if m is not None
-    ]
-    avg_curvature = np.mean(user_spine_curve) if user_spine_curve else 26
+    user_spine_curve = valid_track(user_metrics.get('spine_curvature', []))
+    avg_curvature = np.mean(user_spine_curve) if len(user_spine_curve) else 26
 
     if avg_curvature <= 15:
         scores['Spine Score'] = 100
@@ -305,25 +1463,15 @@ def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
     else:
         scores['Spine Score'] = 0
 
-    stability_errors = []
-    for vec_name in ['shoulder_vec_norm', 'hip_vec_norm']:
-        stability_errors.append(
-            calculate_dtw_error(
-                golden_metrics.get(vec_name, []),
-                user_metrics.get(vec_name, [])
-            )
-        )
-
+    stability_metrics, control_metric = scoring_dtw_metrics(exercise_name)
+    stability_errors = [dtw_errors[name] for name in stability_metrics]
     avg_stability_dtw = np.mean(stability_errors) if stability_errors else 0.0
-    scores['Stability Score'] = int(100 - min(avg_stability_dtw * 33.3, 100))
+    scores['Stability Score'] = int(100 - min(avg_stability_dtw * STABILITY_DTW_SCALE, 100))
 
     joint_score = 100
     if 'press' in exercise_name or 'dip' in exercise_name:
-        u_armpit = [
-            a for a in user_metrics.get('armpit_angle', [])
-            if a is not None
-        ]
-        if u_armpit:
+        u_armpit = valid_track(user_metrics.get('armpit_angle', []))
+        if len(u_armpit):
             avg_armpit_angle = np.mean(u_armpit)
             if avg_armpit_angle > 85:
                 joint_score = 20
@@ -332,19 +1480,9 @@ def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
 
     scores['Joint Score'] = int(joint_score)
 
-    control_dtw = 0.0
-    if 'curl' in exercise_name or 'raise' in exercise_name:
-        control_dtw = calculate_dtw_error(
-            golden_metrics.get('elbow_vec_norm', []),
-            user_metrics.get('elbow_vec_norm', [])
-        )
-    elif 'squat' in exercise_name:
-        control_dtw = calculate_dtw_error(
-            golden_metrics.get('knee_vec_norm', []),
-            user_metrics.get('knee_vec_norm', [])
-        )
+    control_dtw = dtw_errors[control_metric] if control_metric else 0.0
 
-    scores['Control Score'] = int(100 - min(control_dtw * 50, 100))
+    scores['Control Score'] = int(100 - min(control_dtw * CONTROL_DTW_SCALE, 100))
 
     final_score = (
         scores['Stability Score'] * 0.35 +
@@ -357,16 +1495,73 @@ def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
 
     scores['avg_spine_curvature_user'] = round(avg_curvature, 2)
     scores['avg_stability_dtw_error'] = round(avg_stability_dtw, 2)
+    return scores
+
+def calculate_scores_v5(golden_metrics, user_metrics, exercise_name):
+    """Compute 4 category scores + final score (v5.1 rules)."""
+    stability_metrics, control_metric = scoring_dtw_metrics(exercise_name)
+
+    # One batched DTW pass for every metric this exercise needs
+    dtw_metrics = stability_metrics + ([control_metric] if control_metric else [])
+    pairs = prepare_dtw_pairs(golden_metrics, user_metrics, dtw_metrics)
+    stability_capped = False
+
+    if DTW_LB_PREFILTER:
+        dtw_errors, stability_capped = _prefiltered_dtw_errors(
+            golden_metrics, pairs, stability_metrics, control_metric
+        )
+    else:
+        dtw_errors = run_dtw_pairs(pairs)
+
+    scores = scores_from_dtw_errors(user_metrics, exercise_name, dtw_errors)
+    if stability_capped:
+        # Stability DTW was skipped or abandoned: the error above is a lower bound
+        scores['stability_dtw_is_lower_bound'] = True
 
     return scores
 
-def call_gemini_for_analysis(exercise_name, scores):
-    """Send computed scores to Gemini for analysis."""
-    # We use the globally defined `text_model`
-    if not text_model:
-        print("Gemini text_model not available.")
-        return None
+def calculate_rep_scores(golden_metrics, user_metrics, exercise_name):
+    """Split the user clip into reps and score each one against the golden rep template.
+
+    Reps are found on the golden clip's rep signal (see
+    rep_segmentation.py). Every rep is z-scored on its own and compared
+    with the one golden rep, so the DTW matrices stay rep-sized. All
+    reps' DTW runs in one batched pass (reps of the same length share
+    their vectorized rows). Returns a list of {'rep', 'start_frame',
+    'end_frame', 'scores'}, empty when no rep was found or the golden
+    clip has no rep signal.
+    """
+    rep_model = getattr(golden_metrics, 'rep_model', None)
+    if rep_model is None:
+        return []
+    reps = rep_model.segment(user_metrics)
+    if not reps:
+        return []
 
+    template = golden_metrics.rep_template
+    stability_metrics, control_metric = scoring_dtw_metrics(exercise_name)
+    dtw_metrics = stability_metrics + ([control_metric] if control_metric else [])
+    rep_metrics = [{name: track[start:end] for name, track in user_metrics.items()} for start, end in reps]
+    pairs = {}
+    for index, tracks in enumerate(rep_metrics):
+        for name, pair in prepare_dtw_pairs(template, tracks, dtw_metrics).items():
+            pairs[(index, name)] = pair
+    dtw_errors = run_dtw_pairs(pairs)
+
+    return [
+        {
+            'rep': index + 1,
+            'start_frame': int(start),
+            'end_frame': int(end),
+            'scores': scores_from_dtw_errors(
+                tracks, exercise_name, {name: dtw_errors[(index, name)] for name in dtw_metrics}
+            ),
+        }
+        for index, ((start, end), tracks) in enumerate(zip(reps, rep_metrics))
+    ]
+
+def _analysis_prompt(exercise_name, scores):
+    """Build the coach prompt for computed scores."""
     scores_str = json.dumps(scores, indent=2)
 
     prompt = f"""
@@ -418,14 +1613,30 @@ def call_gemini_for_analysis(exercise_name, scores):
     * [Fix suggestion #2 based on second lowest score]
     ```
     """
+    return prompt
+
+def call_gemini_for_analysis(exercise_name, scores):
+    """Send computed scores to Gemini for analysis."""
+    # We use the globally defined `llm_client`
+    if not llm_client:
+        log.error("Gemini client not available.")
+        return None
 
     try:
-        response = text_model.generate_content(prompt)
-        return response.text
+        return llm_client.generate(_analysis_prompt(exercise_name, scores), endpoint='analyze-form')
     except Exception as e:
-        print(f"Gemini API call error: {e}")
+        log.error("Gemini API call error: %s", e)
         return None
 
+def stream_gemini_analysis(exercise_name, scores):
+    """Like call_gemini_for_analysis, but yield the markdown in chunks.
+
+    Raises if the client is not configured or the call fails.
+    """
+    if not llm_client:
+        raise Exception("Gemini client not available.")
+    yield from llm_client.stream(_analysis_prompt(exercise_name, scores), endpoint='analyze-form')
+
 # === FRONTEND HOSTING (from original app.py) ===
 
 @app.after_request
@@ -452,12 +1663,80 @@ def get_config():
         client_id = os.environ["GOOGLE_CLIENT_ID"]
         return jsonify({"google_client_id": client_id})
     except KeyError:
-        print("Error: GOOGLE_CLIENT_ID environment variable not set.")
+        log.error("GOOGLE_CLIENT_ID environment variable not set.")
         return jsonify({"error": "Server configuration error: Missing GOOGLE_CLIENT_ID"}), 500
     except Exception as e:
-        print(f"Error in /config: {e}")
+        log.error("Error in /config: %s", e)
         return jsonify({"error": "Server error."}), 500
 
+# === READINESS ENDPOINT ===
+@app.route('/ready')
+def readiness():
+    """Report whether pose inference is available: 200 when ready, else 503.
+
+    In-process analyses also report the inference service's queue depth,
+    batch fill ratio and latency percentiles.
+    """
+    if job_manager is None:
+        pose = dict(movenet_status)
+        ready = movenet_model is not None
+        if inference_service is not None:
+            pose['inference'] = inference_service.stats()
+    else:
+        workers = [info for info in job_manager.stats()['worker_info'] if info]
+        ready = any(info.get('state') == 'ready' for info in workers)
+        pose = {'state': 'ready' if ready else 'loading', 'variant': MOVENET_VARIANT, 'workers': workers}
+        if workers and not ready and all(info.get('state') == 'error' for info in workers):
+            pose['state'] = 'error'
+    return jsonify({"ready": ready, "pose": pose}), 200 if ready else 503
+
+# === OBSERVABILITY ===
+
+@app.before_request
+def start_trace():
+    """Give each request a trace ID (the caller's X-Request-ID if usable)."""
+    g.trace_id = valid_trace_id(request.headers.get('X-Request-ID')) or new_trace_id()
+    g.request_started = time.perf_counter()
+    set_trace_id(g.trace_id)
+
+@app.after_request
+def record_request(response):
+    trace_id = getattr(g, 'trace_id', None)
+    if trace_id is not None:
+        response.headers['X-Trace-Id'] = trace_id
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        http_requests.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+        http_latency.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    return response
+
+def _job_gauge(key):
+    return lambda: job_manager.stats()[key] if job_manager is not None else None
+
+def _inference_gauge(key):
+    return lambda: inference_service.stats()[key] if inference_service is not None else None
+
+metrics_registry.gauge_callback("jobs_queued", "Analysis jobs waiting for a worker.", _job_gauge('queued'))
+metrics_registry.gauge_callback("jobs_running", "Analysis jobs running in a worker.", _job_gauge('running'))
+metrics_registry.gauge_callback(
+    "inference_queue_frames", "Frames waiting for the shared inference service (in-process analyses).",
+    _inference_gauge('queue_frames')
+)
+metrics_registry.gauge_callback(
+    "inference_batch_fill_ratio", "Mean fill ratio of inference micro-batches.", _inference_gauge('fill_ratio')
+)
+metrics_registry.gauge_callback(
+    "llm_in_flight", "LLM calls in flight.", lambda: llm_client.stats()['in_flight'] if llm_client else None
+)
+metrics_registry.gauge_callback(
+    "llm_circuit_open", "1 while the LLM circuit breaker is open.",
+    lambda: int(llm_client.breaker.state == 'open') if llm_client else None
+)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Counters, histograms and gauges in the Prometheus text format."""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 # === AI GENERATOR ENDPOINTS ===
 
 WORKOUT_SYSTEM_PROMPT = """
@@ -610,9 +1889,92 @@ Be helpful, concise, and stay in character.
 **YOUR ANSWER:**
 """
 
+def _create_plan_cache():
+    if not PLAN_CACHE_ENABLED:
+        return None
+    try:
+        return PlanCache(PLAN_CACHE_PATH, PLAN_CACHE_TTL_HOURS * 3600, PLAN_CACHE_MAX_ENTRIES)
+    except (OSError, sqlite3.Error) as e:
+        log.warning("Plan cache disabled: %s", e)
+        return None
+
+plan_cache = _create_plan_cache()
+
+def _plan_cache_bypassed():
+    """True if the client asked for a fresh plan (Cache-Control: no-cache or ?no_cache=1)."""
+    return 'no-cache' in request.headers.get('Cache-Control', '') or request.args.get('no_cache') == '1'
+
+def _valid_workout_plan(plan, fields):
+    return (
+        isinstance(plan, dict) and isinstance(plan.get('title'), str)
+        and isinstance(plan.get('days'), list) and len(plan['days']) == fields['days_per_week']
+    )
+
+def _valid_nutrition_plan(plan, fields):
+    return (
+        isinstance(plan, dict) and isinstance(plan.get('title'), str)
+        and isinstance(plan.get('targets'), dict) and isinstance(plan.get('sample_plan'), list)
+    )
+
+def _generate_plan(endpoint, system_prompt, fields, user_prompt, validate):
+    """Return (plan, cache_status) for a plan request, using the plan cache.
+
+    `fields` are the canonical request fields, used only for the cache
+    key (None if the request could not be canonicalized, which skips
+    the cache); the prompt keeps the values as sent. Only plans that
+    pass `validate` are stored.
+    """
+    key = None
+    status = 'off'
+    if plan_cache is not None and fields is not None:
+        key = make_plan_key(endpoint, fields, f"{GEMINI_MODEL}|{zlib.crc32(system_prompt.encode('utf-8'))}")
+        if _plan_cache_bypassed():
+            plan_cache.record_bypass(endpoint)
+            status = 'bypass'
+        else:
+            cached = plan_cache.get(endpoint, key)
+            if cached is not None:
+                return cached, 'hit'
+            status = 'miss'
+
+    plan = json.loads(llm_client.generate([system_prompt, user_prompt], endpoint=endpoint, json_mode=True))
+    if key is not None and validate(plan, fields):
+        plan_cache.put(endpoint, key, plan)
+    return plan, status
+
+def _plan_response(plan, cache_status):
+    response = jsonify(plan)
+    response.headers['X-Plan-Cache'] = cache_status
+    return response, 200
+
+def _llm_error_response(e, message):
+    """Map a failed LLM call to an error response.
+
+    503 (with Retry-After) when the client refused the call, 504 when
+    it ran out of time, else 500 with `message`.
+    """
+    log.error("Gemini Error: %s", e)
+    if isinstance(e, LLMUnavailable):
+        response = jsonify({"error": "The AI service is busy or unavailable. Please try again shortly."})
+        response.headers['Retry-After'] = str(int(e.retry_after or 1))
+        return response, 503
+    if isinstance(e, LLMTimeout):
+        return jsonify({"error": "The AI service took too long to respond. Please try again."}), 504
+    return jsonify({"error": message}), 500
+
+# === LLM STATUS ENDPOINT ===
+@app.route('/llm-status')
+def llm_status():
+    """Report the LLM client's circuit breaker, slot usage and per-endpoint metrics,
+    and the plan cache's hit rates."""
+    plan_cache_stats = plan_cache.stats() if plan_cache is not None else None
+    if llm_client is None:
+        return jsonify({"configured": False, "plan_cache": plan_cache_stats}), 200
+    return jsonify(dict(llm_client.stats(), configured=True, plan_cache=plan_cache_stats)), 200
+
 @app.route('/generate-workout', methods=['POST'])
 def generate_workout_v2():
-    if not json_model:
+    if not llm_client:
         return jsonify({"error": "Gemini API not configured"}), 500
 
     data = request.get_json()
@@ -620,6 +1982,12 @@ def generate_workout_v2():
     if not all(field in data for field in required_fields):
         return jsonify({"error": "Missing required fields"}), 400
 
+    try:
+        fields = canonical_workout_request(data)
+    except (TypeError, ValueError) as e:
+        log.info("Not caching /generate-workout request: %s", e)
+        fields = None
+
     user_prompt = f"""
     Goal: {data['goal']}
     Experience: {data['experience_level']}
@@ -630,21 +1998,26 @@ def generate_workout_v2():
     """
     
     try:
-        response = json_model.generate_content([WORKOUT_SYSTEM_PROMPT, user_prompt])
-        plan_json = json.loads(response.text)
-        return jsonify(plan_json), 200
+        return _plan_response(*_generate_plan(
+            'generate-workout', WORKOUT_SYSTEM_PROMPT, fields, user_prompt, _valid_workout_plan
+        ))
     except Exception as e:
-        print(f"Gemini Error: {e}")
-        return jsonify({"error": "Failed to generate plan from AI."}), 500
+        return _llm_error_response(e, "Failed to generate plan from AI.")
 
 
 @app.route('/generate-nutrition-plan', methods=['POST'])
 def generate_nutrition_v2():
-    if not json_model:
+    if not llm_client:
         return jsonify({"error": "Gemini API not configured"}), 500
         
     data = request.get_json()
 
+    try:
+        fields = canonical_nutrition_request(data)
+    except (KeyError, TypeError, ValueError) as e:
+        log.info("Not caching /generate-nutrition-plan request: %s", e)
+        fields = None
+
     user_prompt = f"""
     Goal: {data['goal']}
     Weight: {data['weight_kg']} kg
@@ -655,16 +2028,15 @@ def generate_nutrition_v2():
     """
     
     try:
-        response = json_model.generate_content([NUTRITION_SYSTEM_PROMPT, user_prompt])
-        plan_json = json.loads(response.text)
-        return jsonify(plan_json), 200
+        return _plan_response(*_generate_plan(
+            'generate-nutrition-plan', NUTRITION_SYSTEM_PROMPT, fields, user_prompt, _valid_nutrition_plan
+        ))
     except Exception as e:
-        print(f"Gemini Error: {e}")
-        return jsonify({"error": "Failed to generate nutrition plan from AI."}), 500
+        return _llm_error_response(e, "Failed to generate nutrition plan from AI.")
 
 @app.route('/evaluate-plan', methods=['POST'])
 def evaluate_plan():
-    if not json_model:
+    if not llm_client:
         return jsonify({"error": "Gemini API not configured"}), 500
 
     data = request.get_json()
@@ -690,16 +2062,17 @@ def evaluate_plan():
     """
 
     try:
-        response = json_model.generate_content([EVALUATION_SYSTEM_PROMPT, user_prompt])
-        evaluation_json = json.loads(response.text)
+        response_text = llm_client.generate(
+            [EVALUATION_SYSTEM_PROMPT, user_prompt], endpoint='evaluate-plan', json_mode=True
+        )
+        evaluation_json = json.loads(response_text)
         return jsonify(evaluation_json), 200
     except Exception as e:
-        print(f"Gemini Error: {e}")
-        return jsonify({"error": "Failed to evaluate progress from AI."}), 500
+        return _llm_error_response(e, "Failed to evaluate progress from AI.")
 
 @app.route('/chat-with-plan', methods=['POST'])
 def chat_with_plan():
-    if not text_model:
+    if not llm_client:
         return jsonify({"error": "Gemini text model not configured"}), 500
 
     data = request.get_json()
@@ -719,12 +2092,38 @@ def chat_with_plan():
         user_message=user_message
     )
 
+    if data.get('stream'):
+        return _stream_chat_response(prompt)
+
     try:
-        response = text_model.generate_content(prompt)
-        return jsonify({"response": response.text}), 200
+        return jsonify({"response": llm_client.generate(prompt, endpoint='chat-with-plan')}), 200
     except Exception as e:
-        print(f"Gemini Chat Error: {e}")
-        return jsonify({"error": "Failed to get chat response from AI."}), 500
+        return _llm_error_response(e, "Failed to get chat response from AI.")
+
+def _stream_chat_response(prompt):
+    """Stream a chat answer as plain text while it is generated.
+
+    The first chunk is awaited before responding, so a failed call
+    still gets a proper error status. A failure after that can only cut
+    the text short, so a note is appended.
+    """
+    chunks = llm_client.stream(prompt, endpoint='chat-with-plan')
+    try:
+        first = next(chunks, "")
+    except Exception as e:
+        chunks.close()
+        return _llm_error_response(e, "Failed to get chat response from AI.")
+
+    def generate():
+        with closing(chunks):
+            yield first
+            try:
+                yield from chunks
+            except Exception as e:
+                log.error("Gemini Chat Error: %s", e)
+                yield "\n\n*(The response was cut off. Please try again.)*"
+
+    return Response(stream_with_context(generate()), mimetype='text/plain')
 
 # === VIDEO ANALYSIS ENDPOINTS ===
 
@@ -740,144 +2139,767 @@ def list_exercises():
             return jsonify({"error": "No exercises found in database."}), 404
         return jsonify(exercises), 200
     except Exception as e:
-        print(f"Error in /exercises: {e}")
+        log.error("Error in /exercises: %s", e)
         return jsonify({"error": "Failed to retrieve exercises from database."}), 500
 
 
+# --- RESULT CACHE ---
+def _create_result_cache():
+    if not RESULT_CACHE_ENABLED:
+        return None
+    try:
+        return ResultCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MAX_MB * 1024 * 1024))
+    except OSError as e:
+        log.warning("Result cache disabled: %s", e)
+        return None
+
+result_cache = _create_result_cache()
+
+def pose_config_tag():
+    """Identify everything that changes the keypoints extracted from a video."""
+    sampling = (
+        f"adaptive:{POSE_TARGET_FPS}:{MOTION_MIN_THRESHOLD}:{MOTION_FAST_THRESHOLD}"
+        if ADAPTIVE_SAMPLING else f"skip:{FRAME_SKIP_RATE}"
+    )
+    roi = f"roi:{ROI_MIN_SCORE}" if ROI_CROP else "full"
+    backend = f"tflite:{MOVENET_TFLITE_PRECISION}" if MOVENET_BACKEND == 'tflite' else "tf"
+    return f"{MOVENET_MODEL_URL}|{INPUT_SIZE}|{sampling}|{roi}|{backend}"
+
+def scoring_config_tag(golden_metrics):
+    """Identify everything besides the video that changes the scores."""
+    return (
+        f"{SCORING_VERSION}|{DTW_WINDOW}|{DTW_BAND_FRACTION}|{DTW_LB_PREFILTER}|"
+        f"{REP_SMOOTH_FRAMES}|{REP_HYSTERESIS}|{REP_MIN_FRAMES}|{getattr(golden_metrics, 'fingerprint', None)}"
+    )
+
 # --- STREAMING ANALYSIS FUNCTION ---
-def _analyze_video_stream(temp_video_path, exercise_name):
-    """
-    A generator function that yields progress updates
-    for the video analysis process.
-    """
-    try:    
-        # 1. Process User Video
-        yield json.dumps({
-            "status": "processing_video", 
-            "message": "Analyzing video frames (MoveNet)...", 
-            "percent": 10
-        }) + "\n"
-        
-        user_metrics_list = process_video_to_metrics(
-            movenet_model, temp_video_path
-        )
-        if not user_metrics_list:
+def _analysis_cache_lookup(temp_video_path, exercise_name, golden_metrics, video_digest=None):
+    """Return (keypoints_key, result_key, cached_result) for an upload.
+
+    Keys are None when the result cache is disabled; cached_result is
+    None on a miss. Pass `video_digest` if the upload's SHA-256 is
+    already known.
+    """
+    if result_cache is None:
+        return None, None, None
+    if video_digest is None:
+        video_digest = file_digest(temp_video_path)
+    keypoints_key = make_key(video_digest, pose_config_tag())
+    result_key = make_key(
+        video_digest, pose_config_tag(), exercise_name, scoring_config_tag(golden_metrics)
+    )
+    cached_result = result_cache.get_result(result_key) if golden_metrics else None
+    if cached_result is not None:
+        log.info("Result cache hit for '%s'.", exercise_name)
+    return keypoints_key, result_key, cached_result
+
+def _cached_complete_event(cached_result):
+    return {
+        "status": "complete",
+        "message": "Analysis complete!",
+        "percent": 100,
+        "data": cached_result,
+        "cached": True
+    }
+
+def _analyze_video_events(temp_video_path, exercise_name, cancelled=None, streaming=False, trace_id=None):
+    """
+    A generator function that yields progress update dicts
+    for the video analysis process. The last one has status
+    'complete', 'error' or 'cancelled'.
+
+    With `streaming`, the upload may still be arriving: frames are
+    decoded as it grows, and the cache is checked once it is complete.
+    Every event carries `trace_id` (when given); the last one also
+    carries `timings`, the seconds spent in each stage.
+    """
+    if trace_id is not None:
+        set_trace_id(trace_id)
+    timer = StageTimer()
+    started = time.perf_counter()
+    with closing(_analysis_stages(temp_video_path, exercise_name, timer, cancelled, streaming)) as events:
+        for event in events:
+            if trace_id is not None:
+                event['trace_id'] = trace_id
+            if event['status'] in TERMINAL_STATUSES:
+                timer.add('total', time.perf_counter() - started)
+                event['timings'] = timer.to_dict()
+            yield event
+
+def _add_pose_timings(timer, stats):
+    """Add an extraction's decode / inference busy time to `timer`."""
+    for stage in ('decode', 'inference'):
+        if f'{stage}_seconds' in stats:
+            timer.add(stage, stats[f'{stage}_seconds'])
+
+def _extract_with_progress(extract, message, cancelled=None):
+    """Run `extract(progress, cancelled)` on a thread, yielding its progress.
+
+    A generator: yields throttled 'processing_video' events with the
+    frame counts, frames/sec and estimated time left while the pose
+    pipeline runs, and returns what `extract` returned (use it with
+    `yield from`). Closing it early (the client went away) cancels the
+    extraction after its current batch and waits for it to stop.
+    """
+    updates = queue.Queue()
+    stop = threading.Event()
+    outcome = {}
+    reporter = ProgressReporter(POSE_PROGRESS_START, POSE_PROGRESS_END, PROGRESS_INTERVAL_SECONDS)
+
+    def progress(frames_done, frames_total):
+        fields = reporter.update(frames_done, frames_total)
+        if fields is not None:
+            updates.put(fields)
+
+    def should_stop():
+        return stop.is_set() or (cancelled is not None and cancelled())
+
+    def run():
+        try:
+            outcome['result'] = extract(progress, should_stop)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            updates.put(None)
+
+    # Copy the context so the thread's log records keep the trace ID
+    worker = threading.Thread(
+        target=contextvars.copy_context().run, args=(run,), name="pose-extract", daemon=True
+    )
+    worker.start()
+    try:
+        while True:
+            fields = updates.get()
+            if fields is None:
+                break
+            yield dict({"status": "processing_video", "message": message}, **fields)
+    finally:
+        stop.set()
+        worker.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+def _analysis_stages(temp_video_path, exercise_name, timer, cancelled=None, streaming=False):
+    """The stages of _analyze_video_events, timed into `timer`."""
+    def check_cancelled():
+        if cancelled is not None and cancelled():
+            raise JobCancelled()
+
+    try:
+        with timer.stage('golden_load'):
+            golden_metrics_dict = get_golden_data(exercise_name)
+
+        if streaming:
+            # 1. Process User Video while it uploads
+            message = "Analyzing video frames while uploading (MoveNet)..."
+            yield {
+                "status": "processing_video",
+                "message": message,
+                "percent": POSE_PROGRESS_START
+            }
+            pose_stats = {}
+            user_keypoints = yield from _extract_with_progress(
+                lambda progress, stop: extract_streaming_keypoints(
+                    temp_video_path, stats=pose_stats, cancelled=stop, progress=progress
+                ),
+                message, cancelled
+            )
+            _add_pose_timings(timer, pose_stats)
+
+            # The upload is complete now; a clip analyzed before still
+            # skips scoring and the AI call
+            with timer.stage('cache_lookup'):
+                keypoints_key, result_key, cached_result = _analysis_cache_lookup(
+                    temp_video_path, exercise_name, golden_metrics_dict,
+                    video_digest=wait_for_upload(temp_video_path)
+                )
+            if cached_result is not None:
+                yield _cached_complete_event(cached_result)
+                return
+            if keypoints_key is not None and len(user_keypoints):
+                result_cache.put_keypoints(keypoints_key, user_keypoints)
+        else:
+            # 0. Same clip analyzed before? Answer straight from the cache.
+            with timer.stage('cache_lookup'):
+                keypoints_key, result_key, cached_result = _analysis_cache_lookup(
+                    temp_video_path, exercise_name, golden_metrics_dict
+                )
+            if cached_result is not None:
+                yield _cached_complete_event(cached_result)
+                return
+
+            # 1. Process User Video
+            message = "Analyzing video frames (MoveNet)..."
+            yield {
+                "status": "processing_video", 
+                "message": message, 
+                "percent": POSE_PROGRESS_START
+            }
+
+            user_keypoints = None
+            if keypoints_key is not None:
+                user_keypoints = result_cache.get_keypoints(keypoints_key)
+            if user_keypoints is None:
+                pose_stats = {}
+                user_keypoints = yield from _extract_with_progress(
+                    lambda progress, stop: extract_video_keypoints(
+                        temp_video_path, stats=pose_stats, cancelled=stop, progress=progress
+                    ),
+                    message, cancelled
+                )
+                _add_pose_timings(timer, pose_stats)
+                if keypoints_key is not None and user_keypoints is not None and len(user_keypoints):
+                    result_cache.put_keypoints(keypoints_key, user_keypoints)
+            else:
+                log.info("Result cache hit for keypoints (%d frames).", len(user_keypoints))
+
+        with timer.stage('metrics'):
+            video_result = keypoints_to_metrics(user_keypoints) if user_keypoints is not None else None
+        if video_result is None or len(video_result[0]) == 0:
             raise Exception("Video processing failed. Could not extract metrics.")
+        user_metrics, _ = video_result
+        check_cancelled()
 
         # 2. Get Golden Standard Data
-        yield json.dumps({
+        yield {
             "status": "loading_golden", 
             "message": "Loading golden standard data...", 
             "percent": 65
-        }) + "\n"
+        }
 
-        golden_metrics_dict = get_golden_data(exercise_name)
         if not golden_metrics_dict:
             raise Exception(f"Golden-standard data not found for '{exercise_name}'.")
 
-        # 3. Format User Metrics (quick step)
-        user_metrics_dict = {}
-        for i, name in enumerate(METRIC_NAMES):
-            user_metrics_dict[name] = [
-                frame[i] if frame is not None else None
-                for frame in user_metrics_list
-            ]
+        # 3. Format User Metrics (column views, no copy)
+        user_metrics_dict = metrics_to_dict(user_metrics)
 
         # 4. Calculate Scores
-        yield json.dumps({
+        yield {
             "status": "calculating_scores", 
             "message": "Comparing your form (DTW)...", 
             "percent": 75
-        }) + "\n"
+        }
 
-        scores = calculate_scores_v5(
-            golden_metrics_dict, user_metrics_dict, exercise_name
-        )
+        with timer.stage('dtw'):
+            scores = calculate_scores_v5(
+                golden_metrics_dict, user_metrics_dict, exercise_name
+            )
+        with timer.stage('rep_dtw'):
+            rep_scores = calculate_rep_scores(golden_metrics_dict, user_metrics_dict, exercise_name)
+        check_cancelled()
 
         # 5. Get Gemini Analysis
-        yield json.dumps({
+        yield {
             "status": "calling_ai", 
             "message": "Getting feedback from AI Coach...", 
             "percent": 90
-        }) + "\n"
+        }
 
-        analysis_result = call_gemini_for_analysis(
-            exercise_name, scores
-        )
+        gemini_started = time.perf_counter()
+        if LLM_STREAMING and llm_client:
+            # Forward the markdown as it is generated; the complete
+            # event still carries the full text
+            chunks = []
+            try:
+                with closing(stream_gemini_analysis(exercise_name, scores)) as stream:
+                    for chunk in stream:
+                        chunks.append(chunk)
+                        yield {
+                            "status": "analysis_chunk",
+                            "message": "Getting feedback from AI Coach...",
+                            "percent": 90,
+                            "text": chunk
+                        }
+                        check_cancelled()
+                analysis_result = "".join(chunks)
+            except JobCancelled:
+                raise
+            except Exception as e:
+                log.error("Gemini API call error: %s", e)
+                analysis_result = None
+        else:
+            analysis_result = call_gemini_for_analysis(
+                exercise_name, scores
+            )
+        timer.add('gemini', time.perf_counter() - gemini_started)
         if not analysis_result:
             raise Exception("Failed to get AI analysis.")
 
         # 6. Return combined results
         final_data = {
             "scores": scores,
+            "reps": rep_scores,
             "analysis_markdown": analysis_result
         }
-        yield json.dumps({
+        if result_key is not None:
+            result_cache.put_result(result_key, final_data)
+        yield {
             "status": "complete", 
             "message": "Analysis complete!", 
             "percent": 100,
             "data": final_data
-        }) + "\n"
+        }
+
+    except JobCancelled:
+        log.info("Analysis of '%s' cancelled.", exercise_name)
+        yield {
+            "status": "cancelled",
+            "message": "Analysis cancelled.",
+            "percent": 100
+        }
 
     except Exception as e:
-        print(f"Error in analysis stream: {e}")
+        log.error("Error in analysis stream: %s", e)
         # Yield a final error message to the client
-        yield json.dumps({
+        yield {
             "status": "error", 
             "message": str(e),
             "percent": 100
-        }) + "\n"
+        }
     
     finally:
-        # Clean up the temporary file *after* the stream is done
-        if temp_video_path and os.path.exists(temp_video_path):
-            os.remove(temp_video_path)
-            print(f"Cleaned up temp file: {temp_video_path}")
+        # Clean up the temporary file *after* the analysis is done
+        _discard_upload(temp_video_path)
 
-@app.route('/analyze-form', methods=['POST'])
-def analyze_video_form():
+def _discard_upload(temp_video_path):
+    if temp_video_path and discard_upload(temp_video_path):
+        log.debug("Cleaned up temp file: %s", temp_video_path)
+
+def _record_analysis(event):
+    """Record a finished analysis' outcome and stage timings in the metrics."""
+    analyses_finished.inc(status=event.get('status'), cached='true' if event.get('cached') else 'false')
+    for stage, seconds in (event.get('timings') or {}).items():
+        analysis_stage_seconds.observe(seconds, stage=stage)
+
+def _analyze_video_stream(temp_video_path, exercise_name, streaming=False, trace_id=None):
+    """Run an analysis in this process, as newline-delimited JSON.
+
+    If the client disconnects, the response is closed and so is the
+    analysis, which stops its frame loop after the current batch.
     """
-    Endpoint to analyze an uploaded video form.
-    This now returns a streaming response.
+    events = _analyze_video_events(temp_video_path, exercise_name, streaming=streaming, trace_id=trace_id)
+    with closing(events):
+        try:
+            for event in events:
+                if event['status'] in TERMINAL_STATUSES:
+                    _record_analysis(event)
+                yield json.dumps(event) + "\n"
+        except GeneratorExit:
+            if event['status'] not in TERMINAL_STATUSES:
+                log.info("Client disconnected; stopping the analysis of '%s'.", exercise_name)
+                analyses_finished.inc(status='disconnected', cached='false')
+            raise
+
+# --- ANALYSIS JOBS ---
+def _init_analysis_worker():
+    """Job worker start-up: load MoveNet once per worker process.
+
+    Returns the worker's movenet_status, reported by JobManager.stats().
     """
-    if not movenet_model:
+    global movenet_model
+    movenet_model = load_movenet_model()
+    return dict(movenet_status)
+
+def _run_analysis_job(payload, emit, cancelled):
+    """Job worker entry point: run one analysis, emitting its events."""
+    for event in _analyze_video_events(
+        payload['video_path'], payload['exercise_name'], cancelled, streaming=payload.get('streaming', False),
+        trace_id=payload.get('trace_id')
+    ):
+        emit(event)
+
+def _discard_analysis_job(payload):
+    _discard_upload(payload['video_path'])
+
+def _observe_analysis_job(job, event):
+    _record_analysis(event)
+
+job_manager = None
+if JOB_WORKERS > 0:
+    job_manager = JobManager(
+        _run_analysis_job, JOB_WORKERS, JOB_QUEUE_SIZE, initializer=_init_analysis_worker,
+        retention_seconds=JOB_RETENTION_SECONDS, discard=_discard_analysis_job,
+        observe=_observe_analysis_job
+    )
+    # Start the workers (and their model loading) now instead of on the
+    # first job; not from the worker processes importing this module
+    if MOVENET_PRELOAD and multiprocessing.current_process().name == 'MainProcess':
+        job_manager.start()
+
+def _job_event_stream(job_id, since=0, cancel_on_disconnect=False):
+    """Stream a job's events as newline-delimited JSON.
+
+    With `cancel_on_disconnect`, the job is cancelled if the client goes
+    away before it finishes.
+    """
+    job = job_manager.get(job_id)
+    trace_id = job.payload.get('trace_id') if job is not None else None
+    try:
+        for event in job_manager.iter_events(job_id, since=since):
+            if event is None:
+                # Keep-alive while the job waits or runs a long stage
+                yield "\n"
+            else:
+                if trace_id is not None and 'trace_id' not in event:
+                    # Events added by the job queue itself (queued, lost worker)
+                    event = dict(event, trace_id=trace_id)
+                yield json.dumps(event) + "\n"
+    except GeneratorExit:
+        # The client went away before the last event
+        job = job_manager.get(job_id)
+        if cancel_on_disconnect and job is not None and not job.done:
+            log.info("Client disconnected; cancelling job %s.", job_id)
+            job_manager.cancel(job_id)
+        raise
+
+def _pose_unavailable_response(in_process=False):
+    """Return an error response if inline analysis cannot run yet, else None.
+
+    Job workers load their own model, so jobs just wait in the queue;
+    `in_process` work (live sessions) always needs this process's model.
+    """
+    if job_manager is not None and not in_process:
+        return None
+    start_movenet_loading()
+    if movenet_model:
+        return None
+    if movenet_status['state'] == 'error':
         return jsonify({"error": "MoveNet model is not loaded. Cannot process video."}), 500
+    response = jsonify({"error": "MoveNet model is still loading. Please retry shortly."})
+    response.headers['Retry-After'] = '5'
+    return response, 503
 
+def _save_uploaded_video():
+    """Validate the analysis form and save the upload to a temp file.
+
+    Returns (temp_video_path, exercise_name, None) or
+    (None, None, error_response).
+    """
     if 'video' not in request.files:
-        return jsonify({"error": "No 'video' file part in request."}), 400
+        return None, None, (jsonify({"error": "No 'video' file part in request."}), 400)
     
     file = request.files['video']
     if file.filename == '':
-        return jsonify({"error": "No selected video file."}), 400
+        return None, None, (jsonify({"error": "No selected video file."}), 400)
 
     exercise_name = request.form.get('exercise_name')
     if not exercise_name:
-        return jsonify({"error": "Missing 'exercise_name' form field."}), 400
+        return None, None, (jsonify({"error": "Missing 'exercise_name' form field."}), 400)
 
-    # --- Save the file *before* starting the generator ---
-    temp_video_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tfile:
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4', dir=UPLOAD_SPOOL_DIR) as tfile:
             file.save(tfile.name)
-            temp_video_path = tfile.name
+            return tfile.name, exercise_name, None
     except Exception as e:
-        print(f"Critical error saving temp file: {e}")
-        return jsonify({"error": f"Failed to save uploaded file: {e}"}), 500
+        log.error("Critical error saving temp file: %s", e)
+        return None, None, (jsonify({"error": f"Failed to save uploaded file: {e}"}), 500)
 
-    # Return the streaming response
-    # We pass the *path* (string) to the generator, not the file object
+def _submit_analysis_job(temp_video_path, exercise_name, streaming=False):
+    """Queue an analysis job. Returns (job, None) or (None, error_response)."""
+    try:
+        job = job_manager.submit({
+            'video_path': temp_video_path, 'exercise_name': exercise_name, 'streaming': streaming,
+            'trace_id': g.trace_id
+        })
+        return job, None
+    except JobQueueFull as e:
+        _discard_upload(temp_video_path)
+        response = jsonify({"error": f"Server is busy: {e} Please retry shortly."})
+        response.headers['Retry-After'] = '10'
+        return None, (response, 503)
+
+def _analysis_response(temp_video_path, exercise_name, video_digest=None):
+    """Stream the analysis of a fully received upload (inline or as a job)."""
+    if job_manager is None:
+        # Return the streaming response
+        # We pass the *path* (string) to the generator, not the file object
+        return Response(
+            stream_with_context(_analyze_video_stream(temp_video_path, exercise_name, trace_id=g.trace_id)), 
+            mimetype='application/x-json-stream'
+        )
+
+    # Cache hits are answered here without waiting for a worker
+    try:
+        _, _, cached_result = _analysis_cache_lookup(
+            temp_video_path, exercise_name, get_golden_data(exercise_name), video_digest=video_digest
+        )
+    except OSError as e:
+        log.warning("Result cache lookup failed: %s", e)
+        cached_result = None
+    if cached_result is not None:
+        _discard_upload(temp_video_path)
+        event = dict(_cached_complete_event(cached_result), trace_id=g.trace_id)
+        _record_analysis(event)
+        return Response(json.dumps(event) + "\n", mimetype='application/x-json-stream')
+
+    # Run as a job and stream its progress; if the client disconnects
+    # the job is cancelled (unless CANCEL_ON_DISCONNECT is off)
+    job, error = _submit_analysis_job(temp_video_path, exercise_name)
+    if error:
+        return error
     return Response(
-        stream_with_context(_analyze_video_stream(temp_video_path, exercise_name)), 
+        stream_with_context(_job_event_stream(job.id, cancel_on_disconnect=CANCEL_ON_DISCONNECT)),
         mimetype='application/x-json-stream'
     )
 
+def _receive_upload_rest(spool, stream):
+    """Background thread: spool the rest of a streaming upload."""
+    try:
+        spool.receive(stream)
+        log.info("Upload received: %.1f MB.", spool.bytes_received / 1e6)
+    except Exception as e:
+        log.warning("Upload interrupted after %d bytes: %s", spool.bytes_received, e)
+
+@app.route('/analyze-form', methods=['POST'])
+def analyze_video_form():
+    """
+    Endpoint to analyze an uploaded video form.
+    This now returns a streaming response.
+    """
+    error = _pose_unavailable_response()
+    if error:
+        return error
+
+    # --- Save the file *before* starting the generator ---
+    temp_video_path, exercise_name, error = _save_uploaded_video()
+    if error:
+        return error
+    return _analysis_response(temp_video_path, exercise_name)
+
+@app.route('/analyze-form/stream', methods=['POST'])
+def analyze_video_form_streaming():
+    """
+    Analyze a video sent as the raw request body (`?exercise_name=`).
+    Decoding starts while the video is still uploading; the response
+    streams progress like /analyze-form.
+    """
+    error = _pose_unavailable_response()
+    if error:
+        return error
+
+    exercise_name = request.args.get('exercise_name')
+    if not exercise_name:
+        return jsonify({"error": "Missing 'exercise_name' query parameter."}), 400
+
+    # Read just enough to tell whether the container can be decoded
+    # from a pipe; if not, receive it all and decode the file as usual.
+    # Sharded extraction needs a seekable file, so it never streams.
+    stream = request.stream
+    spool = None
+    try:
+        spool = UploadSpool(UPLOAD_SPOOL_DIR)
+        streamable = False
+        if STREAMING_UPLOAD and VIDEO_SHARD_WORKERS == 0:
+            streamable = spool.receive(stream, until_decided=True)
+        if not streamable and spool.digest is None:
+            spool.receive(stream)
+    except Exception as e:
+        log.error("Error receiving upload: %s", e)
+        if spool is not None:
+            _discard_upload(spool.path)
+        return jsonify({"error": f"Failed to receive uploaded video: {e}"}), 400
+
+    if spool.bytes_received == 0:
+        _discard_upload(spool.path)
+        return jsonify({"error": "Empty request body. Send the video file as the body."}), 400
+
+    if not streamable:
+        return _analysis_response(spool.path, exercise_name, video_digest=spool.digest)
+
+    log.info("Streaming upload for '%s': analysis starts before the upload ends.", exercise_name)
+    receiver = threading.Thread(
+        target=_receive_upload_rest, args=(spool, stream), name="upload-receive", daemon=True
+    )
+    if job_manager is None:
+        receiver.start()
+        return Response(
+            stream_with_context(_analyze_video_stream(spool.path, exercise_name, streaming=True, trace_id=g.trace_id)),
+            mimetype='application/x-json-stream'
+        )
+
+    job, error = _submit_analysis_job(spool.path, exercise_name, streaming=True)
+    if error:
+        spool.abort()
+        return error
+    receiver.start()
+    return Response(
+        stream_with_context(_job_event_stream(job.id, cancel_on_disconnect=CANCEL_ON_DISCONNECT)),
+        mimetype='application/x-json-stream'
+    )
+
+# === ANALYSIS JOB ENDPOINTS ===
+
+@app.route('/jobs', methods=['POST'])
+def submit_analysis_job():
+    """Queue a form analysis and return its job id right away."""
+    if job_manager is None:
+        return jsonify({"error": "Analysis jobs are disabled (JOB_WORKERS=0)."}), 404
+
+    temp_video_path, exercise_name, error = _save_uploaded_video()
+    if error:
+        return error
+
+    job, error = _submit_analysis_job(temp_video_path, exercise_name)
+    if error:
+        return error
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events"
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Poll a job's status (and result once complete)."""
+    job = job_manager.get(job_id) if job_manager else None
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    """Stream a job's progress events, from `?since=<n>` on."""
+    if job_manager is None or job_manager.get(job_id) is None:
+        return jsonify({"error": "Job not found."}), 404
+    since = request.args.get('since', 0, type=int)
+    return Response(
+        stream_with_context(_job_event_stream(job_id, since=max(0, since))),
+        mimetype='application/x-json-stream'
+    )
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_analysis_job(job_id):
+    """Cancel a queued or running job."""
+    job = job_manager.cancel(job_id) if job_manager else None
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict()), 200
+
+
+# === LIVE ANALYSIS ENDPOINTS ===
+
+live_sessions = LiveSessionStore(LIVE_MAX_SESSIONS, LIVE_SESSION_IDLE_SECONDS)
+metrics_registry.gauge_callback("live_sessions", "Open live analysis sessions.", lambda: len(live_sessions))
+
+def _live_pose_metrics(frames):
+    """Run MoveNet on a batch of live frames and return their metric rows."""
+    with _pose_session() as model:
+        keypoints = run_inference_batch(model, frames)
+    return compute_metrics_array(keypoints)[0]
+
+def _decode_live_frames():
+    """Decode the frames of a live request to RGB arrays.
+
+    Frames come as 'frame' files of a multipart form, or as one image
+    (JPEG/PNG) in the raw request body. Returns (frames, None) or
+    (None, error_response).
+    """
+    if request.files:
+        blobs = [file.read() for file in request.files.getlist('frame')]
+    else:
+        blobs = [request.get_data()]
+    blobs = [blob for blob in blobs if blob]
+    if not blobs:
+        return None, (jsonify({"error": "No frames in request."}), 400)
+    if len(blobs) > LIVE_MAX_BATCH_FRAMES:
+        return None, (jsonify({"error": f"At most {LIVE_MAX_BATCH_FRAMES} frames per request."}), 400)
+
+    frames = []
+    for blob in blobs:
+        image = cv2.imdecode(np.frombuffer(blob, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            return None, (jsonify({"error": "Cannot decode frame image."}), 400)
+        frames.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    if len({frame.shape for frame in frames}) > 1:
+        return None, (jsonify({"error": "Frames of one request must have the same size."}), 400)
+    return frames, None
+
+@app.route('/live/sessions', methods=['POST'])
+def create_live_session():
+    """Open a live (camera) analysis session for an exercise."""
+    data = request.get_json(silent=True) or {}
+    exercise_name = data.get('exercise_name') or request.form.get('exercise_name')
+    if not exercise_name:
+        return jsonify({"error": "Missing 'exercise_name'."}), 400
+    golden_metrics = get_golden_data(exercise_name)
+    if not golden_metrics:
+        return jsonify({"error": f"No golden data found for exercise: {exercise_name}"}), 404
+
+    error = _pose_unavailable_response(in_process=True)
+    if error:
+        return error
+
+    template = golden_metrics.rep_template
+    session = LiveSession(
+        uuid.uuid4().hex, exercise_name, golden_metrics.rep_model,
+        pose_metrics=_live_pose_metrics,
+        to_tracks=metrics_to_dict,
+        score_rep=lambda tracks: calculate_scores_v5(template, tracks, exercise_name),
+        max_frames=LIVE_MAX_FRAMES,
+        max_rep_frames=LIVE_MAX_REP_FRAMES,
+        max_reps=LIVE_MAX_REPS,
+        frame_budget_ms=LIVE_FRAME_BUDGET_MS,
+    )
+    try:
+        live_sessions.add(session)
+    except LiveSessionLimit as e:
+        response = jsonify({"error": f"Server is busy: {e} Please retry shortly."})
+        response.headers['Retry-After'] = '10'
+        return response, 503
+    log.info("Live session %s opened for '%s'.", session.id, exercise_name)
+    return jsonify({
+        "session_id": session.id,
+        "frames_url": f"/live/sessions/{session.id}/frames",
+        "max_batch_frames": LIVE_MAX_BATCH_FRAMES,
+        "frame_budget_ms": LIVE_FRAME_BUDGET_MS,
+        "idle_timeout_seconds": LIVE_SESSION_IDLE_SECONDS,
+        "rep_counting": session.rep_model is not None,
+    }), 201
+
+@app.route('/live/sessions/<session_id>/frames', methods=['POST'])
+def post_live_frames(session_id):
+    """Analyze the next frames of a live session and return its update."""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Live session not found (it may have expired)."}), 404
+    frames, error = _decode_live_frames()
+    if error:
+        return error
+
+    with live_batch_seconds.time():
+        update = session.process(frames)
+    live_frames.inc(len(frames) - update['dropped_in_batch'], status='processed')
+    live_frames.inc(update['dropped_in_batch'], status='dropped')
+    if update['new_reps']:
+        live_reps.inc(len(update['new_reps']))
+    return jsonify(update), 200
+
+@app.route('/live/sessions/<session_id>', methods=['GET'])
+def get_live_session(session_id):
+    """Return a live session's counters, running metrics and rep results."""
+    session = live_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Live session not found (it may have expired)."}), 404
+    return jsonify(session.summary()), 200
+
+@app.route('/live/sessions/<session_id>', methods=['DELETE'])
+def close_live_session(session_id):
+    """Close a live session and return its final summary."""
+    session = live_sessions.remove(session_id)
+    if session is None:
+        return jsonify({"error": "Live session not found (it may have expired)."}), 404
+    log.info("Live session %s closed after %d reps.", session.id, session.rep_count)
+    return jsonify(session.summary()), 200
+
 
 # === Main Run ===
 if __name__ == '__main__':
     # Ensure the database exists before running
     if not os.path.exists(DB_NAME):
-        print(f"Warning: Database file '{DB_NAME}' not found.")
-        print("The /exercises and /analyze-form endpoints will fail.")
-        print("Please create the 'correct_movement.db' file.")
+        log.warning("Database file '%s' not found.", DB_NAME)
+        log.warning("The /exercises and /analyze-form endpoints will fail.")
+        log.warning("Please create the 'correct_movement.db' file.")
     
     app.run(debug=True, port=5000)
\ No newline at end of file
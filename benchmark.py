@@ -0,0 +1,1135 @@
+"""Benchmarks for the form-analysis pipeline.
+
+Usage:
+    python benchmark.py golden-load [--db correct_movement.db] [--repeat 20]
+    python benchmark.py dtw-parity [--db correct_movement.db]
+    python benchmark.py scoring [--repeat 5]
+    python benchmark.py lb-prefilter [--repeat 3]
+    python benchmark.py rep-scoring [--replays 4] [--repeat 3]
+    python benchmark.py video-shards VIDEO [--workers 4] [--shard-frames 600]
+    python benchmark.py adaptive-sampling VIDEO [--target-fps 10 15 20] [--exercise NAME]
+    python benchmark.py roi-crop VIDEO [--batch-size 1 8] [--exercise NAME]
+    python benchmark.py cold-start [--repeat 3] [--model-dir models]
+    python benchmark.py backends VIDEO [--threads N] [--model-dir models] [--exercise NAME]
+    python benchmark.py micro-batching VIDEO [--clients 1 2 4] [--max-batch 32] [--max-wait-ms 5]
+    python benchmark.py live VIDEO [--exercise NAME] [--batch-size 1] [--step 2] [--limit 200] [--replays 3]
+    python benchmark.py suite [--video VIDEO] [--output results.json] [--compare baseline.json]
+
+`suite` is the end-to-end run to keep between changes: it saves its
+results as JSON and, with --compare, flags regressions against an
+earlier run.
+
+`scoring` (and later commands) import app.py, so they need the full
+TensorFlow environment.
+"""
+import argparse
+import io
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import golden_format
+from dtw_engine import dtw_distance
+
+
+def _median_seconds(fn, repeat):
+    """Run fn `repeat` times and return the median wall time in seconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+# --- golden-load: JSON vs binary GoldenSequences ---
+
+def bench_golden_load(db_path, repeat):
+    """Compare load time and size of the JSON and binary golden formats."""
+    conn = sqlite3.connect(db_path)
+    if not golden_format.has_binary_table(conn):
+        raise SystemExit(f"No {golden_format.BINARY_TABLE} table in {db_path}; run migrate_golden_db.py first.")
+
+    names = [row[0] for row in conn.execute("SELECT exercise_name FROM GoldenSequences ORDER BY exercise_name")]
+
+    def load_json(name):
+        metric_names_json, metric_data_json = conn.execute(
+            "SELECT metric_names, metric_data FROM GoldenSequences WHERE exercise_name = ?", (name,)
+        ).fetchone()
+        return golden_format.parse_json_row(metric_names_json, metric_data_json)
+
+    def load_binary(name):
+        n_frames, n_columns, dtype, data = conn.execute(
+            f"SELECT n_frames, n_columns, dtype, data FROM {golden_format.BINARY_TABLE} WHERE exercise_name = ?",
+            (name,)
+        ).fetchone()
+        return golden_format.decode_metrics(data, n_frames, n_columns, dtype)
+
+    results = []
+    for name in names:
+        json_bytes = conn.execute(
+            "SELECT length(metric_names) + length(metric_data) FROM GoldenSequences WHERE exercise_name = ?", (name,)
+        ).fetchone()[0]
+        binary_bytes = conn.execute(
+            f"SELECT length(data) + length(null_bitmap) FROM {golden_format.BINARY_TABLE} WHERE exercise_name = ?",
+            (name,)
+        ).fetchone()[0]
+        results.append({
+            'exercise': name,
+            'frames': len(load_binary(name)),
+            'json_bytes': json_bytes,
+            'binary_bytes': binary_bytes,
+            'json_ms': _median_seconds(lambda: load_json(name), repeat) * 1000,
+            'binary_ms': _median_seconds(lambda: load_binary(name), repeat) * 1000,
+        })
+    conn.close()
+
+    print(f"{'exercise':<30} {'frames':>6} {'json B':>9} {'bin B':>8} {'json ms':>8} {'bin ms':>7} {'speedup':>8}")
+    for r in results:
+        print(
+            f"{r['exercise']:<30} {r['frames']:>6} {r['json_bytes']:>9} {r['binary_bytes']:>8} "
+            f"{r['json_ms']:>8.3f} {r['binary_ms']:>7.3f} {r['json_ms'] / max(r['binary_ms'], 1e-9):>7.1f}x"
+        )
+    total_json_ms = sum(r['json_ms'] for r in results)
+    total_binary_ms = sum(r['binary_ms'] for r in results)
+    print(
+        f"TOTAL {len(results)} exercises: {sum(r['json_bytes'] for r in results)} B -> "
+        f"{sum(r['binary_bytes'] for r in results)} B, {total_json_ms:.2f} ms -> {total_binary_ms:.2f} ms"
+    )
+    return results
+
+
+# --- dtw-parity: dtw_engine vs dtw-python on the stored golden data ---
+
+DTW_METRICS = ['shoulder_vec_norm', 'elbow_vec_norm', 'hip_vec_norm', 'knee_vec_norm']
+
+def _load_zscored_tracks(db_path):
+    """Return {exercise: {metric: z-scored valid frames}} for every golden sequence."""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT exercise_name, metric_names, metric_data FROM GoldenSequences ORDER BY exercise_name"
+    ).fetchall()
+    conn.close()
+
+    tracks = {}
+    for name, metric_names_json, metric_data_json in rows:
+        metrics = golden_format.parse_json_row(metric_names_json, metric_data_json)
+        valid = ~np.isnan(metrics).any(axis=1)
+        tracks[name] = {}
+        for metric in DTW_METRICS:
+            track = metrics[valid][:, golden_format.METRIC_COLUMNS[metric]].astype(np.float64)
+            if len(track) < 10:
+                continue
+            std = track.std(axis=0)
+            tracks[name][metric] = (track - track.mean(axis=0)) / np.where(std == 0, 1, std)
+    return tracks
+
+def bench_dtw_parity(db_path, tolerance=1e-9):
+    """Check dtw_engine against dtw-python on every golden track pair.
+
+    Each exercise's golden track is compared with the next exercise's
+    track (standing in for a user upload), unconstrained and with
+    Sakoe-Chiba and Itakura windows.
+    """
+    from dtw import dtw
+
+    tracks = _load_zscored_tracks(db_path)
+    names = [name for name in tracks if tracks[name]]
+    windows = [(None, None), ('sakoechiba', 0.1), ('itakura', None)]
+
+    worst = 0.0
+    checked = failures = 0
+    timings = {'dtw-python': 0.0, 'dtw_engine': 0.0}
+    for idx, name in enumerate(names):
+        other = names[(idx + 1) % len(names)]
+        for metric in DTW_METRICS:
+            if metric not in tracks[name] or metric not in tracks[other]:
+                continue
+            x, y = tracks[name][metric], tracks[other][metric]
+            for window_type, fraction in windows:
+                window_size = None
+                kwargs = {}
+                if window_type is not None:
+                    kwargs['window_type'] = window_type
+                if fraction is not None:
+                    window_size = max(abs(len(x) - len(y)), int(np.ceil(fraction * max(len(x), len(y)))))
+                    kwargs['window_args'] = {'window_size': window_size}
+
+                started = time.perf_counter()
+                try:
+                    expected = dtw(x, y, **kwargs).normalizedDistance
+                except ValueError:
+                    expected = np.inf
+                timings['dtw-python'] += time.perf_counter() - started
+
+                started = time.perf_counter()
+                actual = dtw_distance(x, y, window_type, window_size)
+                timings['dtw_engine'] += time.perf_counter() - started
+
+                checked += 1
+                if np.isinf(expected) or np.isinf(actual):
+                    ok = np.isinf(expected) and np.isinf(actual)
+                else:
+                    diff = abs(expected - actual)
+                    worst = max(worst, diff)
+                    ok = diff <= tolerance * max(1.0, abs(expected))
+                if not ok:
+                    failures += 1
+                    print(f"MISMATCH {name} vs {other} {metric} window={window_type}: {expected} != {actual}")
+
+    print(f"Checked {checked} DTW pairs, {failures} mismatches, worst abs diff {worst:.3e}.")
+    print(f"Total time: dtw-python {timings['dtw-python']:.2f}s, dtw_engine {timings['dtw_engine']:.2f}s")
+    if failures:
+        raise SystemExit(1)
+
+
+# --- scoring: per-metric vs batched multi-metric DTW ---
+
+SCORING_DTW_METRICS = ['shoulder_vec_norm', 'hip_vec_norm', 'elbow_vec_norm']
+
+def bench_scoring(repeat):
+    """Time the scoring DTW stage per exercise.
+
+    Compares the original path (per-metric filter + z-score + dtw-python),
+    per-metric calls to calculate_dtw_error, and one batched
+    calculate_dtw_errors call. The speedup column is dtw-python / batched.
+    The next exercise's golden data stands in for the user upload.
+    """
+    import app
+    from dtw import dtw
+
+    names = [name for name in app.get_available_exercises() if app.get_golden_data(name).valid.sum() >= 10]
+
+    def original(golden, user):
+        errors = {}
+        for metric in SCORING_DTW_METRICS:
+            g = app.valid_track(golden[metric])
+            u = app.valid_track(user[metric])
+            errors[metric] = dtw(
+                app.normalize_sequence_zscore(g), app.normalize_sequence_zscore(u), keep_internals=True
+            ).normalizedDistance
+        return errors
+
+    def sequential(golden, user):
+        return {
+            metric: app.calculate_dtw_error(golden[metric], user[metric], golden.zscored.get(metric))
+            for metric in SCORING_DTW_METRICS
+        }
+
+    def batched(golden, user):
+        return app.calculate_dtw_errors(golden, user, SCORING_DTW_METRICS)
+
+    print(f"{'exercise':<30} {'frames':>11} {'dtw-python':>10} {'per-metric':>10} {'batched':>8} {'speedup':>8}")
+    results = []
+    for idx, name in enumerate(names):
+        golden = app.get_golden_data(name)
+        user = app.metrics_to_dict(app.get_golden_data(names[(idx + 1) % len(names)]).metrics)
+
+        expected = original(golden, user)
+        actual = batched(golden, user)
+        for metric in SCORING_DTW_METRICS:
+            if abs(expected[metric] - actual[metric]) > 1e-9:
+                raise SystemExit(f"Mismatch for {name} {metric}: {expected[metric]} != {actual[metric]}")
+
+        r = {
+            'exercise': name,
+            'golden_frames': int(golden.valid.sum()),
+            'user_frames': int(app.get_golden_data(names[(idx + 1) % len(names)]).valid.sum()),
+            'dtw_python_ms': _median_seconds(lambda: original(golden, user), repeat) * 1000,
+            'per_metric_ms': _median_seconds(lambda: sequential(golden, user), repeat) * 1000,
+            'batched_ms': _median_seconds(lambda: batched(golden, user), repeat) * 1000,
+        }
+        results.append(r)
+        print(
+            f"{name:<30} {r['golden_frames']:>5}x{r['user_frames']:<5} {r['dtw_python_ms']:>10.2f} "
+            f"{r['per_metric_ms']:>10.2f} {r['batched_ms']:>8.2f} {r['dtw_python_ms'] / r['batched_ms']:>7.2f}x"
+        )
+
+    totals = {key: sum(r[key] for r in results) for key in ('dtw_python_ms', 'per_metric_ms', 'batched_ms')}
+    print(
+        f"TOTAL: dtw-python {totals['dtw_python_ms']:.1f} ms, per-metric {totals['per_metric_ms']:.1f} ms, "
+        f"batched {totals['batched_ms']:.1f} ms ({totals['dtw_python_ms'] / totals['batched_ms']:.2f}x vs dtw-python)"
+    )
+    return results
+
+
+# --- lb-prefilter: LB_Keogh/LB_Kim prefilter in calculate_scores_v5 ---
+
+SCORE_KEYS = ['Spine Score', 'Stability Score', 'Joint Score', 'Control Score', 'Final Score']
+
+def bench_lb_prefilter(repeat):
+    """Check and time the DTW lower-bound prefilter.
+
+    Every exercise is scored against every other exercise's golden data,
+    as recorded and with its frames shuffled (a badly mismatched upload),
+    with DTW_LB_PREFILTER on and off. Scores must match exactly.
+    """
+    import app
+
+    names = [name for name in app.get_available_exercises() if app.get_golden_data(name).valid.sum() >= 10]
+    rng = np.random.default_rng(0)
+    uploads = []
+    for name in names:
+        metrics = np.array(app.get_golden_data(name).metrics)
+        uploads.append(app.metrics_to_dict(metrics))
+        uploads.append(app.metrics_to_dict(metrics[rng.permutation(len(metrics))]))
+
+    def score_all(prefilter):
+        app.DTW_LB_PREFILTER = prefilter
+        return [app.calculate_scores_v5(app.get_golden_data(name), user, name) for name in names for user in uploads]
+
+    original = app.DTW_LB_PREFILTER
+    try:
+        with_lb = score_all(True)
+        without_lb = score_all(False)
+        on_s = _median_seconds(lambda: score_all(True), repeat)
+        off_s = _median_seconds(lambda: score_all(False), repeat)
+    finally:
+        app.DTW_LB_PREFILTER = original
+
+    mismatches = sum(any(a[key] != b[key] for key in SCORE_KEYS) for a, b in zip(with_lb, without_lb))
+    capped = sum(bool(a.get('stability_dtw_is_lower_bound')) for a in with_lb)
+
+    # How often the exact DTW and the bound reach the zero-score line
+    # (int(100 - min(dtw * scale, 100)) == 0), and how close the bound gets.
+    lines = {
+        'stability': (SCORING_DTW_METRICS[:2], app.STABILITY_DTW_SCALE),
+        'control': (SCORING_DTW_METRICS[2:], app.CONTROL_DTW_SCALE),
+    }
+    zero_exact = dict.fromkeys(lines, 0)
+    zero_bound = dict.fromkeys(lines, 0)
+    tightness = []
+    bound_reach = []
+    for name in names:
+        golden = app.get_golden_data(name)
+        for user in uploads:
+            pairs = app.prepare_dtw_pairs(golden, user, SCORING_DTW_METRICS)
+            bounds = app.dtw_lower_bounds(golden, pairs)
+            errors = app.run_dtw_pairs(pairs)
+            tightness += [bounds[m] / errors[m] for m in SCORING_DTW_METRICS if errors[m] > 0]
+            for key, (metrics, scale) in lines.items():
+                zero_exact[key] += np.mean([errors[m] for m in metrics]) * scale > app.SCORE_ZERO_AT
+                zero_bound[key] += np.mean([bounds[m] for m in metrics]) * scale > app.SCORE_ZERO_AT
+                bound_reach.append(np.mean([bounds[m] for m in metrics]) * scale / app.SCORE_ZERO_AT)
+
+    total = len(names) * len(uploads)
+    print(f"Scored {len(with_lb)} exercise/upload pairs, {mismatches} score mismatches.")
+    print(f"Stability DTW capped by the bound in {capped} pairs; mean bound tightness {np.mean(tightness):.2f}.")
+    for key in ('stability', 'control'):
+        print(
+            f"{key.capitalize()} score 0 in {zero_exact[key]}/{total} pairs by exact DTW, "
+            f"{zero_bound[key]}/{total} by the bound alone."
+        )
+    print(f"Largest bound reaches {max(bound_reach):.0%} of the zero-score line (median {np.median(bound_reach):.0%}).")
+    print(f"Time: prefilter on {on_s * 1000:.1f} ms, off {off_s * 1000:.1f} ms")
+    if mismatches:
+        raise SystemExit(1)
+
+
+# --- rep-scoring: whole-clip vs per-rep DTW scoring ---
+
+def bench_rep_scoring(replays, repeat):
+    """Time whole-clip scoring against per-rep scoring on long uploads.
+
+    Each exercise's golden clip, played `replays` times back to back,
+    stands in for an upload with many more reps than the golden clip.
+    It is scored whole (calculate_scores_v5) and rep by rep against the
+    golden rep template (calculate_rep_scores). Reports the reps found
+    (vs `replays` x the golden clip's reps) and both timings.
+    """
+    import app
+
+    names = [name for name in app.get_available_exercises() if app.get_golden_data(name).rep_model is not None]
+    print(f"Uploads: each golden clip played {replays} times")
+    print(
+        f"{'exercise':<30} {'frames':>6} {'reps':>9} {'tmpl':>5} {'whole ms':>8} {'reps ms':>8} "
+        f"{'whole':>5} {'rep avg':>7}"
+    )
+    totals = {'whole': 0.0, 'reps': 0.0}
+    for name in names:
+        golden = app.get_golden_data(name)
+        user = app.metrics_to_dict(np.concatenate([golden.metrics] * replays))
+        expected = len(golden.rep_model.reps) * replays
+        whole = app.calculate_scores_v5(golden, user, name)
+        reps = app.calculate_rep_scores(golden, user, name)
+        whole_s = _median_seconds(lambda: app.calculate_scores_v5(golden, user, name), repeat)
+        reps_s = _median_seconds(lambda: app.calculate_rep_scores(golden, user, name), repeat)
+        totals['whole'] += whole_s
+        totals['reps'] += reps_s
+        start, end = golden.rep_model.template
+        rep_avg = np.mean([rep['scores']['Final Score'] for rep in reps]) if reps else float('nan')
+        print(
+            f"{name[:30]:<30} {len(golden.metrics) * replays:>6} {len(reps):>4}/{expected:<4} {end - start:>5} "
+            f"{whole_s * 1000:>8.1f} {reps_s * 1000:>8.1f} {whole['Final Score']:>5} {rep_avg:>7.1f}"
+        )
+    print(f"TOTAL: whole clip {totals['whole'] * 1000:.1f} ms, per rep {totals['reps'] * 1000:.1f} ms")
+
+
+# --- video-shards: sequential vs sharded keypoint extraction ---
+
+def bench_video_shards(video_path, workers, shard_frames):
+    """Time sequential vs sharded extraction of one video and check parity.
+
+    Set JOB_WORKERS=0 so app.py loads MoveNet in this process.
+    """
+    os.environ['VIDEO_SHARD_WORKERS'] = str(workers)
+    import app
+    app.VIDEO_SHARD_WORKERS = workers
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet is not loaded in this process; run with JOB_WORKERS=0.")
+
+    shards = app.video_shards(video_path, shard_frames)
+    # Start the pool (and load MoveNet in every worker) outside the timing
+    app.extract_keypoints_sharded(video_path, shard_frames=shard_frames)
+
+    sequential_stats = {}
+    started = time.perf_counter()
+    expected = app.extract_keypoints(app.movenet_model, video_path, stats=sequential_stats)
+    sequential_s = time.perf_counter() - started
+
+    sharded_stats = {}
+    started = time.perf_counter()
+    actual = app.extract_keypoints_sharded(video_path, shard_frames=shard_frames, stats=sharded_stats)
+    sharded_s = time.perf_counter() - started
+
+    identical = expected.shape == actual.shape and np.array_equal(expected, actual)
+    print(f"{len(shards)} shards of {shard_frames} frames on {workers} workers ({os.cpu_count()} cores)")
+    print(f"Sequential: {sequential_s:.2f}s ({sequential_stats['fps']:.1f} fps)")
+    print(f"Sharded:    {sharded_s:.2f}s ({sharded_stats['fps']:.1f} fps), speedup {sequential_s / sharded_s:.2f}x")
+    print(f"Keypoints identical: {identical} ({len(expected)} frames)")
+    if not identical:
+        raise SystemExit(1)
+
+
+# --- adaptive-sampling: accuracy vs speed of adaptive frame sampling ---
+
+def bench_adaptive_sampling(video_path, target_fps_values, exercises=None, min_motion=None, fast_motion=None):
+    """Compare adaptive frame sampling against inferring every frame.
+
+    For each target pose rate, reports how many frames went through
+    MoveNet, extraction time, and how far the calculate_scores_v5
+    outputs move from the every-frame baseline across exercises. Set
+    JOB_WORKERS=0 so app.py loads MoveNet in this process.
+    """
+    import app
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet is not loaded in this process; run with JOB_WORKERS=0.")
+    exercises = exercises or app.get_available_exercises()
+
+    def run(adaptive, target_fps=None):
+        app.ADAPTIVE_SAMPLING = adaptive
+        if target_fps is not None:
+            app.POSE_TARGET_FPS = target_fps
+        if min_motion is not None:
+            app.MOTION_MIN_THRESHOLD = min_motion
+        if fast_motion is not None:
+            app.MOTION_FAST_THRESHOLD = fast_motion
+        stats = {}
+        started = time.perf_counter()
+        keypoints = app.extract_keypoints(app.movenet_model, video_path, stats=stats)
+        seconds = time.perf_counter() - started
+        user = app.metrics_to_dict(app.compute_metrics_array(keypoints)[0])
+        scores = {name: app.calculate_scores_v5(app.get_golden_data(name), user, name) for name in exercises}
+        return keypoints, scores, stats, seconds
+
+    original = (app.ADAPTIVE_SAMPLING, app.POSE_TARGET_FPS, app.MOTION_MIN_THRESHOLD, app.MOTION_FAST_THRESHOLD)
+    try:
+        base_keypoints, base_scores, base_stats, base_seconds = run(False)
+        print(f"Baseline (every frame): {base_stats['frames_processed']} frames inferred, {base_seconds:.2f}s")
+        print(
+            f"{'target fps':>10} {'inferred':>9} {'time s':>7} {'speedup':>8} {'kp err':>7} "
+            + " ".join(f"{key.split()[0][:9]:>9}" for key in SCORE_KEYS)
+        )
+        for target_fps in target_fps_values:
+            keypoints, scores, stats, seconds = run(True, target_fps)
+            n = min(len(keypoints), len(base_keypoints))
+            confident = base_keypoints[:n, :, 2] >= app.MIN_CONFIDENCE
+            keypoint_error = float(np.abs(keypoints[:n, :, :2] - base_keypoints[:n, :, :2])[confident].mean())
+            # Mean absolute score change over exercises, per category
+            deltas = [
+                np.mean([abs(scores[name][key] - base_scores[name][key]) for name in exercises])
+                for key in SCORE_KEYS
+            ]
+            share = stats['frames_processed'] / max(base_stats['frames_processed'], 1)
+            print(
+                f"{target_fps:>10g} {share:>8.0%} {seconds:>7.2f} {base_seconds / seconds:>7.2f}x {keypoint_error:>7.4f} "
+                + " ".join(f"{delta:>9.2f}" for delta in deltas)
+            )
+        print("Score columns: mean |score - baseline score| over exercises; kp err: mean |dx,dy| of confident keypoints.")
+    finally:
+        app.ADAPTIVE_SAMPLING, app.POSE_TARGET_FPS, app.MOTION_MIN_THRESHOLD, app.MOTION_FAST_THRESHOLD = original
+
+
+def bench_roi_crop(video_path, batch_sizes, exercises=None, min_score=None):
+    """Compare ROI-cropped against full-frame MoveNet inference.
+
+    For each batch size (crops are shared within a batch; 1 is the
+    per-frame reference algorithm), reports the share of cropped frames
+    and full-frame fallbacks, extraction time, and how far keypoints
+    and calculate_scores_v5 outputs move from full-frame inference. On
+    real MoveNet the keypoint differences are the precision gained from
+    the crop, not an error. Set JOB_WORKERS=0 so app.py loads MoveNet
+    in this process.
+    """
+    import app
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet is not loaded in this process; run with JOB_WORKERS=0.")
+    exercises = exercises or app.get_available_exercises()
+
+    def run(roi_crop, batch_size):
+        app.ROI_CROP = roi_crop
+        if min_score is not None:
+            app.ROI_MIN_SCORE = min_score
+        stats = {}
+        started = time.perf_counter()
+        keypoints = app.extract_keypoints(app.movenet_model, video_path, batch_size=batch_size, stats=stats)
+        seconds = time.perf_counter() - started
+        user = app.metrics_to_dict(app.compute_metrics_array(keypoints)[0])
+        scores = {name: app.calculate_scores_v5(app.get_golden_data(name), user, name) for name in exercises}
+        return keypoints, scores, stats, seconds
+
+    original = (app.ROI_CROP, app.ROI_MIN_SCORE)
+    try:
+        base_keypoints, base_scores, _, base_seconds = run(False, None)
+        print(f"Baseline (full frame, batch {app.INFERENCE_BATCH_SIZE}): {len(base_keypoints)} frames, {base_seconds:.2f}s")
+        print(
+            f"{'batch':>5} {'cropped':>8} {'fallback':>8} {'time s':>7} {'kp diff':>8} "
+            + " ".join(f"{key.split()[0][:9]:>9}" for key in SCORE_KEYS)
+        )
+        for batch_size in batch_sizes:
+            keypoints, scores, stats, seconds = run(True, batch_size)
+            n = min(len(keypoints), len(base_keypoints))
+            confident = base_keypoints[:n, :, 2] >= app.MIN_CONFIDENCE
+            keypoint_diff = float(np.abs(keypoints[:n, :, :2] - base_keypoints[:n, :, :2])[confident].mean())
+            deltas = [
+                np.mean([abs(scores[name][key] - base_scores[name][key]) for name in exercises])
+                for key in SCORE_KEYS
+            ]
+            processed = max(stats['frames_processed'], 1)
+            print(
+                f"{batch_size:>5} {stats['roi_cropped'] / processed:>8.0%} {stats['roi_fallbacks'] / processed:>8.0%} "
+                f"{seconds:>7.2f} {keypoint_diff:>8.4f} "
+                + " ".join(f"{delta:>9.2f}" for delta in deltas)
+            )
+        print("Score columns: mean |score - full-frame score| over exercises; kp diff: mean |dx,dy| of confident keypoints.")
+    finally:
+        app.ROI_CROP, app.ROI_MIN_SCORE = original
+
+
+COLD_START_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+model = app.wait_for_movenet()
+ready = time.perf_counter()
+print("COLD_START " + json.dumps({
+    "imported": imported - started, "ready": ready - started,
+    "loaded": model is not None, "source": app.movenet_status["source"],
+}))
+"""
+
+
+def bench_cold_start(repeat, model_dir):
+    """Time app start-up with the local model bundle and with TF-Hub.
+
+    Each run is a fresh Python process importing app.py (JOB_WORKERS=0).
+    "serving" is when the import returns and Flask could serve requests;
+    "pose ready" is when MoveNet finished loading in the background.
+    Before background loading, the server only came up at "pose ready".
+    """
+    sources = {
+        'bundle': {'MOVENET_MODEL_DIR': model_dir, 'MOVENET_ALLOW_HUB': '0'},
+        'tf-hub': {'MOVENET_MODEL_DIR': os.path.join(model_dir, 'missing')},
+    }
+    print(f"{'source':<8} {'serving s':>10} {'pose ready s':>13}  loaded from")
+    for name, overrides in sources.items():
+        env = dict(os.environ, JOB_WORKERS='0', RESULT_CACHE_ENABLED='0', **overrides)
+        runs = []
+        for _ in range(repeat):
+            result = subprocess.run(
+                [sys.executable, '-c', COLD_START_SCRIPT], env=env, capture_output=True, text=True
+            )
+            lines = [line for line in result.stdout.splitlines() if line.startswith("COLD_START ")]
+            if not lines:
+                print(f"{name:<8} failed: {result.stderr.strip().splitlines()[-1:]}")
+                break
+            runs.append(json.loads(lines[-1][len("COLD_START "):]))
+        if not runs:
+            continue
+        if not all(run['loaded'] for run in runs):
+            print(f"{name:<8} MoveNet failed to load")
+            continue
+        print(
+            f"{name:<8} {statistics.median(r['imported'] for r in runs):>10.2f} "
+            f"{statistics.median(r['ready'] for r in runs):>13.2f}  {runs[-1]['source']}"
+        )
+
+
+BACKEND_SCRIPT = """
+import json, resource, sys, time
+import numpy as np
+import app
+video_path, keypoints_path, exercises = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+model = app.wait_for_movenet()
+if model is None:
+    print("BACKEND " + json.dumps({"error": app.movenet_status["error"]}))
+    sys.exit()
+app.extract_keypoints(model, video_path, stats={}, end_frame=app.INFERENCE_BATCH_SIZE)  # warm-up
+stats = {}
+started = time.perf_counter()
+keypoints = app.extract_keypoints(model, video_path, stats=stats)
+seconds = time.perf_counter() - started
+np.save(keypoints_path, keypoints)
+user = app.metrics_to_dict(app.compute_metrics_array(keypoints)[0])
+exercises = exercises or app.get_available_exercises()
+print("BACKEND " + json.dumps({
+    "processed": stats["frames_processed"], "seconds": seconds, "inference": stats["inference_seconds"],
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    "scores": {name: app.calculate_scores_v5(app.get_golden_data(name), user, name) for name in exercises},
+}))
+"""
+
+
+def bench_backends(video_path, threads, model_dir, exercises=None):
+    """Compare the MoveNet inference backends on one video.
+
+    Each backend (tf, then tflite float16 / int8 where a bundle exists
+    in `model_dir`) runs in a fresh process (JOB_WORKERS=0), so peak RSS
+    is per backend; app.py imports TensorFlow either way, so the RSS
+    difference is the model and its runtime only. Reports frames/sec of
+    extraction, peak RSS, and how far keypoints and calculate_scores_v5
+    outputs move from the tf backend.
+    """
+    from model_bundle import TFLITE_PRECISIONS, bundle_path
+    variant = os.environ.get("MOVENET_VARIANT", "thunder").lower()
+    backends = {'tf': {'MOVENET_BACKEND': 'tf'}}
+    for precision in TFLITE_PRECISIONS:
+        if os.path.isdir(bundle_path(model_dir, variant, precision)):
+            backends[f"tflite-{precision}"] = {'MOVENET_BACKEND': 'tflite', 'MOVENET_TFLITE_PRECISION': precision}
+        else:
+            print(f"Skipping tflite-{precision}: no bundle (fetch_movenet_model.py --tflite {precision}).")
+
+    print(
+        f"{'backend':<15} {'frames/s':>8} {'infer/s':>8} {'RSS MB':>7} {'kp diff':>8} {'conf diff':>9} "
+        + " ".join(f"{key.split()[0][:9]:>9}" for key in SCORE_KEYS)
+    )
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, overrides in backends.items():
+            keypoints_path = os.path.join(tmp, f"{name}.npy")
+            env = dict(
+                os.environ, JOB_WORKERS='0', RESULT_CACHE_ENABLED='0', MOVENET_MODEL_DIR=model_dir,
+                MOVENET_NUM_THREADS=str(threads or 0), **overrides
+            )
+            result = subprocess.run(
+                [sys.executable, '-c', BACKEND_SCRIPT, video_path, keypoints_path, json.dumps(exercises or [])],
+                env=env, capture_output=True, text=True
+            )
+            lines = [line for line in result.stdout.splitlines() if line.startswith("BACKEND ")]
+            run = json.loads(lines[-1][len("BACKEND "):]) if lines else None
+            if run is None or 'error' in run:
+                error = run['error'] if run else result.stderr.strip().splitlines()[-1:]
+                print(f"{name:<15} failed: {error}")
+                continue
+            keypoints = np.load(keypoints_path)
+            if reference is None:
+                reference = (keypoints, run['scores'])
+            base_keypoints, base_scores = reference
+            n = min(len(keypoints), len(base_keypoints))
+            keypoint_diff = float(np.abs(keypoints[:n, :, :2] - base_keypoints[:n, :, :2]).mean())
+            confidence_diff = float(np.abs(keypoints[:n, :, 2] - base_keypoints[:n, :, 2]).mean())
+            deltas = [
+                np.mean([abs(run['scores'][ex][key] - base_scores[ex][key]) for ex in run['scores']])
+                for key in SCORE_KEYS
+            ]
+            print(
+                f"{name:<15} {run['processed'] / run['seconds']:>8.1f} "
+                f"{run['processed'] / max(run['inference'], 1e-9):>8.1f} {run['rss_mb']:>7.0f} "
+                f"{keypoint_diff:>8.4f} {confidence_diff:>9.4f} "
+                + " ".join(f"{delta:>9.2f}" for delta in deltas)
+            )
+    print(
+        "frames/s: end-to-end extraction; infer/s: MoveNet only. Diff columns are against tf: "
+        "mean |dx,dy| and |score| of keypoints, mean |score - tf score| over exercises."
+    )
+
+
+def bench_micro_batching(video_path, client_counts, max_batch, max_wait_ms):
+    """Concurrent analyses with and without the shared inference service.
+
+    For each client count, that many threads extract keypoints of the
+    same video at once, first each calling MoveNet directly, then
+    through one InferenceService. Reports total frames/sec, the median
+    per-analysis wall time, the service's batch fill ratio and request
+    latency percentiles, and whether keypoints are identical. Set
+    JOB_WORKERS=0 so app.py loads MoveNet in this process.
+    """
+    import threading
+    import app
+    from inference_service import InferenceService
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet is not loaded in this process; run with JOB_WORKERS=0.")
+    model = app.movenet_model
+    expected = app.extract_keypoints(model, video_path)
+
+    def run(clients, service):
+        results, seconds = [None] * clients, [0.0] * clients
+
+        def client(i):
+            started = time.perf_counter()
+            if service is None:
+                results[i] = app.extract_keypoints(model, video_path)
+            else:
+                with service.session():
+                    results[i] = app.extract_keypoints(service, video_path)
+            seconds[i] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        same = all(np.array_equal(result, expected) for result in results)
+        return len(expected) * clients / wall, statistics.median(seconds), same
+
+    print(f"Micro-batching: max batch {max_batch}, max wait {max_wait_ms} ms, {len(expected)} frames per analysis")
+    print(
+        f"{'clients':>7} {'direct fps':>10} {'service fps':>11} {'direct s':>8} {'service s':>9} "
+        f"{'fill':>5} {'p50 ms':>7} {'p99 ms':>7} {'same':>5}"
+    )
+    for clients in client_counts:
+        direct_fps, direct_seconds, direct_same = run(clients, None)
+        service = InferenceService(model, max_batch_size=max_batch, max_wait_ms=max_wait_ms)
+        try:
+            service_fps, service_seconds, service_same = run(clients, service)
+            stats = service.stats()
+        finally:
+            service.close()
+        print(
+            f"{clients:>7} {direct_fps:>10.1f} {service_fps:>11.1f} {direct_seconds:>8.2f} {service_seconds:>9.2f} "
+            f"{stats['fill_ratio']:>5.0%} {stats['latency_ms']['p50']:>7.1f} {stats['latency_ms']['p99']:>7.1f} "
+            f"{str(direct_same and service_same):>5}"
+        )
+    print("fps: total frames/sec over all clients; s: median wall time of one analysis; "
+          "p50/p99: service request latency (queue wait + inference).")
+
+
+# --- live: live sessions driven by a scripted camera ---
+
+def bench_live(video_path, exercise, batch_size, step, limit, replays):
+    """Drive a live session with a scripted frame source instead of a camera.
+
+    First replays each golden clip's metric rows `replays` times through
+    a LiveSession (no pose inference), comparing the reps it counts
+    with `replays` x the golden clip's own reps. Then plays `video_path`
+    through the /live/sessions endpoints as JPEG frames and reports the
+    per-request latency, frames dropped over the budget and reps.
+    Set JOB_WORKERS=0 to keep job workers out of the run.
+    """
+    import cv2
+    import app
+    from live_session import LiveSession, ScriptedFrameSource
+
+    print(f"Golden replay: each clip played {replays} times")
+    print(f"{'exercise':<30} {'golden reps':>11} {'expected':>8} {'counted':>7} {'avg score':>9} {'ms/frame':>8}")
+    for name in app.get_available_exercises():
+        golden = app.get_golden_data(name)
+        if golden.rep_model is None:
+            print(f"{name[:30]:<30} {'-':>11} {'-':>8} {'-':>7} {'-':>9} {'-':>8}  (too few valid frames)")
+            continue
+        rows = np.concatenate([golden.metrics] * replays)
+        template = golden.rep_template
+        session = LiveSession(
+            'replay', name, golden.rep_model,
+            pose_metrics=lambda indices: rows[list(indices)],
+            to_tracks=app.metrics_to_dict,
+            score_rep=lambda tracks, template=template, name=name: app.calculate_scores_v5(template, tracks, name),
+            max_frames=app.LIVE_MAX_FRAMES, max_rep_frames=app.LIVE_MAX_REP_FRAMES, frame_budget_ms=0,
+        )
+        started = time.perf_counter()
+        for batch in ScriptedFrameSource(frames=range(len(rows))).batches(batch_size):
+            update = session.process(batch)
+        ms_per_frame = (time.perf_counter() - started) * 1000 / len(rows)
+        avg = update['avg_rep_score']
+        print(
+            f"{name[:30]:<30} {len(golden.rep_model.reps):>11} {len(golden.rep_model.reps) * replays:>8} "
+            f"{update['reps']:>7} {avg if avg is not None else '-':>9} {ms_per_frame:>8.2f}"
+        )
+
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet could not be loaded in this process.")
+    client = app.app.test_client()
+    response = client.post('/live/sessions', json={'exercise_name': exercise})
+    if response.status_code != 201:
+        raise SystemExit(f"Cannot open a live session: {response.get_json()}")
+    session_id = response.get_json()['session_id']
+    latencies = []
+    for batch in ScriptedFrameSource(video_path=video_path, step=step, limit=limit).batches(batch_size):
+        files = [
+            (io.BytesIO(cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))[1].tobytes()), 'frame.jpg')
+            for frame in batch
+        ]
+        started = time.perf_counter()
+        response = client.post(
+            f'/live/sessions/{session_id}/frames', data={'frame': files}, content_type='multipart/form-data'
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise SystemExit(f"Frame request failed: {response.get_json()}")
+    summary = client.delete(f'/live/sessions/{session_id}').get_json()
+    print(f"\nLive session over HTTP: {os.path.basename(video_path)}, exercise '{exercise}', "
+          f"{batch_size} frame(s) per request, budget {app.LIVE_FRAME_BUDGET_MS:g} ms")
+    print(f"  requests {len(latencies)}, frames {summary['frames_received']} "
+          f"({summary['frames_processed']} processed, {summary['frames_dropped']} dropped, "
+          f"{summary['valid_frames']} valid)")
+    print(f"  request latency p50 {np.percentile(latencies, 50):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms, "
+          f"pose cost {summary['frame_cost_ms']} ms/frame")
+    print(f"  reps {summary['reps']}, average score {summary['avg_rep_score']}")
+
+
+# --- suite: end-to-end pipeline benchmark with JSON results ---
+
+DEFAULT_VIDEO_DIR = "video test"
+
+def _default_video():
+    names = sorted(n for n in os.listdir(DEFAULT_VIDEO_DIR) if n.lower().endswith(('.mp4', '.mov', '.webm')))
+    if not names:
+        raise SystemExit(f"No video in '{DEFAULT_VIDEO_DIR}/'; pass --video.")
+    return os.path.join(DEFAULT_VIDEO_DIR, names[0])
+
+
+def synthetic_keypoints(keypoints, n_frames, seed=0):
+    """Time-resample a (T, 17, 3) keypoint track to n_frames, with slight jitter.
+
+    Gives realistic poses at any sequence length for the metrics and
+    DTW stages.
+    """
+    rng = np.random.default_rng(seed)
+    source = np.linspace(0, len(keypoints) - 1, n_frames)
+    flat = keypoints.reshape(len(keypoints), -1)
+    resampled = np.stack(
+        [np.interp(source, np.arange(len(keypoints)), flat[:, i]) for i in range(flat.shape[1])], axis=1
+    ).reshape(n_frames, 17, 3).astype(np.float32)
+    resampled[..., :2] += rng.normal(0, 0.002, size=resampled[..., :2].shape).astype(np.float32)
+    return resampled
+
+
+def _peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_suite(video_path, synthetic_lengths, e2e_repeat, repeat):
+    """Run every pipeline stage once on the clip and on synthetic tracks.
+
+    Offline: Gemini is stubbed (LLM_BACKEND=stub) and the result cache
+    is off. Returns a JSON-serializable dict; lower is better for
+    *_ms / *_seconds / *_mb values, higher for *_fps.
+    """
+    os.environ.setdefault("JOB_WORKERS", "0")
+    os.environ.setdefault("LLM_BACKEND", "stub")
+    os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+    import platform
+    import app
+    if app.wait_for_movenet() is None:
+        raise SystemExit("MoveNet is not loaded in this process; run with JOB_WORKERS=0.")
+    exercises = app.get_available_exercises()
+    results = {}
+
+    # Decode / inference / metrics on the clip, through the real pipeline
+    stats = {}
+    keypoints = app.extract_keypoints(app.movenet_model, video_path, stats=stats)
+    app.keypoints_to_metrics(keypoints, stats=stats)
+    processed = stats['frames_processed']
+    results['pipeline'] = {
+        'frames_decoded': stats['frames_decoded'],
+        'frames_processed': processed,
+        'decode_fps': stats['frames_decoded'] / max(stats['decode_seconds'], 1e-9),
+        'inference_fps': processed / max(stats['inference_seconds'], 1e-9),
+        'metrics_fps': len(keypoints) / max(stats['metrics_seconds'], 1e-9),
+        'wall_seconds': stats['wall_seconds'],
+    }
+
+    # Scoring (DTW) of the clip against every exercise
+    user = app.metrics_to_dict(app.compute_metrics_array(keypoints)[0])
+    per_exercise = {
+        name: _median_seconds(lambda: app.calculate_scores_v5(app.get_golden_data(name), user, name), repeat) * 1000
+        for name in exercises
+    }
+    results['scoring'] = {'exercises': per_exercise, 'total_ms': sum(per_exercise.values())}
+
+    # Metrics and scoring on synthetic tracks of several lengths
+    results['synthetic'] = {}
+    for n_frames in synthetic_lengths:
+        track = synthetic_keypoints(keypoints, n_frames)
+        metrics_seconds = _median_seconds(lambda: app.compute_metrics_array(track), repeat)
+        synthetic_user = app.metrics_to_dict(app.compute_metrics_array(track)[0])
+        scoring_seconds = _median_seconds(
+            lambda: [app.calculate_scores_v5(app.get_golden_data(name), synthetic_user, name) for name in exercises],
+            repeat
+        )
+        rep_scoring_seconds = _median_seconds(
+            lambda: [app.calculate_rep_scores(app.get_golden_data(name), synthetic_user, name) for name in exercises],
+            repeat
+        )
+        results['synthetic'][str(n_frames)] = {
+            'metrics_fps': n_frames / max(metrics_seconds, 1e-9),
+            'scoring_all_exercises_ms': scoring_seconds * 1000,
+            'rep_scoring_all_exercises_ms': rep_scoring_seconds * 1000,
+        }
+
+    # Golden-data load: a fresh store (parse every row) vs cached lookups
+    def cold_load():
+        store = app.GoldenStore(app.DB_NAME)
+        for name in exercises:
+            store.get(name)
+
+    def warm_load():
+        for name in exercises:
+            app.get_golden_data(name)
+
+    results['golden_load'] = {
+        'exercises': len(exercises),
+        'cold_ms': _median_seconds(cold_load, repeat) * 1000,
+        'warm_ms': _median_seconds(warm_load, repeat) * 1000,
+    }
+
+    # End to end through Flask: upload, stream events, final result
+    original_cache, app.result_cache = app.result_cache, None
+    try:
+        client = app.app.test_client()
+        runs = []
+        for _ in range(e2e_repeat):
+            with open(video_path, 'rb') as f:
+                started = time.perf_counter()
+                response = client.post(
+                    '/analyze-form',
+                    data={'exercise_name': exercises[0], 'video': (f, os.path.basename(video_path))},
+                    buffered=False
+                )
+                first_event = None
+                events = []
+                for line in response.response:
+                    if first_event is None:
+                        first_event = time.perf_counter() - started
+                    events.extend(json.loads(part) for part in line.decode().splitlines() if part.strip())
+                total = time.perf_counter() - started
+            if not events or events[-1].get('status') != 'complete':
+                raise SystemExit(f"/analyze-form did not complete: {events[-1:] }")
+            runs.append({'seconds': total, 'first_event_seconds': first_event})
+    finally:
+        app.result_cache = original_cache
+    results['end_to_end'] = {
+        'exercise': exercises[0],
+        'median_seconds': statistics.median(run['seconds'] for run in runs),
+        'first_event_seconds': statistics.median(run['first_event_seconds'] for run in runs),
+        'runs': len(runs),
+    }
+
+    results['peak_rss_mb'] = _peak_rss_mb()
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'video': video_path,
+            'pose_config': app.pose_config_tag(),
+            'llm_backend': app.LLM_BACKEND,
+        },
+        'results': results,
+    }
+
+
+def _flatten(values, prefix=''):
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare_results(baseline, current, threshold):
+    """Return [(metric, baseline, current, change)] of regressions beyond `threshold`."""
+    before, after = _flatten(baseline['results']), _flatten(current['results'])
+    regressions = []
+    for name in sorted(set(before) & set(after)):
+        if name.endswith('_fps'):
+            higher_is_better = True
+        elif name.endswith(('_ms', '_seconds', '_mb')):
+            higher_is_better = False
+        else:
+            continue
+        if before[name] <= 0:
+            continue
+        change = (after[name] - before[name]) / before[name]
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append((name, before[name], after[name], change))
+    return regressions
+
+
+def run_suite(video_path, output, compare, threshold, synthetic_lengths, e2e_repeat, repeat):
+    report = bench_suite(video_path or _default_video(), synthetic_lengths, e2e_repeat, repeat)
+    results = report['results']
+    pipeline = results['pipeline']
+    print(f"\nSuite on {report['meta']['video']} ({report['meta']['pose_config']})")
+    print(
+        f"  pipeline:    decode {pipeline['decode_fps']:.1f} fps, inference {pipeline['inference_fps']:.1f} fps, "
+        f"metrics {pipeline['metrics_fps']:.0f} fps, wall {pipeline['wall_seconds']:.2f}s"
+    )
+    print(f"  scoring:     {results['scoring']['total_ms']:.1f} ms over {len(results['scoring']['exercises'])} exercises")
+    for n_frames, r in results['synthetic'].items():
+        print(f"  synthetic {n_frames:>5}: metrics {r['metrics_fps']:.0f} fps, scoring {r['scoring_all_exercises_ms']:.1f} ms")
+    golden = results['golden_load']
+    print(f"  golden load: cold {golden['cold_ms']:.1f} ms, warm {golden['warm_ms']:.2f} ms")
+    e2e = results['end_to_end']
+    print(f"  end to end:  {e2e['median_seconds']:.2f}s (first event {e2e['first_event_seconds'] * 1000:.0f} ms)")
+    print(f"  peak RSS:    {results['peak_rss_mb']:.0f} MB")
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {output}")
+    if compare:
+        with open(compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, threshold)
+        print(f"Compared with {compare} (commit {baseline['meta'].get('commit')}, threshold {threshold:.0%}):")
+        for name, before, after, change in regressions:
+            print(f"  REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.0%})")
+        if regressions:
+            raise SystemExit(1)
+        print("  no regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Form-analysis pipeline benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    golden = sub.add_parser("golden-load", help="JSON vs binary golden sequence load time and size")
+    golden.add_argument("--db", default="correct_movement.db")
+    golden.add_argument("--repeat", type=int, default=20)
+
+    parity = sub.add_parser("dtw-parity", help="check dtw_engine against dtw-python on golden data")
+    parity.add_argument("--db", default="correct_movement.db")
+
+    scoring = sub.add_parser("scoring", help="per-metric vs batched multi-metric DTW per exercise")
+    scoring.add_argument("--repeat", type=int, default=5)
+
+    lb = sub.add_parser("lb-prefilter", help="DTW lower-bound prefilter parity and timing")
+    lb.add_argument("--repeat", type=int, default=3)
+
+    reps = sub.add_parser("rep-scoring", help="whole-clip vs per-rep DTW scoring of long uploads")
+    reps.add_argument("--replays", type=int, default=4, help="times each golden clip is played per upload")
+    reps.add_argument("--repeat", type=int, default=3)
+
+    shards = sub.add_parser("video-shards", help="sequential vs sharded keypoint extraction of one video")
+    shards.add_argument("video")
+    shards.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    shards.add_argument("--shard-frames", type=int, default=600)
+
+    adaptive = sub.add_parser("adaptive-sampling", help="accuracy vs speed of adaptive frame sampling on one video")
+    adaptive.add_argument("video")
+    adaptive.add_argument("--target-fps", type=float, nargs="+", default=[5, 10, 15, 20])
+    adaptive.add_argument("--exercise", action="append", help="exercise to score (default: all)")
+    adaptive.add_argument("--min-motion", type=float)
+    adaptive.add_argument("--fast-motion", type=float)
+
+    roi = sub.add_parser("roi-crop", help="ROI-cropped vs full-frame MoveNet inference on one video")
+    roi.add_argument("video")
+    roi.add_argument("--batch-size", type=int, nargs="+", default=[1, 8])
+    roi.add_argument("--exercise", action="append", help="exercise to score (default: all)")
+    roi.add_argument("--min-score", type=float)
+
+    cold = sub.add_parser("cold-start", help="app start-up time with the local model bundle vs TF-Hub")
+    cold.add_argument("--repeat", type=int, default=3)
+    cold.add_argument("--model-dir", default=os.environ.get("MOVENET_MODEL_DIR", "models"))
+
+    backends = sub.add_parser("backends", help="tf vs TFLite (float16 / int8) MoveNet: speed, RSS and parity")
+    backends.add_argument("video")
+    backends.add_argument("--threads", type=int, help="MOVENET_NUM_THREADS for every backend (default: runtime's)")
+    backends.add_argument("--model-dir", default=os.environ.get("MOVENET_MODEL_DIR", "models"))
+    backends.add_argument("--exercise", action="append", help="exercise to score (default: all)")
+
+    micro = sub.add_parser("micro-batching", help="concurrent analyses with and without the shared inference service")
+    micro.add_argument("video")
+    micro.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4])
+    micro.add_argument("--max-batch", type=int, default=32)
+    micro.add_argument("--max-wait-ms", type=float, default=5.0)
+
+    live = sub.add_parser("live", help="live sessions fed by a scripted camera: rep counting and latency")
+    live.add_argument("video")
+    live.add_argument("--exercise", help="exercise of the HTTP session (default: the first one)")
+    live.add_argument("--batch-size", type=int, default=1, help="frames per request")
+    live.add_argument("--step", type=int, default=2, help="play every n-th video frame")
+    live.add_argument("--limit", type=int, default=200, help="most frames to play")
+    live.add_argument("--replays", type=int, default=3, help="times each golden clip is replayed")
+
+    suite = sub.add_parser("suite", help="end-to-end pipeline benchmark, saved as JSON and compared across runs")
+    suite.add_argument("--video", help=f"clip to analyze (default: first video in '{DEFAULT_VIDEO_DIR}/')")
+    suite.add_argument("--output", help="write the results to this JSON file")
+    suite.add_argument("--compare", help="earlier results JSON; exit 1 if any metric regressed")
+    suite.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    suite.add_argument("--synthetic-frames", type=int, nargs="+", default=[150, 600, 2400])
+    suite.add_argument("--e2e-repeat", type=int, default=3)
+    suite.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "golden-load":
+        bench_golden_load(args.db, args.repeat)
+    elif args.command == "dtw-parity":
+        bench_dtw_parity(args.db)
+    elif args.command == "scoring":
+        bench_scoring(args.repeat)
+    elif args.command == "lb-prefilter":
+        bench_lb_prefilter(args.repeat)
+    elif args.command == "rep-scoring":
+        bench_rep_scoring(args.replays, args.repeat)
+    elif args.command == "video-shards":
+        bench_video_shards(args.video, args.workers, args.shard_frames)
+    elif args.command == "adaptive-sampling":
+        bench_adaptive_sampling(args.video, args.target_fps, args.exercise, args.min_motion, args.fast_motion)
+    elif args.command == "roi-crop":
+        bench_roi_crop(args.video, args.batch_size, args.exercise, args.min_score)
+    elif args.command == "cold-start":
+        bench_cold_start(args.repeat, args.model_dir)
+    elif args.command == "backends":
+        bench_backends(args.video, args.threads, args.model_dir, args.exercise)
+    elif args.command == "micro-batching":
+        bench_micro_batching(args.video, args.clients, args.max_batch, args.max_wait_ms)
+    elif args.command == "live":
+        import app
+        exercise = args.exercise or app.get_available_exercises()[0]
+        bench_live(args.video, exercise, args.batch_size, args.step, args.limit, args.replays)
+    elif args.command == "suite":
+        run_suite(
+            args.video, args.output, args.compare, args.threshold,
+            args.synthetic_frames, args.e2e_repeat, args.repeat
+        )
+
+
+if __name__ == "__main__":
+    main()
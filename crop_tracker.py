@@ -0,0 +1,155 @@
+"""Region-of-interest cropping for MoveNet.
+
+Follows the "crop region" algorithm of the MoveNet reference code: the
+keypoints of the previous frame give a square crop around the body
+(centered on the hips, sized from the torso and body extent), and the
+next frame is inferred on that crop only, which gives the lifter far
+more of the model's 256x256 input than letterboxing the whole frame.
+When the torso is not confidently visible, the tracker falls back to
+the full frame.
+
+Keypoints are always returned in the coordinates the full-frame path
+uses: normalized to the frame letterboxed into a square (as
+`tf.image.resize_with_pad` does), so metrics do not depend on whether a
+frame was cropped. Only the model input is sampled from the frame and
+converted from BGR to RGB.
+
+This module only depends on NumPy and OpenCV.
+"""
+import cv2
+import numpy as np
+
+# Keypoint indices (MoveNet order)
+SHOULDERS = (5, 6)
+HIPS = (11, 12)
+TORSO = SHOULDERS + HIPS
+
+# Expansion of the torso / whole body extent around the hip center
+TORSO_EXPANSION = 1.9
+BODY_EXPANSION = 1.2
+
+
+def full_frame_region(height, width):
+    """Return the (y0, x0, length) pixel square that letterboxes the frame."""
+    length = max(height, width)
+    return ((height - length) / 2.0, (width - length) / 2.0, float(length))
+
+
+def torso_visible(keypoints, min_score):
+    """True if a hip and a shoulder are detected with at least `min_score`."""
+    scores = keypoints[:, 2]
+    return bool(
+        max(scores[HIPS[0]], scores[HIPS[1]]) > min_score
+        and max(scores[SHOULDERS[0]], scores[SHOULDERS[1]]) > min_score
+    )
+
+
+def to_pixels(keypoints, height, width):
+    """Map letterbox-normalized (y, x) keypoints to frame pixels, shape (17, 2)."""
+    y0, x0, length = full_frame_region(height, width)
+    return keypoints[:, :2] * length + (y0, x0)
+
+
+def crop_region(keypoints, height, width, min_score):
+    """Return the crop (y0, x0, length) for the next frame.
+
+    `keypoints` is the (17, 3) pose of the previous frame in letterbox
+    coordinates. Falls back to the full frame when the torso is not
+    visible or the crop would be larger than the frame.
+    """
+    if not torso_visible(keypoints, min_score):
+        return full_frame_region(height, width)
+
+    points = to_pixels(keypoints, height, width)
+    center = points[list(HIPS)].mean(axis=0)
+    torso_range = np.abs(points[list(TORSO)] - center).max()
+    visible = keypoints[:, 2] > min_score
+    body_range = np.abs(points[visible] - center).max()
+
+    half = max(torso_range * TORSO_EXPANSION, body_range * BODY_EXPANSION)
+    # No larger than the distance from the center to the farthest edge
+    half = min(half, max(center[1], width - center[1], center[0], height - center[0]))
+    if half > max(height, width) / 2.0 or half <= 0:
+        return full_frame_region(height, width)
+    return (center[0] - half, center[1] - half, 2.0 * half)
+
+
+def crop_frame(frame_bgr, region, size):
+    """Cut `region` out of a BGR frame as a (size, size, 3) RGB uint8 image.
+
+    Parts of the region outside the frame are black, like the padding
+    of a letterboxed frame. The crop is resampled straight from the
+    frame (bilinear, pixel centers aligned as in `tf.image.resize`), so
+    only the output pixels are computed and color converted.
+    """
+    y0, x0, length = region
+    scale = size / length
+    transform = np.float32([
+        [scale, 0, scale * (0.5 - x0) - 0.5],
+        [0, scale, scale * (0.5 - y0) - 0.5],
+    ])
+    crop = cv2.warpAffine(
+        frame_bgr, transform, (size, size), flags=cv2.INTER_LINEAR,
+        borderMode=cv2.BORDER_CONSTANT, borderValue=0
+    )
+    return cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+
+
+def from_crop(keypoints, region, height, width):
+    """Map (N, 17, 3) crop-normalized keypoints back to letterbox coordinates."""
+    y0, x0, length = region
+    fy0, fx0, flength = full_frame_region(height, width)
+    mapped = np.array(keypoints, dtype=np.float32, copy=True)
+    mapped[..., 0] = (y0 + keypoints[..., 0] * length - fy0) / flength
+    mapped[..., 1] = (x0 + keypoints[..., 1] * length - fx0) / flength
+    return mapped
+
+
+class CropTracker:
+    """Tracks the lifter across frames and runs MoveNet on crops.
+
+    `track(frames, infer)` takes a batch of consecutive sampled BGR
+    frames and a function running MoveNet on a list of (size, size, 3)
+    RGB images. The batch shares the crop computed from the last pose
+    of the previous batch (with a batch size of 1 this is the per-frame
+    reference algorithm). Frames whose torso is lost inside the crop
+    are inferred again on the full frame.
+    """
+
+    def __init__(self, input_size, min_score=0.2):
+        self.input_size = input_size
+        self.min_score = min_score
+        self._last_keypoints = None
+        self.cropped = 0
+        self.full_frame = 0
+        self.fallbacks = 0
+
+    def reset(self):
+        """Forget the last pose, so the next frame is inferred uncropped."""
+        self._last_keypoints = None
+
+    def track(self, frames, infer):
+        """Return (len(frames), 17, 3) keypoints in letterbox coordinates."""
+        if not frames:
+            return np.zeros((0, 17, 3), dtype=np.float32)
+        height, width = frames[0].shape[:2]
+        full = full_frame_region(height, width)
+        region = full
+        if self._last_keypoints is not None:
+            region = crop_region(self._last_keypoints, height, width, self.min_score)
+
+        keypoints = from_crop(
+            infer([crop_frame(f, region, self.input_size) for f in frames]), region, height, width
+        )
+        if region == full:
+            self.full_frame += len(frames)
+        else:
+            self.cropped += len(frames)
+            lost = [i for i, kp in enumerate(keypoints) if not torso_visible(kp, self.min_score)]
+            if lost:
+                self.fallbacks += len(lost)
+                retry = infer([crop_frame(frames[i], full, self.input_size) for i in lost])
+                keypoints[lost] = from_crop(retry, full, height, width)
+
+        self._last_keypoints = keypoints[-1]
+        return keypoints
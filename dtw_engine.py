@@ -0,0 +1,219 @@
+"""DTW engine used for form scoring.
+
+Computes the same normalized distance as `dtw-python`'s
+`dtw(x, y).normalizedDistance` with the default settings (Euclidean
+local cost, symmetric2 step pattern, N+M normalization), but:
+
+* keeps a single rolling row of the accumulated cost matrix, so memory
+  is O(N + M) instead of O(N*M);
+* computes the local costs of 64 rows at a time, then each row with a
+  handful of vectorized NumPy operations (the in-row dependency is
+  solved as a min-plus prefix scan); rows run over the shorter sequence,
+  so the Python loop has min(N, M) iterations;
+* supports Sakoe-Chiba and Itakura windows (same definitions as
+  dtw-python's `sakoeChibaWindow` / `itakuraWindow`), computing only
+  the cells inside the window;
+* can abandon early once the distance is guaranteed to exceed a cutoff;
+* scores several same-shaped pairs at once (dtw_distance_batch), so the
+  per-row overhead is shared across metrics;
+* provides an LB_Kim + LB_Keogh lower bound (dtw_lower_bound) for
+  prefiltering against fixed reference tracks.
+"""
+import numpy as np
+
+WINDOW_TYPES = (None, 'sakoechiba', 'itakura')
+# Rows whose local costs are computed together
+_BLOCK_ROWS = 64
+
+
+def _row_window(row, n_cols, n, m, swapped, window_type, window_size):
+    """Return the [first, last] column range of a row inside the window.
+
+    Both supported windows are convex, so each row's cells form one
+    contiguous range; an empty row gives first > last. The Itakura
+    bounds are dtw-python's `itakuraWindow` conditions solved for the
+    column index.
+    """
+    if window_type is None:
+        return 0, n_cols - 1
+    if window_type == 'sakoechiba':
+        return max(0, row - window_size), min(n_cols - 1, row + window_size)
+
+    if not swapped:
+        # Row is i (query), columns are j (reference).
+        i = row
+        first = max(0, -((1 - i) // 2), m - 2 * n + 2 * i + 1)
+        last = min(n_cols - 1, 2 * i, (i - n + 2 * m) // 2)
+    else:
+        # Row is j (reference), columns are i (query).
+        j = row
+        first = max(0, -(-j // 2), n - 2 * m + 2 * j)
+        last = min(n_cols - 1, 2 * j + 1, (j - m + 2 * n - 1) // 2)
+    return first, last
+
+
+def _as_2d(track):
+    track = np.asarray(track, dtype=np.float64)
+    return track.reshape(len(track), -1)
+
+
+def dtw_distance(x, y, window_type=None, window_size=None, cutoff=None):
+    """Return the normalized DTW distance between two sequences.
+
+    `x` plays the role of dtw-python's query and `y` of its reference
+    (this only matters for the Itakura window). `window_size` is the
+    Sakoe-Chiba band half-width in frames. If `cutoff` is given, inf is
+    returned for any distance above it, and computation stops as soon
+    as that is guaranteed. inf is also returned when the window leaves
+    no warping path.
+    """
+    x = _as_2d(x)
+    y = _as_2d(y)
+    return float(dtw_distance_batch(x[None], y[None], window_type, window_size, cutoff)[0])
+
+
+def _local_costs(rows, cols):
+    """Return the (K, R, C) Euclidean costs between (K, R, D) rows and (K, C, D) columns."""
+    total = None
+    for d in range(rows.shape[2]):
+        diff = rows[:, :, None, d] - cols[:, None, :, d]
+        diff *= diff
+        total = diff if total is None else np.add(total, diff, out=total)
+    return np.sqrt(total, out=total)
+
+
+def dtw_distance_batch(xs, ys, window_type=None, window_size=None, cutoff=None):
+    """Return the normalized DTW distances of K sequence pairs at once.
+
+    `xs` has shape (K, N, D) and `ys` shape (K, M, D); pair k is
+    (xs[k], ys[k]). All pairs share N and M, so every row of the K cost
+    matrices is computed by the same vectorized operations, which
+    amortizes the per-row overhead. `cutoff` may be a scalar or a (K,)
+    array; see dtw_distance for the other arguments.
+    """
+    if window_type not in WINDOW_TYPES:
+        raise ValueError(f"Unknown DTW window type: {window_type!r}")
+    if window_type == 'sakoechiba' and window_size is None:
+        raise ValueError("Sakoe-Chiba window needs a window_size.")
+
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    k, n, m = len(xs), xs.shape[1], ys.shape[1]
+    if n == 0 or m == 0:
+        return np.full(k, np.inf)
+
+    # Iterate rows over the shorter sequence: the loop, not the row
+    # length, dominates the cost. symmetric2 is symmetric, so only the
+    # window needs to know the original orientation.
+    swapped = m < n
+    row_seq, col_seq = (ys, xs) if swapped else (xs, ys)
+    n_rows, n_cols = row_seq.shape[1], col_seq.shape[1]
+
+    abandon_at = None
+    if cutoff is not None:
+        abandon_at = np.broadcast_to(np.asarray(cutoff, dtype=np.float64), (k,)) * (n + m)
+
+    # Previous row, shifted by one: prev[:, j + 1] holds D[r - 1, j] and
+    # prev[:, 0] is an inf sentinel for the diagonal step into column 0.
+    prev = np.full((k, n_cols + 1), np.inf)
+    cur = np.full((k, n_cols + 1), np.inf)
+    scratch = np.empty((k, n_cols))
+    for block_start in range(0, n_rows, _BLOCK_ROWS):
+        block_rows = range(block_start, min(n_rows, block_start + _BLOCK_ROWS))
+        spans = [_row_window(r, n_cols, n, m, swapped, window_type, window_size) for r in block_rows]
+        if any(first > last for first, last in spans):
+            return np.full(k, np.inf)
+        # Local costs of every in-window cell of the block at once, with
+        # their running sums along each row (C) and C minus the cell (C').
+        lo, hi = min(first for first, _ in spans), max(last for _, last in spans) + 1
+        cost = _local_costs(row_seq[:, block_rows.start:block_rows.stop], col_seq[:, lo:hi])
+        cumulative = np.cumsum(cost, axis=2)
+        preceding = cumulative - cost
+
+        for offset, (r, (first, last)) in enumerate(zip(block_rows, spans)):
+            a, b = first - lo, last + 1 - lo
+            buf = scratch[:, :last + 1 - first]
+            # D[j] = min(D[r-1, j-1] + 2c[j], D[r-1, j] + c[j], D[j-1] + c[j])
+            # is solved as a min-plus prefix scan:
+            # D[j] = C[j] + min_{l<=j}(min(D[r-1, l-1] + c[l], D[r-1, l]) - C'[l]).
+            # Shifting C and C' by a constant does not change D, so block
+            # sums can be used as they are.
+            if r == 0:
+                buf.fill(np.inf)
+                if first == 0:
+                    buf[:, 0] = -preceding[:, offset, a]
+            else:
+                np.add(prev[:, first:last + 1], cost[:, offset, a:b], out=buf)
+                np.minimum(buf, prev[:, first + 1:last + 2], out=buf)
+                buf -= preceding[:, offset, a:b]
+            np.minimum.accumulate(buf, axis=1, out=buf)
+            if window_type is not None:
+                cur.fill(np.inf)
+            row = cur[:, first + 1:last + 2]
+            np.add(buf, cumulative[:, offset, a:b], out=row)
+            prev, cur = cur, prev
+
+            # Every warping path crosses every row and costs never decrease
+            # along a path, so the row minimum bounds the final distance.
+            if abandon_at is not None and np.all(row.min(axis=1) > abandon_at):
+                return np.full(k, np.inf)
+
+    distances = prev[:, n_cols] / (n + m)
+    if cutoff is not None:
+        distances[distances > abandon_at / (n + m)] = np.inf
+    return distances
+
+
+def envelope(track, radius=None):
+    """Return the (lower, upper) envelope of a track for LB_Keogh.
+
+    With radius None the envelope is the track's global min/max, shape
+    (1, D), which bounds every window. Otherwise row j is the min/max of
+    track[j - radius : j + radius + 1] (a Sakoe-Chiba band of that
+    radius), for j in [0, N + radius).
+    """
+    track = _as_2d(track)
+    if radius is None:
+        return track.min(axis=0, keepdims=True), track.max(axis=0, keepdims=True)
+
+    # Edge padding never changes a clipped window's min/max, since the
+    # clipped window always contains the replicated edge frame.
+    padded = np.pad(track, ((radius, 2 * radius), (0, 0)), mode='edge')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * radius + 1, axis=0)[:len(track) + radius]
+    return windows.min(axis=-1), windows.max(axis=-1)
+
+
+def lb_keogh(query, lower, upper):
+    """Return, per query frame, its distance to the envelope box (LB_Keogh)."""
+    query = _as_2d(query)
+    if len(lower) > 1:
+        lower, upper = lower[:len(query)], upper[:len(query)]
+    gap = np.maximum(lower - query, 0) + np.maximum(query - upper, 0)
+    return np.sqrt(np.einsum('ij,ij->i', gap, gap))
+
+
+def dtw_lower_bound(x, y, x_envelope=None, y_envelope=None):
+    """Return a lower bound on dtw_distance(x, y).
+
+    Every step of a symmetric2 warping path enters a new row, a new
+    column, or both (a diagonal step, which weighs 2), so
+
+        D >= c(0, 0) + sum_{j>=1} min_i c(i, j) + sum_{i>=1} min_j c(i, j).
+
+    The first term is exact (LB_Kim); the column and row minima are
+    bounded with LB_Keogh against `x_envelope` and `y_envelope`. Global
+    envelopes (the default) are valid for every window; banded ones
+    (see `envelope`) are tighter and valid for a Sakoe-Chiba band of
+    the same radius.
+    """
+    x = _as_2d(x)
+    y = _as_2d(y)
+    if x_envelope is None:
+        x_envelope = envelope(x)
+    if y_envelope is None:
+        y_envelope = envelope(y)
+
+    start = np.sqrt(np.sum((x[0] - y[0]) ** 2))
+    columns = lb_keogh(y, *x_envelope)
+    rows = lb_keogh(x, *y_envelope)
+    return float((start + columns[1:].sum() + rows[1:].sum()) / (len(x) + len(y)))
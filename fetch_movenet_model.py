@@ -0,0 +1,60 @@
+"""Download MoveNet into a local, checksummed model bundle.
+
+Usage:
+    python fetch_movenet_model.py [--variant thunder|lightning] [--model-dir models]
+    python fetch_movenet_model.py --tflite float16|int8 [--variant ...]
+    python fetch_movenet_model.py --from path/to/saved_model_or.tflite [--tflite ...] [--variant ...]
+
+Writes <model-dir>/movenet-<variant>/ (SavedModel, used by the default
+`tf` backend) or with --tflite <model-dir>/movenet-<variant>-tflite-
+<precision>/ (used by MOVENET_BACKEND=tflite), which app.py verifies and
+loads at start-up instead of downloading. --from bundles a model that
+is already on disk (e.g. from a TF-Hub cache or a Kaggle Models
+download) without network access. Run it at image build time so
+containers start offline.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import urllib.request
+
+from model_bundle import TFLITE_PRECISIONS, VARIANTS, create_bundle, tflite_url, verify_bundle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="thunder")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--tflite", choices=TFLITE_PRECISIONS, help="bundle the TFLite model of this precision")
+    parser.add_argument("--from", dest="source", help="existing SavedModel directory (or .tflite file) to bundle")
+    args = parser.parse_args()
+
+    url = tflite_url(args.variant, args.tflite) if args.tflite else VARIANTS[args.variant][0]
+    source = args.source
+    download_dir = None
+    try:
+        if source is None:
+            print(f"Downloading {url} ...")
+            started = time.perf_counter()
+            if args.tflite:
+                download_dir = tempfile.mkdtemp()
+                source = os.path.join(download_dir, "model.tflite")
+                with urllib.request.urlopen(url) as response, open(source, "wb") as f:
+                    shutil.copyfileobj(response, f)
+            else:
+                import tensorflow_hub as hub
+                source = hub.resolve(url)
+            print(f"Downloaded to {source} in {time.perf_counter() - started:.1f}s.")
+
+        path = create_bundle(source, args.model_dir, args.variant, source=url, precision=args.tflite)
+    finally:
+        if download_dir is not None:
+            shutil.rmtree(download_dir, ignore_errors=True)
+    manifest = verify_bundle(path, args.variant, args.tflite)
+    print(f"Wrote MoveNet '{args.variant}' bundle to {path} ({len(manifest['files'])} files, verified).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Adaptive frame sampling for pose estimation.
+
+Instead of running MoveNet on every FRAME_SKIP_RATE-th frame, the
+sampler aims for a target pose rate relative to the source fps and
+adapts it to the motion in the clip: frames that barely differ from the
+last inferred one are skipped, and sampling goes up to every frame
+during fast movement. Motion is the mean absolute difference between
+small grayscale thumbnails, which costs far less than inference.
+
+Frames on a fixed grid of global frame indices (every `anchor_interval`
+frames) are always inferred. This caps the gap between poses and makes
+the sampling of a frame range that starts on the grid independent of
+the frames before it, so sharded and sequential passes pick the same
+frames. Skipped frames get their keypoints by linear interpolation.
+
+This module only depends on NumPy and OpenCV.
+"""
+import cv2
+import numpy as np
+
+THUMBNAIL_WIDTH = 64
+
+
+def motion_thumbnail(frame_bgr, width=THUMBNAIL_WIDTH):
+    """Return a small float32 grayscale thumbnail for frame differencing."""
+    height, frame_width = frame_bgr.shape[:2]
+    size = (width, max(1, round(height * width / frame_width)))
+    small = cv2.resize(frame_bgr, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+
+
+class AdaptiveFrameSampler:
+    """Decides, frame by frame, which frames to run pose inference on.
+
+    `source_fps` is the clip's CAP_PROP_FPS and `target_fps` the pose
+    rate aimed for while the lifter moves normally. A frame is inferred
+    when it is on the anchor grid, when the motion since the last
+    inferred frame reaches `fast_motion`, or when it is at least one
+    target interval after the last inferred frame and the motion
+    reaches `min_motion`. Motion is in gray levels (0-255).
+    """
+
+    def __init__(self, source_fps, target_fps, min_motion=1.0, fast_motion=6.0, anchor_factor=4):
+        if not source_fps or source_fps <= 0 or np.isnan(source_fps):
+            source_fps = 30.0
+        self.interval = max(1, int(round(source_fps / max(target_fps, 1e-6))))
+        self.anchor_interval = self.interval * max(1, int(anchor_factor))
+        self.min_motion = min_motion
+        self.fast_motion = fast_motion
+        self._last_index = None
+        self._last_thumbnail = None
+        self.sampled = 0
+        self.skipped = 0
+
+    def should_sample(self, frame_index, frame_bgr):
+        """Return True if frame `frame_index` (global, 0-based) needs inference."""
+        thumbnail = motion_thumbnail(frame_bgr)
+        if self._last_index is None or frame_index % self.anchor_interval == 0:
+            sample = True
+        else:
+            motion = float(np.mean(np.abs(thumbnail - self._last_thumbnail)))
+            gap = frame_index - self._last_index
+            sample = motion >= self.fast_motion or (gap >= self.interval and motion >= self.min_motion)
+
+        if sample:
+            self._last_index = frame_index
+            self._last_thumbnail = thumbnail
+            self.sampled += 1
+        else:
+            self.skipped += 1
+        return sample
+
+
+def interpolate_keypoints(frame_indices, keypoints, n_frames, first_frame=0):
+    """Fill in keypoints for every frame in [first_frame, first_frame + n_frames).
+
+    `keypoints[i]` is the (17, 3) pose of frame `frame_indices[i]`
+    (sorted). Frames between samples are linearly interpolated (position
+    and confidence); frames before the first or after the last sample
+    take the nearest sample.
+    """
+    frame_indices = np.asarray(frame_indices, dtype=np.float64)
+    keypoints = np.asarray(keypoints, dtype=np.float32)
+    if len(keypoints) == 0 or n_frames <= 0:
+        return np.zeros((0, 17, 3), dtype=np.float32)
+
+    frames = np.arange(first_frame, first_frame + n_frames, dtype=np.float64)
+    flat = keypoints.reshape(len(keypoints), -1)
+    # Position of every frame between its two neighbouring samples
+    right = np.clip(np.searchsorted(frame_indices, frames), 1, max(1, len(frame_indices) - 1))
+    left = right - 1
+    if len(frame_indices) == 1:
+        weight = np.zeros_like(frames)
+        right = left
+    else:
+        span = frame_indices[right] - frame_indices[left]
+        weight = np.clip((frames - frame_indices[left]) / span, 0.0, 1.0)
+
+    filled = flat[left] * (1 - weight[:, None]) + flat[right] * weight[:, None]
+    return filled.astype(np.float32).reshape(n_frames, *keypoints.shape[1:])
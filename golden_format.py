@@ -0,0 +1,173 @@
+"""On-disk format of the golden-standard sequences in correct_movement.db.
+
+The original `GoldenSequences` table stores each exercise as JSON text
+(nested lists, mixed scalars and 2-element vectors, nulls). The sibling
+`GoldenSequencesBinary` table stores the same data as a row-major float32
+blob of shape (n_frames, n_columns) laid out as METRIC_COLUMNS, with a
+null bitmap and shape metadata. Null cells are stored as NaN so the blob
+can be used directly through np.frombuffer without a copy.
+
+Each binary row records the checksum of the JSON row it was made from
+(`source_checksum`). A binary row whose JSON row has since been edited
+(or was written before that column existed) is stale and must not be
+used until the migration is run again.
+
+This module only depends on NumPy and the standard library so the
+migration tool and benchmarks can use it without loading TensorFlow.
+"""
+import json
+import sqlite3
+import zlib
+
+import numpy as np
+
+METRIC_NAMES = [
+    'torso_angle', 'spine_curvature', 'armpit_angle',
+    'shoulder_vec_norm', 'elbow_vec_norm', 'hip_vec_norm', 'knee_vec_norm'
+]
+
+# Column layout of the (T, 11) per-frame metrics array
+METRIC_COLUMNS = {
+    'torso_angle': 0,
+    'spine_curvature': 1,
+    'armpit_angle': 2,
+    'shoulder_vec_norm': slice(3, 5),
+    'elbow_vec_norm': slice(5, 7),
+    'hip_vec_norm': slice(7, 9),
+    'knee_vec_norm': slice(9, 11),
+}
+NUM_METRIC_COLUMNS = 11
+
+BINARY_TABLE = "GoldenSequencesBinary"
+BINARY_DTYPE = "<f4"
+
+CREATE_BINARY_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {BINARY_TABLE} (
+        exercise_name TEXT PRIMARY KEY,
+        metric_layout TEXT,
+        n_frames INTEGER,
+        n_columns INTEGER,
+        dtype TEXT,
+        data BLOB,
+        null_bitmap BLOB,
+        checksum INTEGER,
+        source_checksum INTEGER
+    )
+"""
+
+def metric_layout():
+    """Return the column layout as [[name, start, stop], ...]."""
+    layout = []
+    for name in METRIC_NAMES:
+        col = METRIC_COLUMNS[name]
+        if isinstance(col, slice):
+            layout.append([name, col.start, col.stop])
+        else:
+            layout.append([name, col, col + 1])
+    return layout
+
+def parse_json_row(metric_names_json, metric_data_json):
+    """Parse a GoldenSequences JSON row into a (T, 11) float32 array."""
+    metric_names = json.loads(metric_names_json)
+    metric_data = json.loads(metric_data_json)
+
+    metrics = np.full((len(metric_data), NUM_METRIC_COLUMNS), np.nan, dtype=np.float32)
+    for t, frame in enumerate(metric_data):
+        if frame is None:
+            continue
+        for name, value in zip(metric_names, frame):
+            if value is not None and name in METRIC_COLUMNS:
+                metrics[t, METRIC_COLUMNS[name]] = value
+    return metrics
+
+def json_row_checksum(metric_names_json, metric_data_json):
+    """Return the CRC32 of a GoldenSequences row's JSON text."""
+    return zlib.crc32(metric_data_json.encode(), zlib.crc32(metric_names_json.encode()))
+
+def encode_metrics(metrics):
+    """Encode a (T, 11) metrics array as binary row values."""
+    metrics = np.ascontiguousarray(metrics, dtype=BINARY_DTYPE)
+    data = metrics.tobytes()
+    null_bitmap = np.packbits(np.isnan(metrics).ravel()).tobytes()
+    return {
+        'metric_layout': json.dumps(metric_layout()),
+        'n_frames': metrics.shape[0],
+        'n_columns': metrics.shape[1],
+        'dtype': BINARY_DTYPE,
+        'data': data,
+        'null_bitmap': null_bitmap,
+        'checksum': zlib.crc32(null_bitmap, zlib.crc32(data)),
+    }
+
+def decode_metrics(data, n_frames, n_columns, dtype=BINARY_DTYPE):
+    """Return a read-only (n_frames, n_columns) view over a binary blob."""
+    return np.frombuffer(data, dtype=dtype).reshape(n_frames, n_columns)
+
+def decode_null_bitmap(null_bitmap, n_frames, n_columns):
+    """Return the (n_frames, n_columns) boolean null mask."""
+    bits = np.unpackbits(np.frombuffer(null_bitmap, dtype=np.uint8), count=n_frames * n_columns)
+    return bits.reshape(n_frames, n_columns).astype(bool)
+
+def has_binary_table(conn):
+    """Return True if the DB has a usable GoldenSequencesBinary table."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (BINARY_TABLE,)
+    ).fetchone()
+    return row is not None
+
+def has_source_checksums(conn):
+    """Return True if the binary table records its rows' source checksums."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({BINARY_TABLE})")]
+    return 'source_checksum' in columns
+
+def layout_matches(metric_layout_json):
+    """Return True if a stored layout matches METRIC_COLUMNS."""
+    return json.loads(metric_layout_json) == metric_layout()
+
+def migrate_database(db_path):
+    """Convert every GoldenSequences JSON row into GoldenSequencesBinary.
+
+    Existing binary rows are replaced and tagged with their JSON row's
+    checksum. The JSON table is left untouched so older builds keep
+    working. Returns a list of
+    (exercise_name, json_bytes, binary_bytes) tuples.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(CREATE_BINARY_TABLE_SQL)
+        if not has_source_checksums(conn):
+            conn.execute(f"ALTER TABLE {BINARY_TABLE} ADD COLUMN source_checksum INTEGER")
+        rows = conn.execute(
+            "SELECT exercise_name, metric_names, metric_data FROM GoldenSequences"
+        ).fetchall()
+
+        report = []
+        for exercise_name, metric_names_json, metric_data_json in rows:
+            row = encode_metrics(parse_json_row(metric_names_json, metric_data_json))
+            conn.execute(
+                f"INSERT OR REPLACE INTO {BINARY_TABLE} "
+                "(exercise_name, metric_layout, n_frames, n_columns, dtype, data, null_bitmap, checksum, "
+                "source_checksum) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    exercise_name, row['metric_layout'], row['n_frames'], row['n_columns'],
+                    row['dtype'], row['data'], row['null_bitmap'], row['checksum'],
+                    json_row_checksum(metric_names_json, metric_data_json)
+                )
+            )
+            report.append((
+                exercise_name,
+                len(metric_names_json.encode()) + len(metric_data_json.encode()),
+                len(row['data']) + len(row['null_bitmap'])
+            ))
+
+        # Drop binary rows whose exercise no longer exists in the JSON table
+        names = [r[0] for r in rows]
+        conn.execute(
+            f"DELETE FROM {BINARY_TABLE} WHERE exercise_name NOT IN ({','.join('?' * len(names))})",
+            names
+        )
+        conn.commit()
+        return report
+    finally:
+        conn.close()
@@ -0,0 +1,191 @@
+"""Shared MoveNet inference with dynamic micro-batching.
+
+Concurrent analyses in one process hand their frames to a single
+InferenceService instead of each calling the model on its own. A
+dispatcher thread groups pending requests into micro-batches of at most
+`max_batch_size` frames and runs them through the pose backend in one
+call, then hands each caller its slice of the output.
+
+A batch is dispatched as soon as it is full, or once its oldest request
+has waited `max_wait_ms`. It is also dispatched right away when every
+analysis registered with `session()` already has a request in it: a
+lone analysis never waits for company, so single-request latency is
+unchanged. Requests are never split, and only frames of one size are
+batched together (the backends stack their input), so each frame's
+keypoints are exactly those of running it alone.
+
+This module only depends on NumPy and the standard library.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class _Request:
+    __slots__ = ('frames', 'shape', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.shape = frames[0].shape
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _percentiles(samples):
+    if not samples:
+        return {'p50': None, 'p90': None, 'p99': None}
+    p50, p90, p99 = np.percentile(np.fromiter(samples, dtype=np.float64), [50, 90, 99])
+    return {'p50': round(float(p50), 3), 'p90': round(float(p90), 3), 'p99': round(float(p99), 3)}
+
+
+class InferenceService:
+    """Micro-batches `infer_batch` calls from many threads onto one backend.
+
+    `backend` is a pose backend (see pose_backends.py). The service has
+    the same `infer_batch(frames)` interface, so it can be passed
+    wherever a backend is expected. Analyses should wrap their frame
+    loop in `with service.session():` so the dispatcher knows how many
+    of them may still send frames.
+    """
+
+    def __init__(self, backend, max_batch_size=32, max_wait_ms=5.0, latency_window=1024):
+        self.backend = backend
+        self.input_size = backend.input_size
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_frames = 0
+        self._sessions = 0
+        self._closed = False
+        # Counters and recent latencies (ms) for stats()
+        self.requests = 0
+        self.batches = 0
+        self.frames = 0
+        self.max_queue_frames = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._queue_waits = deque(maxlen=latency_window)
+        self._thread = threading.Thread(target=self._dispatch_loop, name="inference-service", daemon=True)
+        self._thread.start()
+
+    @contextmanager
+    def session(self):
+        """Register an analysis that will send frames for a while."""
+        with self._cond:
+            self._sessions += 1
+        try:
+            yield self
+        finally:
+            with self._cond:
+                self._sessions -= 1
+                self._cond.notify_all()
+
+    def infer_batch(self, frames):
+        """Return (len(frames), 17, 3) keypoints, batched with other callers."""
+        if not frames:
+            return np.zeros((0, 17, 3), dtype=np.float32)
+        request = _Request(list(frames))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The inference service is closed.")
+            self._pending.append(request)
+            self._pending_frames += len(request.frames)
+            self.max_queue_frames = max(self.max_queue_frames, self._pending_frames)
+            self._cond.notify_all()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take_batch(self):
+        """Wait for and remove the next batch of same-sized requests (None once closed)."""
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            deadline = self._pending[0].enqueued + self.max_wait
+            while True:
+                shape = self._pending[0].shape
+                batch, size = [], 0
+                for request in self._pending:
+                    if request.shape != shape:
+                        continue
+                    if batch and size + len(request.frames) > self.max_batch_size:
+                        break
+                    batch.append(request)
+                    size += len(request.frames)
+                full = size >= self.max_batch_size
+                # Every registered analysis is already waiting on this
+                # batch, so no more frames are coming soon
+                everyone_in = len(self._pending) >= max(self._sessions, 1)
+                remaining = deadline - time.perf_counter()
+                if full or everyone_in or remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            for request in batch:
+                self._pending.remove(request)
+            self._pending_frames -= size
+            return batch
+
+    def _dispatch_loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            frames = [frame for request in batch for frame in request.frames]
+            try:
+                keypoints = self.backend.infer_batch(frames)
+                error = None
+            except Exception as e:
+                keypoints, error = None, e
+            finished = time.perf_counter()
+
+            offset = 0
+            for request in batch:
+                if error is None:
+                    request.result = keypoints[offset:offset + len(request.frames)]
+                request.error = error
+                offset += len(request.frames)
+                request.done.set()
+            with self._cond:
+                self.batches += 1
+                self.requests += len(batch)
+                self.frames += len(frames)
+                for request in batch:
+                    self._queue_waits.append((started - request.enqueued) * 1000.0)
+                    self._latencies.append((finished - request.enqueued) * 1000.0)
+
+    def stats(self):
+        """Return queue depth, batch fill ratio and latency percentiles (ms)."""
+        with self._cond:
+            return {
+                'sessions': self._sessions,
+                'queue_requests': len(self._pending),
+                'queue_frames': self._pending_frames,
+                'max_queue_frames': self.max_queue_frames,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'requests': self.requests,
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_frames': round(self.frames / self.batches, 2) if self.batches else None,
+                'fill_ratio': round(self.frames / (self.batches * self.max_batch_size), 3) if self.batches else None,
+                'latency_ms': _percentiles(self._latencies),
+                'queue_wait_ms': _percentiles(self._queue_waits),
+            }
+
+    def close(self):
+        """Finish the queued requests and stop the dispatcher."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
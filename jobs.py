@@ -0,0 +1,378 @@
+"""Background job queue for video analysis.
+
+Jobs run in a fixed pool of worker processes, so inference capacity is
+sized separately from the web server's request workers. Workers are
+started with the `spawn` method: each one imports the module that
+defines the job target, runs an optional initializer (e.g. to load its
+own TensorFlow/MoveNet state) and then serves one job at a time.
+
+The web process keeps the job table. Pending jobs wait in a bounded
+in-memory queue and are only handed to idle workers, so at most
+`num_workers` jobs run at once. Workers report progress as event
+dicts, which are stored on the job so clients can poll it or stream its
+events from any point.
+
+This module only depends on the standard library.
+"""
+import atexit
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('complete', 'error', 'cancelled')
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when the pending queue is full."""
+
+
+class JobCancelled(Exception):
+    """Raised inside a job target once its job has been cancelled."""
+
+
+class Job:
+    """One submitted job and the progress events it has produced."""
+
+    def __init__(self, job_id, seq, payload):
+        self.id = job_id
+        self.seq = seq
+        self.payload = payload
+        self.status = 'queued'
+        self.events = []
+        self.worker = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def done(self):
+        return self.status in TERMINAL_STATUSES
+
+    def to_dict(self):
+        """Return a JSON-ready summary of the job."""
+        last = self.events[-1] if self.events else {}
+        summary = {
+            'job_id': self.id,
+            'status': self.status,
+            'message': last.get('message'),
+            'percent': last.get('percent', 0),
+            'events': len(self.events),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == 'complete':
+            summary['result'] = last.get('data')
+        return summary
+
+
+def exit_with_parent():
+    """Make this worker process exit as soon as its parent process does.
+
+    For non-daemonic workers (which may start processes of their own)
+    that would otherwise be orphaned if their parent dies or exits
+    without shutting them down.
+    """
+    parent = multiprocessing.parent_process()
+    if parent is None:
+        return
+
+    def watch():
+        parent.join()
+        os._exit(0)
+
+    threading.Thread(target=watch, name="parent-watchdog", daemon=True).start()
+
+
+def _worker_main(index, target, initializer, inbox, outbox, cancel_seq):
+    """Worker process loop: run jobs from `inbox` until a None arrives."""
+    # Workers are not daemonic, so a job may use its own process pool
+    exit_with_parent()
+    info = initializer() if initializer is not None else None
+    outbox.put(('ready', index, None, info))
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, job_id, payload = item
+
+        def emit(event, job_id=job_id):
+            outbox.put(('event', index, job_id, event))
+
+        def cancelled(seq=seq):
+            return cancel_seq.value == seq
+
+        try:
+            target(payload, emit, cancelled)
+        except JobCancelled:
+            emit({"status": "cancelled", "message": "Job cancelled.", "percent": 100})
+        except Exception as e:
+            log.exception("Job %s failed", job_id)
+            emit({"status": "error", "message": str(e), "percent": 100})
+        outbox.put(('done', index, job_id, None))
+
+
+class JobManager:
+    """Runs `target(payload, emit, cancelled)` jobs in worker processes.
+
+    `target` must be a module-level function (it is pickled by
+    reference). It reports progress by calling emit(event_dict); an
+    event whose "status" is in TERMINAL_STATUSES finishes the job. It
+    should poll cancelled() between stages and raise JobCancelled.
+    `initializer()`, also module-level, runs once in each new worker;
+    what it returns is reported per worker by stats().
+    `discard(payload)` is called for jobs whose target never finished
+    (cancelled while queued, or lost with a crashed worker) so their
+    inputs can be cleaned up.
+    `observe(job, event)` is called in this process for each job's
+    terminal event (e.g. to record metrics shipped with it); it runs
+    under the job table's lock, so it must be quick.
+    """
+
+    def __init__(self, target, num_workers, max_queued, initializer=None, retention_seconds=600, discard=None,
+                 observe=None):
+        self.target = target
+        self.initializer = initializer
+        self.num_workers = max(1, int(num_workers))
+        self.max_queued = max(0, int(max_queued))
+        self.retention_seconds = retention_seconds
+        self.discard = discard
+        self.observe = observe
+        self._ctx = multiprocessing.get_context('spawn')
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._pending = deque()
+        self._workers = []
+        self._outbox = None
+        self._seq = itertools.count(1)
+        self._started = False
+        self._closed = False
+        self.submitted = 0
+        self.rejected = 0
+        self.worker_restarts = 0
+
+    # --- Worker pool ---
+
+    def _start(self):
+        self._outbox = self._ctx.Queue()
+        self._workers = [None] * self.num_workers
+        for index in range(self.num_workers):
+            self._spawn_worker(index)
+        threading.Thread(target=self._collect, name="job-collector", daemon=True).start()
+        atexit.register(self.shutdown)
+        self._started = True
+
+    def _spawn_worker(self, index):
+        inbox = self._ctx.Queue()
+        cancel_seq = self._ctx.Value('q', 0, lock=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.target, self.initializer, inbox, self._outbox, cancel_seq),
+            name=f"analysis-worker-{index}"
+        )
+        process.start()
+        self._workers[index] = {
+            'process': process, 'inbox': inbox, 'cancel_seq': cancel_seq, 'job': None, 'ready': False,
+            'info': None
+        }
+
+    def _dispatch(self):
+        """Hand pending jobs to idle workers (caller holds the lock)."""
+        for index, worker in enumerate(self._workers):
+            if not self._pending:
+                return
+            if worker['job'] is not None:
+                continue
+            job = self._pending.popleft()
+            job.status = 'running'
+            job.worker = index
+            job.started_at = time.time()
+            worker['job'] = job
+            worker['inbox'].put((job.seq, job.id, job.payload))
+
+    def _collect(self):
+        """Apply worker messages to the job table (collector thread)."""
+        last_check = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_check >= 1.0:
+                with self._cond:
+                    self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, index, job_id, event = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            with self._cond:
+                worker = self._workers[index]
+                job = self._jobs.get(job_id)
+                if kind == 'ready':
+                    worker['ready'] = True
+                    worker['info'] = event
+                elif kind == 'event' and job is not None and not job.done:
+                    self._add_event(job, event)
+                elif kind == 'done':
+                    if job is not None and not job.done:
+                        self._add_event(job, {
+                            "status": "error", "message": "Job ended without a result.", "percent": 100
+                        })
+                    worker['job'] = None
+                    self._dispatch()
+                self._cond.notify_all()
+
+    def _check_workers(self):
+        """Fail the jobs of crashed workers and replace them (lock held)."""
+        for index, worker in enumerate(self._workers):
+            if worker['process'].is_alive() or self._closed:
+                continue
+            job = worker['job']
+            log.error("Job worker %d exited with code %s; restarting.", index, worker['process'].exitcode)
+            if job is not None and not job.done:
+                self._add_event(job, {
+                    "status": "error", "message": "Analysis worker exited unexpectedly.", "percent": 100
+                })
+                if self.discard is not None:
+                    self.discard(job.payload)
+            self.worker_restarts += 1
+            self._spawn_worker(index)
+        self._dispatch()
+        self._cond.notify_all()
+
+    def _add_event(self, job, event):
+        job.events.append(event)
+        status = event.get('status')
+        if status in TERMINAL_STATUSES:
+            job.status = status
+            job.finished_at = time.time()
+            if self.observe is not None:
+                try:
+                    self.observe(job, event)
+                except Exception:
+                    log.exception("Job observer failed")
+
+    def _prune(self):
+        """Forget finished jobs older than the retention time (lock held)."""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    # --- Public API ---
+
+    def start(self):
+        """Start the worker processes now rather than on the first submit."""
+        with self._cond:
+            if not self._started and not self._closed:
+                self._start()
+
+    def submit(self, payload):
+        """Queue a job and return it. Raises JobQueueFull."""
+        with self._cond:
+            if not self._started:
+                self._start()
+            self._prune()
+            if len(self._pending) >= self.max_queued:
+                self.rejected += 1
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} jobs waiting).")
+
+            job = Job(uuid.uuid4().hex, next(self._seq), payload)
+            self._add_event(job, {
+                "status": "queued", "message": "Waiting for an analysis worker...", "percent": 0, "job_id": job.id
+            })
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self.submitted += 1
+            self._dispatch()
+            self._cond.notify_all()
+            return job
+
+    def get(self, job_id):
+        """Return the Job with this id, or None."""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job. Returns the Job, or None if it is unknown.
+
+        A queued job is cancelled at once. A running job is flagged and
+        stops at its next cancelled() check. Finished jobs are unchanged.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return job
+            if job.status == 'queued':
+                self._pending.remove(job)
+                self._add_event(job, {"status": "cancelled", "message": "Job cancelled.", "percent": 100})
+                if self.discard is not None:
+                    self.discard(job.payload)
+            else:
+                self._workers[job.worker]['cancel_seq'].value = job.seq
+            self._cond.notify_all()
+            return job
+
+    def iter_events(self, job_id, since=0, keepalive=15.0):
+        """Yield a job's events from index `since` until it finishes.
+
+        Yields None every `keepalive` seconds without news so a
+        streaming response can keep its connection alive.
+        """
+        index = since
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return
+                if index >= len(job.events) and not job.done:
+                    self._cond.wait(timeout=keepalive)
+                events = job.events[index:]
+                done = job.done
+            index += len(events)
+            if not events and not done:
+                yield None
+            for event in events:
+                yield event
+            if done and index >= len(job.events):
+                return
+
+    def stats(self):
+        """Return queue counters."""
+        with self._cond:
+            by_status = {}
+            for job in self._jobs.values():
+                by_status[job.status] = by_status.get(job.status, 0) + 1
+            return {
+                'workers': self.num_workers,
+                'workers_ready': sum(1 for w in self._workers if w and w['ready']),
+                'running': sum(1 for w in self._workers if w and w['job'] is not None),
+                'queued': len(self._pending),
+                'max_queued': self.max_queued,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'worker_restarts': self.worker_restarts,
+                'worker_info': [w['info'] if w else None for w in self._workers],
+                'jobs': by_status,
+            }
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        with self._cond:
+            if not self._started or self._closed:
+                return
+            self._closed = True
+            for worker in self._workers:
+                worker['inbox'].put(None)
+        for worker in self._workers:
+            worker['process'].join(timeout=5)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
@@ -0,0 +1,266 @@
+"""Live (camera) form analysis sessions.
+
+A live session is fed a camera's frames a few at a time, over repeated
+requests on one keep-alive connection. Each batch goes through pose
+inference right away. Its metric rows are added to a window of recent
+frames and to the rep in progress. When the rep counter (see
+rep_segmentation.py) sees a rep complete, that rep alone is scored
+against the golden rep template. Each update therefore costs at most
+one small DTW per finished rep, however long the session runs.
+
+Per-session memory is bounded. A session keeps at most:
+
+* `max_frames` recent metric rows,
+* `max_rep_frames` rows of the rep in progress,
+* `max_reps` rep results.
+
+Each batch also has a latency budget. From the measured cost per frame,
+only as many of the newest frames as fit in `frame_budget_ms` are
+processed and the older ones are dropped. A slow server therefore sheds
+frames instead of falling further behind the camera.
+
+`ScriptedFrameSource` plays a list of frames or a video file in place of
+a camera, for benchmarks and tests.
+
+This module only depends on NumPy (and OpenCV to read video files);
+pose inference, metrics and scoring are passed in.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class LiveSessionLimit(Exception):
+    """Raised by LiveSessionStore.add when every session slot is taken."""
+
+
+class LiveSession:
+    """One live analysis: running metrics, rep counting and per-rep scores.
+
+    `pose_metrics(frames)` runs pose inference on a list of RGB frames
+    and returns their (n, C) metric rows (NaN rows for invalid frames).
+    `to_tracks(rows)` splits rows into {metric_name: track}.
+    `score_rep(tracks)` scores one rep's tracks against the golden rep
+    template and returns a scores dict with a 'Final Score'.
+    `rep_model` is the golden clip's RepModel (None = no rep counting).
+    """
+
+    def __init__(self, session_id, exercise_name, rep_model, pose_metrics, to_tracks, score_rep,
+                 max_frames=300, max_rep_frames=300, max_reps=50, frame_budget_ms=150.0, clock=time.monotonic):
+        self.id = session_id
+        self.exercise_name = exercise_name
+        self.rep_model = rep_model
+        self._pose_metrics = pose_metrics
+        self._to_tracks = to_tracks
+        self._score_rep = score_rep
+        self.frame_budget_ms = frame_budget_ms
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._counter = rep_model.counter() if rep_model is not None else None
+        self._recent = deque(maxlen=max(1, int(max_frames)))
+        # (frame index, metric row) of the rep in progress
+        self._rep_rows = deque(maxlen=max(1, int(max_rep_frames)))
+        self._reps = deque(maxlen=max(1, int(max_reps)))
+        self._frame_cost_ms = None
+        self.created_at = time.time()
+        self.last_active = clock()
+        self.frames_received = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.valid_frames = 0
+        self.rep_count = 0
+        self._score_total = 0.0
+
+    def _frames_within_budget(self, n_frames):
+        """How many of a batch's frames fit in the latency budget."""
+        if self._frame_cost_ms is None or self.frame_budget_ms <= 0:
+            return n_frames
+        return max(1, min(n_frames, int(self.frame_budget_ms // self._frame_cost_ms)))
+
+    def _finish_rep(self, start, end):
+        rows = [row for index, row in self._rep_rows if start <= index < end]
+        truncated = bool(self._rep_rows) and self._rep_rows[0][0] > start
+        while self._rep_rows and self._rep_rows[0][0] < end:
+            self._rep_rows.popleft()
+        scores = self._score_rep(self._to_tracks(np.array(rows))) if rows else {}
+        self.rep_count += 1
+        self._score_total += scores.get('Final Score', 0)
+        rep = {
+            'rep': self.rep_count,
+            'start_frame': int(start),
+            'end_frame': int(end),
+            'frames': len(rows),
+            'truncated': truncated,
+            'scores': scores,
+        }
+        self._reps.append(rep)
+        return rep
+
+    def process(self, frames):
+        """Analyze a batch of RGB frames and return the session update."""
+        with self._lock:
+            started = time.perf_counter()
+            first_index = self.frames_received
+            keep = self._frames_within_budget(len(frames))
+            dropped = len(frames) - keep
+            self.frames_received += len(frames)
+            self.frames_dropped += dropped
+            new_reps = []
+
+            if keep:
+                inference_started = time.perf_counter()
+                rows = np.asarray(self._pose_metrics(frames[dropped:]))
+                cost_ms = (time.perf_counter() - inference_started) * 1000 / keep
+                self._frame_cost_ms = cost_ms if self._frame_cost_ms is None else (
+                    0.8 * self._frame_cost_ms + 0.2 * cost_ms
+                )
+                signal = (self.rep_model.project(self._to_tracks(rows)) if self.rep_model is not None
+                          else itertools.repeat(None))
+                for offset, (row, value) in enumerate(zip(rows, signal)):
+                    index = first_index + dropped + offset
+                    self._recent.append(row)
+                    self.frames_processed += 1
+                    if np.isnan(row).any():
+                        continue
+                    self.valid_frames += 1
+                    self._rep_rows.append((index, row))
+                    rep = self._counter.push(value, index) if self._counter is not None else None
+                    if rep is not None:
+                        new_reps.append(self._finish_rep(*rep))
+
+            self.last_active = self._clock()
+            update = self._summary()
+            update.update({
+                'new_reps': new_reps,
+                'frames_in_batch': len(frames),
+                'dropped_in_batch': dropped,
+                'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            })
+            return update
+
+    def _running_metrics(self):
+        """Mean of each one-column metric over the recent window (lock held)."""
+        if not self._recent:
+            return {}
+        tracks = self._to_tracks(np.array(self._recent))
+        running = {}
+        for name, track in tracks.items():
+            track = np.asarray(track, dtype=np.float64)
+            if track.ndim != 1:
+                continue
+            valid = track[~np.isnan(track)]
+            running[f'avg_{name}'] = round(float(valid.mean()), 2) if len(valid) else None
+        return running
+
+    def _summary(self):
+        return {
+            'session_id': self.id,
+            'exercise_name': self.exercise_name,
+            'frames_received': self.frames_received,
+            'frames_processed': self.frames_processed,
+            'frames_dropped': self.frames_dropped,
+            'valid_frames': self.valid_frames,
+            'reps': self.rep_count,
+            'rep_counting': self._counter is not None,
+            'rep_in_progress_frames': len(self._rep_rows),
+            'avg_rep_score': round(self._score_total / self.rep_count, 1) if self.rep_count else None,
+            'running': self._running_metrics(),
+            'frame_cost_ms': round(self._frame_cost_ms, 1) if self._frame_cost_ms is not None else None,
+        }
+
+    def summary(self):
+        """Return the session's counters, running metrics and recent rep results."""
+        with self._lock:
+            summary = self._summary()
+            summary['rep_results'] = list(self._reps)
+            return summary
+
+
+class LiveSessionStore:
+    """Open live sessions, with a session limit and idle expiry."""
+
+    def __init__(self, max_sessions=8, idle_seconds=60.0, clock=time.monotonic):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self.expired = 0
+
+    def _prune(self):
+        """Forget sessions idle for longer than idle_seconds (lock held)."""
+        cutoff = self._clock() - self.idle_seconds
+        idle = [session_id for session_id, session in self._sessions.items() if session.last_active < cutoff]
+        for session_id in idle:
+            del self._sessions[session_id]
+        self.expired += len(idle)
+
+    def add(self, session):
+        """Register a new session. Raises LiveSessionLimit."""
+        with self._lock:
+            self._prune()
+            if len(self._sessions) >= self.max_sessions:
+                raise LiveSessionLimit(f"All {self.max_sessions} live sessions are in use.")
+            self._sessions[session.id] = session
+
+    def get(self, session_id):
+        """Return the open session with this id, or None."""
+        with self._lock:
+            self._prune()
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id):
+        """Close a session. Returns it, or None if it is unknown."""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._prune()
+            return len(self._sessions)
+
+
+class ScriptedFrameSource:
+    """Plays RGB frames in place of a camera: from a list or a video file.
+
+    Every `step`-th frame is played, up to `limit` frames (None = all).
+    """
+
+    def __init__(self, frames=None, video_path=None, step=1, limit=None):
+        if (frames is None) == (video_path is None):
+            raise ValueError("Give either frames or video_path.")
+        self.frames = frames
+        self.video_path = video_path
+        self.step = max(1, int(step))
+        self.limit = limit
+
+    def _video_frames(self):
+        import cv2
+
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Cannot open video {self.video_path}")
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        finally:
+            cap.release()
+
+    def __iter__(self):
+        frames = iter(self.frames) if self.frames is not None else self._video_frames()
+        return itertools.islice(frames, 0, None if self.limit is None else self.limit * self.step, self.step)
+
+    def batches(self, size):
+        """Yield lists of up to `size` frames, as a client would post them."""
+        frames = iter(self)
+        while True:
+            batch = list(itertools.islice(frames, max(1, int(size))))
+            if not batch:
+                return
+            yield batch
@@ -0,0 +1,414 @@
+"""Shared client for the Gemini-backed endpoints.
+
+Every LLM call goes through one LLMClient, which adds what a bare
+`generate_content` call lacks:
+
+* a deadline per call: the request runs on a dispatcher thread and the
+  caller stops waiting when the deadline passes (LLMTimeout),
+* bounded retries with full-jitter exponential backoff for timeouts and
+  transient API errors (rate limits, 5xx), never past the deadline,
+* a global concurrency limit, so a burst of slow calls cannot tie up
+  every web worker thread (LLMUnavailable when no slot frees up in
+  time),
+* a circuit breaker that fails calls fast (LLMUnavailable) after
+  repeated failures, then lets one trial call through after a cool-down,
+* latency, time-to-first-chunk and error counters per endpoint, also
+  passed to an optional `observer` (e.g. to export them as metrics).
+
+`stream()` yields the response in chunks as the model produces them,
+under the same deadline, slot and breaker rules; it retries only until
+the first chunk has been handed to the caller.
+
+Backends turn (contents, json_mode, timeout) into response text
+(`generate`) or an iterator of text chunks (`stream`): GeminiBackend
+wraps google.generativeai models, StubBackend answers locally so the
+app and its endpoints run offline.
+
+This module only depends on the standard library.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+log = logging.getLogger(__name__)
+
+# Exception class names (anywhere in the MRO) worth retrying: timeouts,
+# rate limits and server errors of google.api_core, plus network errors
+RETRYABLE_ERRORS = {
+    'LLMTimeout', 'TimeoutError', 'ConnectionError',
+    'DeadlineExceeded', 'ResourceExhausted', 'TooManyRequests',
+    'ServiceUnavailable', 'InternalServerError', 'GatewayTimeout', 'BadGateway',
+}
+
+
+class LLMError(Exception):
+    """Base class of LLMClient errors."""
+
+
+class LLMTimeout(LLMError):
+    """The call did not finish before its deadline."""
+
+
+class LLMUnavailable(LLMError):
+    """The call was not attempted: circuit open or no free slot.
+
+    `retry_after` is a hint in seconds for the Retry-After header.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error):
+    """True for timeouts and transient API errors."""
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class GeminiBackend:
+    """google.generativeai text and JSON-mode models."""
+
+    name = 'gemini'
+
+    def __init__(self, text_model, json_model):
+        self.text_model = text_model
+        self.json_model = json_model
+
+    def generate(self, contents, json_mode=False, timeout=None):
+        model = self.json_model if json_mode else self.text_model
+        request_options = {'timeout': timeout} if timeout else None
+        return model.generate_content(contents, request_options=request_options).text
+
+    def stream(self, contents, json_mode=False, timeout=None):
+        model = self.json_model if json_mode else self.text_model
+        request_options = {'timeout': timeout} if timeout else None
+        for chunk in model.generate_content(contents, stream=True, request_options=request_options):
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # chunk without text parts (e.g. only finish metadata)
+            if text:
+                yield text
+
+
+class StubBackend:
+    """Local stand-in that answers without network access.
+
+    Text calls return a fixed markdown note, JSON calls a small JSON
+    object. `delay` (seconds) and `fail_rate` (0-1, raising
+    ConnectionError) simulate a slow or flaky API; streamed responses
+    come in `chunk_size` character pieces `chunk_delay` seconds apart.
+    """
+
+    name = 'stub'
+
+    def __init__(self, delay=0.0, fail_rate=0.0, chunk_size=24, chunk_delay=0.0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_delay = chunk_delay
+
+    def generate(self, contents, json_mode=False, timeout=None):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError("Stub LLM backend failure")
+        prompt = contents if isinstance(contents, str) else "\n".join(map(str, contents))
+        if json_mode:
+            return json.dumps({"stub": True, "prompt_chars": len(prompt)})
+        return f"*Stub LLM response ({len(prompt)} prompt characters).*"
+
+    def stream(self, contents, json_mode=False, timeout=None):
+        text = self.generate(contents, json_mode, timeout)
+        for start in range(0, len(text), self.chunk_size):
+            if start and self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open, calls are refused until `reset_timeout` seconds have
+    passed; then a single trial call is let through (half-open), and
+    its outcome closes or re-opens the circuit. If the trial never
+    reports back, another one is let through after `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+
+    def allow(self):
+        """Return (allowed, retry_after_seconds)."""
+        with self._lock:
+            if self.state == 'closed':
+                return True, None
+            now = time.monotonic()
+            remaining = self.opened_at + self.reset_timeout - now
+            if remaining <= 0:
+                self.state = 'half_open'
+                self.opened_at = now
+                return True, None
+            # Open, or half-open with the trial call still running
+            return False, max(remaining, 1.0)
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state == 'closed':
+                    self.trips += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+def _percentiles(samples):
+    if not samples:
+        return {'p50': None, 'p90': None, 'p99': None}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return {'p50': pick(0.5), 'p90': pick(0.9), 'p99': pick(0.99)}
+
+
+class _EndpointMetrics:
+    def __init__(self, window):
+        self.calls = 0
+        self.successes = 0
+        self.retries = 0
+        self.errors = {}
+        self.latencies = deque(maxlen=window)
+        self.first_chunk = deque(maxlen=window)
+
+    def to_dict(self):
+        return {
+            'calls': self.calls,
+            'successes': self.successes,
+            'retries': self.retries,
+            'errors': dict(self.errors),
+            'latency_ms': _percentiles(self.latencies),
+            'ttfb_ms': _percentiles(self.first_chunk),
+        }
+
+
+class LLMClient:
+    """Deadline, retry, concurrency and circuit-breaker wrapper of a backend.
+
+    `timeout` is the default deadline (seconds) of one generate() call,
+    retries included. At most `max_concurrency` backend calls run at
+    once; a call whose deadline expires keeps its slot until the
+    backend actually returns, so the limit also bounds abandoned calls.
+    `observer(endpoint, changes)`, if given, is called with every update
+    of the endpoint counters: calls/successes/retries increments, an
+    'error' kind, or 'latency'/'ttfb' in seconds.
+    """
+
+    def __init__(self, backend, timeout=30.0, max_retries=2, max_concurrency=4,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, latency_window=512, observer=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.max_concurrency = max(1, max_concurrency)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._latency_window = latency_window
+        self._metrics = {}
+        self.observer = observer
+
+    def _record(self, endpoint, **changes):
+        with self._lock:
+            metrics = self._metrics.get(endpoint)
+            if metrics is None:
+                metrics = self._metrics[endpoint] = _EndpointMetrics(self._latency_window)
+            for key, value in changes.items():
+                if key == 'error':
+                    metrics.errors[value] = metrics.errors.get(value, 0) + 1
+                elif key == 'latency':
+                    metrics.latencies.append(value * 1000.0)
+                elif key == 'ttfb':
+                    metrics.first_chunk.append(value * 1000.0)
+                else:
+                    setattr(metrics, key, getattr(metrics, key) + value)
+        if self.observer is not None:
+            self.observer(endpoint, changes)
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _submit(self, fn, deadline, *args):
+        """Run fn(*args, backend_timeout) on a free slot, or raise LLMUnavailable."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self._slots.acquire(timeout=remaining):
+            raise LLMUnavailable("No free LLM slot before the deadline.", retry_after=1.0)
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args, max(deadline - time.monotonic(), 0.001))
+        future.add_done_callback(self._release)
+        return future
+
+    def _attempt(self, contents, json_mode, deadline):
+        """One backend call, bounded by the deadline."""
+        future = self._submit(self.backend.generate, deadline, contents, json_mode)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeout:
+            raise LLMTimeout("The LLM call did not finish before its deadline.")
+
+    def generate(self, contents, endpoint='default', json_mode=False, timeout=None):
+        """Return the response text for `contents` (a prompt or list of parts).
+
+        Raises LLMTimeout, LLMUnavailable, or the backend's last error
+        once retries are exhausted.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        self._record(endpoint, calls=1)
+        attempt = 0
+        while True:
+            allowed, retry_after = self.breaker.allow()
+            if not allowed:
+                self._record(endpoint, error='circuit_open')
+                raise LLMUnavailable("The LLM circuit breaker is open.", retry_after=retry_after)
+            try:
+                text = self._attempt(contents, json_mode, deadline)
+            except LLMUnavailable:
+                self._record(endpoint, error='saturated')
+                raise
+            except Exception as e:
+                self._record_failure(endpoint, e)
+                delay = self._backoff(attempt, deadline)
+                if attempt >= self.max_retries or not is_retryable(e) or delay is None:
+                    raise
+                attempt += 1
+                self._record(endpoint, retries=1)
+                log.warning("LLM call for %s failed (%s: %s); retry %d in %.1fs.", endpoint, type(e).__name__, e, attempt, delay)
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            self._record(endpoint, successes=1, latency=time.monotonic() - started)
+            return text
+
+    def _record_failure(self, endpoint, error):
+        # Only timeouts and transient errors count against the API's
+        # health; a rejected request means it is up
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self._record(endpoint, error=type(error).__name__)
+
+    def _backoff(self, attempt, deadline):
+        """Seconds to sleep before retry `attempt` + 1, or None if it would pass the deadline."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return delay if time.monotonic() + delay < deadline else None
+
+    def _produce_chunks(self, contents, json_mode, out, cancel, timeout):
+        """Dispatcher-thread side of stream(): forward backend chunks to `out`."""
+        try:
+            for chunk in self.backend.stream(contents, json_mode, timeout):
+                if cancel.is_set():
+                    return
+                out.put(('chunk', chunk))
+            out.put(('done', None))
+        except Exception as e:
+            out.put(('error', e))
+
+    def stream(self, contents, endpoint='default', json_mode=False, timeout=None):
+        """Yield the response text for `contents` in chunks as they arrive.
+
+        Failures before the first chunk are retried like generate();
+        after it they are raised to the caller, which has already used
+        part of the answer. Closing the generator early stops reading
+        the backend stream.
+        """
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        self._record(endpoint, calls=1)
+        attempt = 0
+        while True:
+            allowed, retry_after = self.breaker.allow()
+            if not allowed:
+                self._record(endpoint, error='circuit_open')
+                raise LLMUnavailable("The LLM circuit breaker is open.", retry_after=retry_after)
+            out, cancel = queue.Queue(), threading.Event()
+            yielded = False
+            try:
+                try:
+                    self._submit(self._produce_chunks, deadline, contents, json_mode, out, cancel)
+                except LLMUnavailable:
+                    self._record(endpoint, error='saturated')
+                    raise
+                while True:
+                    try:
+                        kind, value = out.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        raise LLMTimeout("The LLM stream did not finish before its deadline.")
+                    if kind == 'done':
+                        break
+                    if kind == 'error':
+                        raise value
+                    if not yielded:
+                        self._record(endpoint, ttfb=time.monotonic() - started)
+                        yielded = True
+                    yield value
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                self._record_failure(endpoint, e)
+                delay = self._backoff(attempt, deadline)
+                if yielded or attempt >= self.max_retries or not is_retryable(e) or delay is None:
+                    raise
+                attempt += 1
+                self._record(endpoint, retries=1)
+                log.warning("LLM stream for %s failed (%s: %s); retry %d in %.1fs.", endpoint, type(e).__name__, e, attempt, delay)
+                time.sleep(delay)
+                continue
+            finally:
+                cancel.set()
+            self.breaker.record_success()
+            self._record(endpoint, successes=1, latency=time.monotonic() - started)
+            return
+
+    def stats(self):
+        """Return the breaker state, slot usage and per-endpoint metrics."""
+        with self._lock:
+            endpoints = {name: metrics.to_dict() for name, metrics in self._metrics.items()}
+            in_flight = self._in_flight
+        return {
+            'backend': self.backend.name,
+            'timeout': self.timeout,
+            'max_retries': self.max_retries,
+            'max_concurrency': self.max_concurrency,
+            'in_flight': in_flight,
+            'circuit': {
+                'state': self.breaker.state,
+                'failures': self.breaker.failures,
+                'trips': self.breaker.trips,
+            },
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,30 @@
+"""Convert GoldenSequences JSON rows into the binary GoldenSequencesBinary table.
+
+Usage:
+    python migrate_golden_db.py [path/to/correct_movement.db]
+
+Re-run this after changing GoldenSequences so the binary rows stay in sync;
+the app prefers binary rows and only parses JSON for exercises without one.
+"""
+import argparse
+
+from golden_format import migrate_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db_path", nargs="?", default="correct_movement.db")
+    args = parser.parse_args()
+
+    report = migrate_database(args.db_path)
+
+    total_json = sum(r[1] for r in report)
+    total_binary = sum(r[2] for r in report)
+    for exercise_name, json_bytes, binary_bytes in report:
+        print(f"{exercise_name:<30} {json_bytes:>9} B JSON -> {binary_bytes:>8} B binary")
+    print(f"Migrated {len(report)} exercises: {total_json} B JSON -> {total_binary} B binary "
+          f"({total_binary / max(total_json, 1):.1%}).")
+
+
+if __name__ == "__main__":
+    main()
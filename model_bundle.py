@@ -0,0 +1,147 @@
+"""Local MoveNet model bundles.
+
+A bundle is a directory `<model_dir>/movenet-<variant>/` holding the
+model's SavedModel files, or `<model_dir>/movenet-<variant>-tflite-
+<precision>/` holding a `model.tflite` (float16 or int8), plus a
+`manifest.json` with the variant, format, source, model input size and
+the SHA-256 of every file. app.py loads a verified bundle instead of
+calling `hub.load`, so start-up needs no network access and no TF-Hub
+cache. Bundles are created with fetch_movenet_model.py.
+
+This module only depends on the standard library.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# variant -> (TF-Hub URL, model input size)
+VARIANTS = {
+    'thunder': ("https://tfhub.dev/google/movenet/singlepose/thunder/4", 256),
+    'lightning': ("https://tfhub.dev/google/movenet/singlepose/lightning/4", 192),
+}
+
+
+TFLITE_PRECISIONS = ('float16', 'int8')
+TFLITE_FILE = 'model.tflite'
+
+
+class BundleError(Exception):
+    """Raised when a model bundle is missing, incomplete or corrupted."""
+
+
+def tflite_url(variant, precision):
+    """TF-Hub download URL of a MoveNet TFLite model."""
+    return (
+        f"https://tfhub.dev/google/lite-model/movenet/singlepose/{variant}/tflite/{precision}/4"
+        "?lite-format=tflite"
+    )
+
+
+def bundle_path(model_dir, variant, precision=None):
+    """Bundle directory of a variant: SavedModel, or TFLite of `precision`."""
+    if precision is None:
+        return os.path.join(model_dir, f"movenet-{variant}")
+    return os.path.join(model_dir, f"movenet-{variant}-tflite-{precision}")
+
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _bundle_files(path):
+    """Relative paths (with '/' separators) of all files in a bundle except the manifest."""
+    files = []
+    for root, _, names in os.walk(path):
+        for name in names:
+            rel = os.path.relpath(os.path.join(root, name), path).replace(os.sep, '/')
+            if rel != MANIFEST_NAME:
+                files.append(rel)
+    return sorted(files)
+
+
+def create_bundle(model_source, model_dir, variant, source=None, precision=None):
+    """Copy a model into a bundle and write its manifest.
+
+    `model_source` is a SavedModel directory, or with `precision` a
+    .tflite file. The bundle is assembled next to its final location and
+    renamed into place, replacing any previous bundle of that variant
+    and format. Returns the bundle path.
+    """
+    if variant not in VARIANTS:
+        raise BundleError(f"Unknown MoveNet variant {variant!r}; expected one of {sorted(VARIANTS)}.")
+    if precision is None and not os.path.isfile(os.path.join(model_source, 'saved_model.pb')):
+        raise BundleError(f"{model_source} is not a SavedModel directory (no saved_model.pb).")
+    if precision is not None:
+        if precision not in TFLITE_PRECISIONS:
+            raise BundleError(f"Unknown TFLite precision {precision!r}; expected one of {TFLITE_PRECISIONS}.")
+        if not os.path.isfile(model_source):
+            raise BundleError(f"{model_source} is not a .tflite file.")
+
+    url, input_size = VARIANTS[variant]
+    if precision is not None:
+        url = tflite_url(variant, precision)
+    target = bundle_path(model_dir, variant, precision)
+    os.makedirs(model_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=model_dir, prefix=f".{os.path.basename(target)}-")
+    try:
+        bundle = os.path.join(staging, 'bundle')
+        if precision is None:
+            shutil.copytree(model_source, bundle)
+        else:
+            os.makedirs(bundle)
+            shutil.copyfile(model_source, os.path.join(bundle, TFLITE_FILE))
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'variant': variant,
+            'format': 'saved_model' if precision is None else 'tflite',
+            'precision': precision,
+            'source': source or url,
+            'input_size': input_size,
+            'files': {rel: _sha256(os.path.join(bundle, rel)) for rel in _bundle_files(bundle)},
+        }
+        with open(os.path.join(bundle, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(bundle, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def verify_bundle(path, variant, precision=None):
+    """Check a bundle against its manifest and return the manifest.
+
+    Raises BundleError if the manifest is missing or unreadable, is for
+    another variant or precision, or if any file is missing, unlisted
+    or has a different SHA-256.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BundleError(f"Cannot read the manifest of model bundle {path}: {e}")
+
+    if manifest.get('variant') != variant:
+        raise BundleError(f"Model bundle {path} holds variant {manifest.get('variant')!r}, not {variant!r}.")
+    if manifest.get('precision') != precision:
+        raise BundleError(f"Model bundle {path} holds precision {manifest.get('precision')!r}, not {precision!r}.")
+    expected = manifest.get('files') or {}
+    present = _bundle_files(path)
+    missing = sorted(set(expected) - set(present))
+    unlisted = sorted(set(present) - set(expected))
+    if missing or unlisted:
+        raise BundleError(f"Model bundle {path} does not match its manifest (missing {missing}, unlisted {unlisted}).")
+    for rel, digest in expected.items():
+        if _sha256(os.path.join(path, rel)) != digest:
+            raise BundleError(f"Model bundle file {rel} in {path} failed its SHA-256 check.")
+    return manifest
@@ -0,0 +1,196 @@
+"""Persistent cache of generated workout and nutrition plans.
+
+/generate-workout and /generate-nutrition-plan build their prompt from
+a few form fields, and many users submit the same combinations. Plans
+are stored in a local SQLite database keyed by the SHA-256 of the
+endpoint, a prompt tag (model and system prompt) and the canonical
+request fields, so a repeated request skips the Gemini call.
+
+Requests are canonicalized before keying (and before building the
+prompt, so a cached plan is exactly the answer to its key):
+
+* choice fields (goal, levels) are whitespace-collapsed and title-cased,
+* comma-separated lists (equipment, preferences) are lowercased,
+  de-duplicated and sorted,
+* numbers are bucketed where that cannot change the plan: hours per
+  day to the half hour the form uses, weight to the kilogram, height
+  to the centimetre, age to the year.
+
+Entries expire after `ttl_seconds`; beyond `max_entries` the least
+recently used ones are evicted.
+
+This module only depends on the standard library.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def _choice(value):
+    return " ".join(str(value).split()).title()
+
+
+def _text(value):
+    text = " ".join(str(value).split())
+    return text if text and text.lower() != "none" else "None"
+
+
+def _item_list(value):
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value).split(",")
+    items = sorted({" ".join(str(item).split()).lower() for item in items} - {""})
+    return ", ".join(items) if items else "None"
+
+
+def _bucket(value, step):
+    return round(float(value) / step) * step
+
+
+def canonical_workout_request(data):
+    """Canonical fields of a /generate-workout request.
+
+    Raises KeyError, TypeError or ValueError for missing or malformed
+    fields.
+    """
+    days = int(data['days_per_week'])
+    if not 1 <= days <= 7:
+        raise ValueError(f"days_per_week out of range: {days}")
+    return {
+        'goal': _choice(data['goal']),
+        'experience_level': _choice(data['experience_level']),
+        'days_per_week': days,
+        'hours_per_day': f"{_bucket(data['hours_per_day'], 0.5):g}",
+        'available_equipment': _item_list(data['available_equipment']),
+        'notes': _text(data.get('notes', 'None')),
+    }
+
+
+def canonical_nutrition_request(data):
+    """Canonical fields of a /generate-nutrition-plan request.
+
+    Raises KeyError, TypeError or ValueError for missing or malformed
+    fields.
+    """
+    return {
+        'goal': _choice(data['goal']),
+        'weight_kg': int(_bucket(data['weight_kg'], 1)),
+        'height_cm': int(_bucket(data['height_cm'], 1)),
+        'age': int(float(data['age'])),
+        'activity_level': _choice(data['activity_level']),
+        'preferences': _item_list(data.get('preferences', 'None')),
+    }
+
+
+def make_plan_key(endpoint, fields, prompt_tag):
+    """Cache key of a canonical request."""
+    payload = json.dumps([endpoint, prompt_tag, fields], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """SQLite-backed plan store with TTL, LRU eviction and hit counters.
+
+    Safe to share between threads; several processes may share one
+    database file (SQLite serializes the writes).
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, plan TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS plans_last_used ON plans (last_used)")
+        self._conn.commit()
+        self.hits = {}
+        self.misses = {}
+        self.bypassed = {}
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _count(counter, endpoint):
+        counter[endpoint] = counter.get(endpoint, 0) + 1
+
+    def get(self, endpoint, key):
+        """Return the cached plan for `key`, or None (expired entries are dropped)."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT plan, created_at FROM plans WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._conn.commit()
+                self.expired += 1
+                row = None
+            if row is None:
+                self._count(self.misses, endpoint)
+                return None
+            self._conn.execute("UPDATE plans SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._count(self.hits, endpoint)
+        return json.loads(row[0])
+
+    def put(self, endpoint, key, plan):
+        """Store a validated plan and evict the least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans (key, endpoint, plan, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, json.dumps(plan), now, now)
+            )
+            self._conn.execute("DELETE FROM plans WHERE created_at < ?", (now - self.ttl_seconds,))
+            evicted = self._conn.execute(
+                "DELETE FROM plans WHERE key IN"
+                " (SELECT key FROM plans ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            self.stores += 1
+            self.evictions += max(evicted, 0)
+
+    def record_bypass(self, endpoint):
+        with self._lock:
+            self._count(self.bypassed, endpoint)
+
+    def stats(self):
+        """Return entry count and hit/miss counters per endpoint."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+            endpoints = sorted(set(self.hits) | set(self.misses) | set(self.bypassed))
+            per_endpoint = {}
+            for endpoint in endpoints:
+                hits, misses = self.hits.get(endpoint, 0), self.misses.get(endpoint, 0)
+                per_endpoint[endpoint] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'bypassed': self.bypassed.get(endpoint, 0),
+                    'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+                }
+            total_hits, total_misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'entries': entries,
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': total_hits,
+                'misses': total_misses,
+                'hit_rate': round(total_hits / (total_hits + total_misses), 3) if total_hits + total_misses else None,
+                'expired': self.expired,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'endpoints': per_endpoint,
+            }
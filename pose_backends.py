@@ -0,0 +1,124 @@
+"""Pose inference backends for MoveNet.
+
+Every backend takes a list of RGB uint8 frames of one size, letterboxes
+them to the model's square input (as `tf.image.resize_with_pad` does)
+and returns a (N, 17, 3) float32 array of (y, x, score) keypoints
+normalized to the letterboxed image.
+
+* TFSavedModelBackend runs the SavedModel `serving_default` signature
+  (a local bundle or TF-Hub), batched inside one traced TF function.
+* TFLiteBackend runs a MoveNet .tflite model (float16 or int8) with
+  `tf.lite.Interpreter`, or `tflite_runtime` when it is installed. It
+  needs far less memory than the full TF runtime and is usually faster
+  per frame on CPU.
+
+This module depends on TensorFlow, NumPy and OpenCV.
+"""
+import abc
+import threading
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+try:
+    from tflite_runtime.interpreter import Interpreter as _TFLiteInterpreter
+except ImportError:
+    _TFLiteInterpreter = tf.lite.Interpreter
+
+
+def letterbox(frame, size):
+    """Resize a frame to fit a (size, size) square and zero-pad the rest.
+
+    Same geometry as `tf.image.resize_with_pad` (bilinear, centered,
+    padding rounded down at the top/left).
+    """
+    height, width = frame.shape[:2]
+    ratio = max(width / size, height / size)
+    resized_width, resized_height = int(width / ratio), int(height / ratio)
+    top, left = (size - resized_height) // 2, (size - resized_width) // 2
+    out = np.zeros((size, size, 3), dtype=np.uint8)
+    out[top:top + resized_height, left:left + resized_width] = cv2.resize(
+        frame, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR
+    )
+    return out
+
+
+class PoseBackend(abc.ABC):
+    """Interface of a MoveNet inference backend."""
+
+    name = 'base'
+
+    def __init__(self, input_size, num_threads=None):
+        self.input_size = input_size
+        self.num_threads = num_threads
+
+    @abc.abstractmethod
+    def infer_batch(self, frames):
+        """Return (len(frames), 17, 3) keypoints for a list of RGB frames."""
+
+    def describe(self):
+        return {'backend': self.name, 'input_size': self.input_size, 'num_threads': self.num_threads}
+
+
+class TFSavedModelBackend(PoseBackend):
+    """MoveNet through the TensorFlow SavedModel serving signature."""
+
+    name = 'tf'
+
+    def __init__(self, signature, input_size, num_threads=None):
+        super().__init__(input_size, num_threads)
+        self.signature = signature
+
+        @tf.function(reduce_retracing=True)
+        def runner(images):
+            image_tensor = tf.cast(images, dtype=tf.int32)
+            resized_images = tf.image.resize_with_pad(image_tensor, input_size, input_size)
+            resized_images = tf.cast(resized_images, dtype=tf.int32)
+            # The singlepose signature only accepts a batch of 1,
+            # so loop over the batch inside the graph instead.
+            return tf.map_fn(
+                lambda image: signature(tf.expand_dims(image, axis=0))['output_0'][0, 0],
+                resized_images,
+                fn_output_signature=tf.float32
+            )
+
+        self._runner = runner
+
+    def infer_batch(self, frames):
+        if not frames:
+            return np.zeros((0, 17, 3), dtype=np.float32)
+        return self._runner(tf.convert_to_tensor(np.stack(frames))).numpy()
+
+
+class TFLiteBackend(PoseBackend):
+    """MoveNet through a TFLite interpreter (one frame per invoke)."""
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None, precision=None):
+        interpreter = _TFLiteInterpreter(model_path=model_path, num_threads=num_threads or None)
+        interpreter.allocate_tensors()
+        self._interpreter = interpreter
+        self._input = interpreter.get_input_details()[0]
+        self._output = interpreter.get_output_details()[0]
+        # Interpreters are not thread-safe
+        self._lock = threading.Lock()
+        self.precision = precision
+        super().__init__(int(self._input['shape'][1]), num_threads)
+
+    def infer_batch(self, frames):
+        keypoints = np.zeros((len(frames), 17, 3), dtype=np.float32)
+        dtype = self._input['dtype']
+        with self._lock:
+            for i, frame in enumerate(frames):
+                image = letterbox(frame, self.input_size)[None].astype(dtype)
+                self._interpreter.set_tensor(self._input['index'], image)
+                self._interpreter.invoke()
+                keypoints[i] = self._interpreter.get_tensor(self._output['index']).reshape(17, 3)
+        return keypoints
+
+    def describe(self):
+        info = super().describe()
+        info['precision'] = self.precision
+        return info
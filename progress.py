@@ -0,0 +1,57 @@
+"""Progress reporting for the frame-by-frame stage of an analysis.
+
+The pose pipeline reports how far it got as (frames_done, frames_total)
+after each inference batch, where frames_total comes from the
+container's frame count (None when it is unknown, e.g. a video read
+through a pipe). ProgressReporter turns those updates into progress
+fields for a client:
+
+* `percent`, scaled into the share of the whole analysis this stage
+  covers (start_percent..end_percent),
+* `fps`, video frames per second so far,
+* `eta_seconds`, the estimated time left at that rate.
+
+Updates are throttled: update() returns fields at most once every
+`min_interval` seconds, so a long video yields a steady, bounded stream
+of events however fast (or slowly) batches complete.
+
+This module only depends on the standard library.
+"""
+import time
+
+
+class ProgressReporter:
+    """Turns frame counts into throttled progress fields with fps and ETA."""
+
+    def __init__(self, start_percent, end_percent, min_interval=0.5, clock=time.monotonic):
+        self.start_percent = start_percent
+        self.end_percent = end_percent
+        self.min_interval = max(0.0, min_interval)
+        self._clock = clock
+        self._started = clock()
+        self._last_report = None
+        self.reports = 0
+
+    def update(self, frames_done, frames_total=None, force=False):
+        """Return progress fields for this update, or None while throttled."""
+        now = self._clock()
+        if not force and self._last_report is not None and now - self._last_report < self.min_interval:
+            return None
+        self._last_report = now
+        self.reports += 1
+
+        elapsed = now - self._started
+        fps = frames_done / elapsed if elapsed > 0 and frames_done > 0 else None
+        fields = {
+            'percent': self.start_percent,
+            'frames_done': frames_done,
+            'frames_total': frames_total,
+            'fps': round(fps, 1) if fps is not None else None,
+            'eta_seconds': None,
+        }
+        if frames_total:
+            fraction = min(frames_done / frames_total, 1.0)
+            fields['percent'] = int(self.start_percent + fraction * (self.end_percent - self.start_percent))
+            if fps is not None:
+                fields['eta_seconds'] = round(max(frames_total - frames_done, 0) / fps, 1)
+        return fields
@@ -0,0 +1,174 @@
+"""Rep segmentation of per-frame movement metrics.
+
+A set of reps shows up as one dominant back-and-forth movement in the
+metrics. `RepSignal.fit` learns that movement from a golden clip: the
+metric columns are z-scored with the clip's mean and spread and
+projected onto their first principal axis, which gives one value per
+frame that swings once per rep. Its hysteresis thresholds sit near the
+bottom and top of the golden swing.
+
+`RepCounter` segments a signal online, one frame at a time: a rep
+starts when the (smoothed) signal settles on one side, crosses to the
+other side and ends when it comes back. Requiring both thresholds to
+be crossed keeps jitter around either one from counting as reps.
+`segment_reps` runs the counter over a whole clip.
+
+`RepModel` bundles a golden clip's signal with its reps and picks the
+golden rep template (the median-length rep) that user reps are
+compared against.
+
+This module only depends on NumPy.
+"""
+import numpy as np
+
+# Metrics whose joint movement defines a rep; together they cover the
+# upper body (curls, presses, flyes) and the lower body (squats, lunges)
+REP_SIGNAL_METRICS = (
+    'torso_angle', 'armpit_angle', 'shoulder_vec_norm', 'elbow_vec_norm', 'hip_vec_norm', 'knee_vec_norm'
+)
+# Valid frames a golden clip needs for its signal to be learned
+MIN_FIT_FRAMES = 10
+
+
+def stack_metrics(tracks, names=REP_SIGNAL_METRICS):
+    """Stack metric tracks into one (T, D) float64 array (NaN rows = invalid)."""
+    columns = [np.asarray(tracks[name], dtype=np.float64) for name in names]
+    return np.column_stack([column.reshape(len(column), -1) for column in columns])
+
+
+class RepSignal:
+    """Projects metric rows onto the main movement axis of a reference clip."""
+
+    def __init__(self, mean, std, axis, low, high):
+        self.mean = mean
+        self.std = std
+        self.axis = axis
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def fit(cls, rows, hysteresis=0.3):
+        """Learn the signal from (T, D) reference rows; None if too few are valid.
+
+        The thresholds sit `hysteresis` of the way in from the 10th and
+        90th percentiles of the reference signal.
+        """
+        rows = np.asarray(rows, dtype=np.float64)
+        valid = rows[~np.isnan(rows).any(axis=1)]
+        if len(valid) < MIN_FIT_FRAMES:
+            return None
+        mean = valid.mean(axis=0)
+        std = valid.std(axis=0)
+        std = np.where(std == 0, 1, std)
+        axis = np.linalg.svd((valid - mean) / std, full_matrices=False)[2][0]
+        values = (valid - mean) / std @ axis
+        p10, p90 = np.percentile(values, [10, 90])
+        margin = hysteresis * (p90 - p10)
+        return cls(mean, std, axis, p10 + margin, p90 - margin)
+
+    def project(self, rows):
+        """Return the signal of (T, D) rows (or one (D,) row); NaN where invalid."""
+        rows = np.asarray(rows, dtype=np.float64)
+        return (rows - self.mean) / self.std @ self.axis
+
+
+class RepCounter:
+    """Online hysteresis rep counter.
+
+    push() takes one signal value at a time and returns (start, end)
+    frame indices when a rep completes, else None. `smooth` is the
+    moving-average window applied first; reps shorter than
+    `min_frames` frames are treated as jitter and merged into the next.
+    """
+
+    def __init__(self, low, high, smooth=7, min_frames=10):
+        self.low = low
+        self.high = high
+        self.smooth = max(1, int(smooth))
+        self.min_frames = max(1, int(min_frames))
+        self._recent = []
+        self._start_side = None
+        self._side = None
+        self._rep_start = None
+        self.reps = 0
+
+    def _classify(self, value):
+        if value < self.low:
+            return 'low'
+        if value > self.high:
+            return 'high'
+        return None
+
+    def push(self, value, index):
+        if value is None or np.isnan(value):
+            return None
+        self._recent.append(float(value))
+        if len(self._recent) > self.smooth:
+            self._recent.pop(0)
+        side = self._classify(sum(self._recent) / len(self._recent))
+        if side is None or side == self._side:
+            return None
+
+        if self._side is None:
+            self._start_side = self._side = side
+            self._rep_start = index
+            return None
+        self._side = side
+        if side != self._start_side or index - self._rep_start < self.min_frames:
+            return None
+        rep = (self._rep_start, index)
+        self._rep_start = index
+        self.reps += 1
+        return rep
+
+
+def segment_reps(signal, low, high, smooth=7, min_frames=10):
+    """Return the [(start, end), ...] frame ranges (end exclusive) of the reps in a whole signal."""
+    counter = RepCounter(low, high, smooth=smooth, min_frames=min_frames)
+    reps = []
+    for index, value in enumerate(signal):
+        rep = counter.push(value, index)
+        if rep is not None:
+            reps.append(rep)
+    return reps
+
+
+class RepModel:
+    """A golden clip's rep signal, its reps and the golden rep template."""
+
+    def __init__(self, signal, reps, n_frames, smooth=7, min_frames=10):
+        self.signal = signal
+        self.reps = reps
+        self.n_frames = n_frames
+        self.smooth = smooth
+        self.min_frames = min_frames
+
+    @classmethod
+    def fit(cls, tracks, hysteresis=0.3, smooth=7, min_frames=10):
+        """Fit on golden metric tracks; None if the clip has too few valid frames."""
+        rows = stack_metrics(tracks)
+        signal = RepSignal.fit(rows, hysteresis)
+        if signal is None:
+            return None
+        reps = segment_reps(signal.project(rows), signal.low, signal.high, smooth, min_frames)
+        return cls(signal, reps, len(rows), smooth, min_frames)
+
+    @property
+    def template(self):
+        """(start, end) of the median-length golden rep, or the whole clip if none was found."""
+        if not self.reps:
+            return 0, self.n_frames
+        by_length = sorted(self.reps, key=lambda rep: rep[1] - rep[0])
+        return by_length[len(by_length) // 2]
+
+    def counter(self):
+        """Return a fresh RepCounter for a user clip."""
+        return RepCounter(self.signal.low, self.signal.high, smooth=self.smooth, min_frames=self.min_frames)
+
+    def project(self, tracks):
+        """Return the rep signal of metric tracks (NaN for invalid frames)."""
+        return self.signal.project(stack_metrics(tracks))
+
+    def segment(self, tracks):
+        """Return the rep ranges of a whole user clip's metric tracks."""
+        return segment_reps(self.project(tracks), self.signal.low, self.signal.high, self.smooth, self.min_frames)
@@ -0,0 +1,172 @@
+"""Content-addressed on-disk cache for /analyze-form.
+
+Uploads are identified by the SHA-256 of their bytes. Two kinds of
+entries are kept under the cache directory:
+
+* keypoints/<key>.npy - the (T, 17, 3) MoveNet keypoints of a video.
+  They do not depend on the exercise, so a clip re-uploaded for another
+  exercise still skips pose estimation.
+* results/<key>.json - the final scores and analysis markdown, keyed by
+  video, exercise and scoring version/config.
+
+Recency is the entry file's mtime (refreshed on every hit), so the LRU
+order survives restarts. The total size of all entries is kept under
+max_bytes by evicting the least recently used ones. Several processes
+(e.g. analysis job workers) may share one directory; each keeps its
+own index and picks up entries stored by the others on lookup, so the
+size bound is enforced per process.
+
+This module only depends on NumPy and the standard library.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+KINDS = {'keypoints': '.npy', 'results': '.json'}
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """Return a cache key (SHA-256 hex) for a sequence of key parts."""
+    return hashlib.sha256(json.dumps([str(p) for p in parts]).encode()).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of keypoints and analysis results on disk."""
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # {(kind, key): size}, least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key + KINDS[kind])
+
+    def _scan(self):
+        """Index the entries left by previous runs, oldest first."""
+        found = []
+        for kind, suffix in KINDS.items():
+            directory = os.path.join(self.cache_dir, kind)
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if not name.endswith(suffix):
+                    continue
+                try:
+                    st = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime_ns, kind, name[:-len(suffix)], st.st_size))
+
+        for _, kind, key, size in sorted(found):
+            self._entries[(kind, key)] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            (kind, key), size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(kind, key))
+            except OSError:
+                pass
+
+    def _get(self, kind, key, load):
+        path = self._path(kind, key)
+        with self._lock:
+            if (kind, key) not in self._entries:
+                # Another process sharing the directory may have stored it
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    self.misses += 1
+                    return None
+                self._entries[(kind, key)] = size
+                self._total_bytes += size
+            self._entries.move_to_end((kind, key))
+        try:
+            value = load(path)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            log.warning("Result cache: dropping unreadable entry %s: %s", path, e)
+            with self._lock:
+                self._total_bytes -= self._entries.pop((kind, key), 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def _put(self, kind, key, write):
+        directory = os.path.join(self.cache_dir, kind)
+        # Write to a temp file and rename, so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, self._path(kind, key))
+        except OSError as e:
+            log.warning("Result cache: failed to store %s entry: %s", kind, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._total_bytes += size - self._entries.pop((kind, key), 0)
+            self._entries[(kind, key)] = size
+            self._evict()
+
+    def get_keypoints(self, key):
+        """Return cached (T, 17, 3) keypoints, or None."""
+        return self._get('keypoints', key, lambda path: np.load(path, allow_pickle=False))
+
+    def put_keypoints(self, key, keypoints):
+        self._put('keypoints', key, lambda f: np.save(f, np.asarray(keypoints, dtype=np.float32)))
+
+    def get_result(self, key):
+        """Return a cached analysis result dict, or None."""
+        def load(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return self._get('results', key, load)
+
+    def put_result(self, key, result):
+        self._put('results', key, lambda f: f.write(json.dumps(result).encode('utf-8')))
+
+    def stats(self):
+        """Return cache counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
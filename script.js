@@ -136,6 +136,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const progressContainer = document.getElementById('analysis-progress-container');
     const progressBar = document.getElementById('analysis-progress-bar');
     const progressStatus = document.getElementById('analysis-progress-status');
+    // Live (camera) mode
+    const liveModeBtn = document.getElementById('live-mode-btn');
+    const livePreview = document.getElementById('live-preview');
+    let liveRun = null;
 
     
     // Coach Tab
@@ -397,8 +401,25 @@ function showAppUI(email) {
             </div>
         `;
         
-        // Convert simple markdown from AI to HTML
-        let analysisHtml = analysis
+        html += formatRepScoresAsHTML(data.reps || []);
+        html += markdownToHTML(analysis);
+        
+        return html;
+    }
+
+    // One line per rep, most recent first (at most `limit` reps)
+    function formatRepScoresAsHTML(reps, limit = 20) {
+        if (!reps.length) return '';
+        return '<ul>' + reps.slice(-limit).reverse().map(rep =>
+            `<li><strong>Rep ${rep.rep}:</strong> ${rep.scores['Final Score']}/100 ` +
+            `(Stability ${rep.scores['Stability Score']}, Control ${rep.scores['Control Score']}, ` +
+            `Spine ${rep.scores['Spine Score']})</li>`
+        ).join('') + '</ul>';
+    }
+
+    // Convert simple markdown from AI to HTML
+    function markdownToHTML(markdown) {
+        let analysisHtml = markdown
             .replace(/### (.*)/g, '<h3>$1</h3>')
             .replace(/\*\*(.*?)\*\*/g, '<strong>$1</strong>')
             .replace(/\* (.*)/g, '<li>$1</li>')
@@ -411,10 +432,7 @@ function showAppUI(email) {
         analysisHtml = analysisHtml.replace(/<\/ul><br><ul>/g, '');
         analysisHtml = analysisHtml.replace(/<\/ul><ul>/g, '');
 
-
-        html += analysisHtml;
-        
-        return html;
+        return analysisHtml;
     }
 
 
@@ -723,14 +741,14 @@ function showAppUI(email) {
         progressBar.style.width = "5%"; // Start with a small amount
         formAnalysisResponseEl.innerHTML = ""; // Clear previous results
 
-        const formData = new FormData();
-        formData.append('exercise_name', exercise);
-        formData.append('video', videoFile);
-
         try {
-            const response = await fetch(`${API_URL}/analyze-form`, {
+            // Send the file as the raw body so the server can start
+            // analyzing it while it is still uploading
+            const params = new URLSearchParams({ exercise_name: exercise });
+            const response = await fetch(`${API_URL}/analyze-form/stream?${params}`, {
                 method: 'POST',
-                body: formData,
+                headers: { 'Content-Type': videoFile.type || 'application/octet-stream' },
+                body: videoFile,
             });
 
             if (!response.ok) {
@@ -743,6 +761,7 @@ function showAppUI(email) {
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
             let buffer = ''; // To store incomplete JSON chunks
+            let partialAnalysis = ''; // Coach feedback streamed so far
 
             while (true) {
                 const { done, value } = await reader.read();
@@ -765,8 +784,21 @@ function showAppUI(email) {
                         
                         // Update UI based on the streamed object
                         progressStatus.textContent = progressUpdate.message;
+                        if (progressUpdate.frames_total) {
+                            // Frame-by-frame progress of the MoveNet stage
+                            let detail = `${progressUpdate.frames_done}/${progressUpdate.frames_total} frames`;
+                            if (progressUpdate.eta_seconds != null) {
+                                detail += `, about ${Math.ceil(progressUpdate.eta_seconds)}s left`;
+                            }
+                            progressStatus.textContent += ` (${detail})`;
+                        }
                         progressBar.style.width = `${progressUpdate.percent}%`;
 
+                        if (progressUpdate.status === 'analysis_chunk') {
+                            // Show the coach's feedback while it is written
+                            partialAnalysis += progressUpdate.text;
+                            formAnalysisResponseEl.innerHTML = markdownToHTML(partialAnalysis);
+                        }
                         if (progressUpdate.status === 'complete') {
                             // This is the final message with the data
                             formAnalysisResponseEl.innerHTML = formatFormAnalysisAsHTML(progressUpdate.data);
@@ -793,6 +825,127 @@ function showAppUI(email) {
         }
     }
     
+    // --- LIVE MODE ---
+    // Frame sources hand out one JPEG Blob per nextFrame() call (null
+    // when they run out) so the live loop works the same with a camera
+    // or with scripted frames (e.g. in tests: createScriptedFrameSource)
+
+    async function createCameraFrameSource(videoEl, width = 480, quality = 0.7) {
+        const stream = await navigator.mediaDevices.getUserMedia({ video: true, audio: false });
+        videoEl.srcObject = stream;
+        await videoEl.play();
+        const canvas = document.createElement('canvas');
+        return {
+            async nextFrame() {
+                if (!videoEl.videoWidth) return null;
+                canvas.width = width;
+                canvas.height = Math.round(width * videoEl.videoHeight / videoEl.videoWidth);
+                canvas.getContext('2d').drawImage(videoEl, 0, 0, canvas.width, canvas.height);
+                return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', quality));
+            },
+            stop() {
+                stream.getTracks().forEach(track => track.stop());
+                videoEl.srcObject = null;
+            },
+        };
+    }
+
+    function createScriptedFrameSource(frames) {
+        let index = 0;
+        return {
+            async nextFrame() { return index < frames.length ? frames[index++] : null; },
+            stop() { index = frames.length; },
+        };
+    }
+    window.createScriptedFrameSource = createScriptedFrameSource;
+
+    function formatLiveUpdateAsHTML(update) {
+        const running = update.running || {};
+        let html = `
+            <h3 style="color: white; font-size: 1.5rem; text-align: center; margin-bottom: 1.5rem;">
+                Reps: ${update.reps}${update.avg_rep_score != null ? ` &middot; Average Score: ${update.avg_rep_score} / 100` : ''}
+            </h3>
+            <p style="color: var(--text-light);">
+                Spine curvature: ${running.avg_spine_curvature ?? '-'} &middot;
+                ${update.frames_processed} frames analyzed, ${update.frames_dropped} skipped &middot;
+                ${update.latency_ms} ms per update
+            </p>
+        `;
+        if (!update.rep_counting) {
+            html += `<p style="color: var(--text-light);">Rep counting is not available for this exercise.</p>`;
+        }
+        html += formatRepScoresAsHTML(update.rep_results || [], 10);
+        return html;
+    }
+
+    /**
+     * Run a live session: post each frame as soon as the previous update
+     * is back, so a slow server slows the frame rate instead of building
+     * up a backlog. Runs until the source runs out or stop() is called.
+     */
+    async function runLiveSession(exercise, source, onUpdate) {
+        const session = await apiFetch('/live/sessions', {
+            method: 'POST',
+            body: JSON.stringify({ exercise_name: exercise }),
+        });
+        const run = { stopped: false, stop() { this.stopped = true; source.stop(); } };
+        liveRun = run;
+        const repResults = [];
+        try {
+            while (!run.stopped) {
+                const frame = await source.nextFrame();
+                if (!frame) break;
+                const response = await fetch(`${API_URL}${session.frames_url}`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'image/jpeg' },
+                    body: frame,
+                });
+                const update = await response.json();
+                if (!response.ok) throw new Error(update.error || `HTTP error! status: ${response.status}`);
+                repResults.push(...update.new_reps);
+                onUpdate({ ...update, rep_results: repResults.slice(-50) });
+            }
+        } finally {
+            source.stop();
+            fetch(`${API_URL}/live/sessions/${session.session_id}`, { method: 'DELETE' }).catch(() => {});
+            if (liveRun === run) liveRun = null;
+        }
+    }
+
+    async function toggleLiveMode() {
+        if (liveRun) {
+            liveRun.stop();
+            return;
+        }
+        if (!currentUserEmail) {
+            formAnalysisResponseEl.innerHTML = `<p style="color: var(--error);">You must be logged in to analyze form.</p>`;
+            return;
+        }
+        const exercise = exerciseSelect.value;
+        if (!exercise) {
+            formAnalysisResponseEl.innerHTML = `<p style="color: var(--error);">Please select an exercise.</p>`;
+            return;
+        }
+
+        analyzeFormBtn.disabled = true;
+        liveModeBtn.textContent = "Stop Live Mode";
+        livePreview.classList.remove('hidden');
+        formAnalysisResponseEl.innerHTML = `<p>Starting camera...</p>`;
+        try {
+            const source = await createCameraFrameSource(livePreview);
+            await runLiveSession(exercise, source, update => {
+                formAnalysisResponseEl.innerHTML = formatLiveUpdateAsHTML(update);
+            });
+        } catch (error) {
+            console.error("Error in live mode:", error);
+            formAnalysisResponseEl.innerHTML = `<p style="color: var(--error);">Error: ${error.message}</p>`;
+        } finally {
+            analyzeFormBtn.disabled = false;
+            liveModeBtn.textContent = "Start Live Mode";
+            livePreview.classList.add('hidden');
+        }
+    }
+
     // --- NEW: Save Button Logic ---
     function handleSaveWorkoutClick() {
         if (loginMode === 'google') {
@@ -1256,6 +1409,39 @@ function showAppUI(email) {
         p.innerHTML = `<strong>${role === 'user' ? 'You' : 'Jimbo'}:</strong> ${message}`;
         el.appendChild(p);
         el.scrollTop = el.scrollHeight; // Auto-scroll to bottom
+        return p;
+    }
+
+    // Ask the coach and show the answer in the chat UI as it streams in.
+    // Returns the full answer.
+    async function streamChatReply(historyEl, contextPlan, history, message) {
+        let response;
+        try {
+            response = await fetch(`${API_URL}/chat-with-plan`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ context_plan: contextPlan, history: history, message: message, stream: true })
+            });
+        } catch (err) {
+            throw new Error("Cannot connect to API server. Is it running?");
+        }
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+        }
+
+        const replyEl = appendToChatHistory(historyEl, '', 'ai');
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let reply = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            reply += decoder.decode(value, { stream: true });
+            replyEl.innerHTML = `<strong>Jimbo:</strong> ${reply}`;
+            historyEl.scrollTop = historyEl.scrollHeight;
+        }
+        return reply;
     }
 
     async function handleWorkoutChatSend() {
@@ -1267,17 +1453,7 @@ function showAppUI(email) {
         workoutChatHistory.push({ role: 'user', content: message });
 
         try {
-            const data = await apiFetch('/chat-with-plan', {
-                method: 'POST',
-                body: JSON.stringify({
-                    context_plan: currentPlan,
-                    history: workoutChatHistory,
-                    message: message
-                })
-            });
-            
-            const aiResponse = data.response;
-            appendToChatHistory(workoutChatHistoryEl, aiResponse, 'ai');
+            const aiResponse = await streamChatReply(workoutChatHistoryEl, currentPlan, workoutChatHistory, message);
             workoutChatHistory.push({ role: 'ai', content: aiResponse });
 
         } catch (error) {
@@ -1294,17 +1470,7 @@ function showAppUI(email) {
         nutritionChatHistory.push({ role: 'user', content: message });
 
         try {
-            const data = await apiFetch('/chat-with-plan', {
-                method: 'POST',
-                body: JSON.stringify({
-                    context_plan: currentNutritionPlan,
-                    history: nutritionChatHistory,
-                    message: message
-                })
-            });
-            
-            const aiResponse = data.response;
-            appendToChatHistory(nutritionChatHistoryEl, aiResponse, 'ai');
+            const aiResponse = await streamChatReply(nutritionChatHistoryEl, currentNutritionPlan, nutritionChatHistory, message);
             nutritionChatHistory.push({ role: 'ai', content: aiResponse });
 
         } catch (error) {
@@ -1326,6 +1492,7 @@ function showAppUI(email) {
     
     evaluateBtn.addEventListener('click', evaluateProgress);
     formAnalysisForm.addEventListener('submit', analyzeForm);
+    liveModeBtn.addEventListener('click', toggleLiveMode);
     
     // Chat Listeners
     workoutChatSend.addEventListener('click', handleWorkoutChatSend);
@@ -0,0 +1,296 @@
+"""Logging, trace IDs and Prometheus-style metrics.
+
+`configure_logging` sends log records to stderr, as plain text or as
+one JSON object per line, and stamps each record with the trace ID of
+the request it belongs to. Trace IDs are kept in a context variable:
+`set_trace_id` at the start of a request or job, and every log record
+from that thread carries it.
+
+`MetricsRegistry` holds counters and histograms (with labels) and
+renders them in the Prometheus text exposition format for a /metrics
+endpoint. Gauges are read from callbacks when the registry is
+rendered, so they always show current values (e.g. queue depth).
+
+`StageTimer` adds up the wall time of the named stages of one piece of
+work, so they can be shipped (e.g. from a job worker process) and
+observed into a histogram by the process that serves /metrics.
+
+This module only depends on the standard library.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Seconds; spans a DTW comparison up to a long video or a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_TRACE_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+_trace_id = contextvars.ContextVar('trace_id', default=None)
+
+
+# --- Trace IDs ---
+
+def new_trace_id():
+    return uuid.uuid4().hex[:16]
+
+
+def valid_trace_id(value):
+    """Return `value` if it is usable as a trace ID (e.g. from a request header), else None."""
+    if value and _TRACE_ID_PATTERN.match(value):
+        return value
+    return None
+
+
+def set_trace_id(trace_id):
+    """Make `trace_id` the current trace of this thread (or context)."""
+    _trace_id.set(trace_id)
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+# --- Logging ---
+
+class _TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = current_trace_id() or '-'
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, trace_id, message."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'trace_id': getattr(record, 'trace_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+def configure_logging(level='INFO', fmt='text'):
+    """Log to stderr at `level`, as 'text' or 'json' lines."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(_TraceIdFilter())
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s'
+        ))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+# --- Metrics ---
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name + '_total', list(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values per label combination."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # key -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(_label_key(self.labelnames, labels))
+            return state[-1] if state else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield self.name + '_bucket', pairs + [('le', _format_value(bound))], cumulative
+            yield self.name + '_bucket', pairs + [('le', '+Inf')], state[-1]
+            yield self.name + '_sum', pairs, state[-2]
+            yield self.name + '_count', pairs, state[-1]
+
+
+class _GaugeCallback:
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if values is None:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in sorted(values.items()):
+            key = key if isinstance(key, tuple) else (key,)
+            if value is not None:
+                yield self.name, list(zip(self.labelnames, map(str, key))), value
+
+
+class MetricsRegistry:
+    """Named counters, histograms and gauge callbacks, rendered together."""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, callback, labelnames=()):
+        """Register a gauge read from `callback()` at render time.
+
+        The callback returns a number, None (no sample), or a dict of
+        label value (tuple) -> number.
+        """
+        return self._register(_GaugeCallback(self.prefix + name, documentation, labelnames, callback))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logging.getLogger(__name__).warning("Metric %s failed to collect: %s", metric.name, e)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, pairs, value in samples:
+                lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+class StageTimer:
+    """Adds up the wall time of named stages of one piece of work."""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+
+    def to_dict(self):
+        """Stage -> seconds, rounded for JSON events."""
+        return {name: round(seconds, 6) for name, seconds in self.seconds.items()}
@@ -0,0 +1,86 @@
+"""Shared fixtures: app.py imported offline with a stub MoveNet model."""
+import glob
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+import tensorflow as tf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Never talk to Gemini or TF-Hub from the tests. Set before app.py runs
+# load_dotenv(), which does not override variables that are already set.
+os.environ["GOOGLE_API_KEY"] = "offline-test-key"
+# Gemini is never called: LLM requests are answered by the stub backend
+os.environ["LLM_BACKEND"] = "stub"
+# No local bundle: MoveNet comes from the (patched) TF-Hub loader
+os.environ["MOVENET_MODEL_DIR"] = os.path.join(ROOT, "tests", "no-movenet-bundle")
+os.environ["MOVENET_ALLOW_HUB"] = "1"
+
+VIDEO_PATH = sorted(glob.glob(os.path.join(ROOT, "video test", "*.mp4")))[0]
+
+
+class StubMoveNet(tf.Module):
+    """Deterministic stand-in for the MoveNet singlepose signature.
+
+    Maps a [1, 256, 256, 3] int32 image to [1, 1, 17, 3] (y, x, score)
+    keypoints through 32x32 average pooling and a fixed random
+    projection, so outputs depend smoothly on the pixels. Scores are
+    kept above MIN_CONFIDENCE so frames count as valid.
+    """
+
+    def __init__(self, seed=0):
+        super().__init__()
+        rng = np.random.default_rng(seed)
+        self.weights = tf.constant(rng.normal(0, 4 / np.sqrt(192), (192, 51)), dtype=tf.float32)
+
+    @tf.function(input_signature=[tf.TensorSpec([1, 256, 256, 3], tf.int32)])
+    def __call__(self, input):
+        pooled = tf.nn.avg_pool2d(tf.cast(input, tf.float32) / 255.0, ksize=32, strides=32, padding='VALID')
+        values = tf.reshape(tf.sigmoid(tf.matmul(tf.reshape(pooled, [1, 192]), self.weights)), [1, 1, 17, 3])
+        return {'output_0': tf.concat([values[..., :2], 0.5 + 0.5 * values[..., 2:]], axis=-1)}
+
+
+class _StubHubModule:
+    def __init__(self):
+        self.stub = StubMoveNet()
+        self.signatures = {'serving_default': self.stub.__call__.get_concrete_function()}
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    """app.py, with TF-Hub returning StubMoveNet instead of downloading MoveNet."""
+    import tensorflow_hub as hub
+    patch = pytest.MonkeyPatch()
+    patch.setattr(hub, "load", lambda url: _StubHubModule())
+    patch.chdir(ROOT)
+    try:
+        import app
+        yield app
+    finally:
+        patch.undo()
+
+
+@pytest.fixture(scope="session")
+def movenet(app_module):
+    model = app_module.wait_for_movenet(60)
+    assert model is not None, "stub MoveNet did not load"
+    return model
+
+
+@pytest.fixture(scope="session")
+def video_frames():
+    """The first 24 RGB frames of the sample clip."""
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    frames = []
+    while len(frames) < 24:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    assert frames, f"cannot decode {VIDEO_PATH}"
+    return frames
@@ -0,0 +1,78 @@
+"""dtw_engine must reproduce dtw-python's normalized distance."""
+import numpy as np
+import pytest
+
+from dtw_engine import dtw_distance, dtw_lower_bound, envelope
+
+dtw = pytest.importorskip("dtw")
+
+# Largest allowed |difference| from dtw-python's normalizedDistance
+TOLERANCE = 1e-9
+
+# (query length, reference length): equal, longer query, longer
+# reference, and tracks spanning several cost blocks
+LENGTHS = [(40, 40), (90, 57), (57, 90), (150, 131), (7, 12)]
+
+WINDOWS = [
+    (None, {}),
+    ('sakoechiba', {'window_type': 'sakoechiba', 'window_args': {'window_size': 10}}),
+    ('itakura', {'window_type': 'itakura'}),
+]
+
+
+def random_track(rng, length, dims=6):
+    return np.cumsum(rng.normal(size=(length, dims)), axis=0)
+
+
+def reference_distance(x, y, kwargs):
+    try:
+        return dtw.dtw(x, y, **kwargs).normalizedDistance
+    except ValueError:
+        # dtw-python raises when the window leaves no warping path
+        return np.inf
+
+
+@pytest.mark.parametrize("n, m", LENGTHS)
+@pytest.mark.parametrize("window_type, kwargs", WINDOWS, ids=[w for w, _ in WINDOWS])
+def test_matches_dtw_python(n, m, window_type, kwargs):
+    rng = np.random.default_rng(n * 1000 + m)
+    x, y = random_track(rng, n), random_track(rng, m)
+    window_size = kwargs.get('window_args', {}).get('window_size')
+    expected = reference_distance(x, y, kwargs)
+    actual = dtw_distance(x, y, window_type, window_size)
+    if np.isinf(expected):
+        assert np.isinf(actual)
+    else:
+        assert abs(actual - expected) <= TOLERANCE
+
+
+def test_window_without_path_is_inf():
+    rng = np.random.default_rng(0)
+    x, y = random_track(rng, 10), random_track(rng, 40)
+    assert np.isinf(dtw_distance(x, y, 'itakura'))
+    assert np.isinf(dtw_distance(x, y, 'sakoechiba', 5))
+
+
+def test_cutoff():
+    rng = np.random.default_rng(1)
+    x, y = random_track(rng, 80), random_track(rng, 70)
+    distance = dtw_distance(x, y)
+    assert dtw_distance(x, y, cutoff=distance * 1.01) == distance
+    assert np.isinf(dtw_distance(x, y, cutoff=distance * 0.99))
+    # Far below the distance, the early exit must not change the answer
+    assert np.isinf(dtw_distance(x, y, cutoff=distance * 0.01))
+
+
+@pytest.mark.parametrize("n, m", LENGTHS)
+def test_lower_bound_never_exceeds_distance(n, m):
+    rng = np.random.default_rng(n + m)
+    x, y = random_track(rng, n), random_track(rng, m)
+    assert dtw_lower_bound(x, y) <= dtw_distance(x, y) + TOLERANCE
+    radius = max(10, abs(n - m))
+    banded = dtw_lower_bound(x, y, envelope(x, radius), envelope(y, radius))
+    assert banded <= dtw_distance(x, y, 'sakoechiba', radius) + TOLERANCE
+
+
+def test_rejects_unknown_window():
+    with pytest.raises(ValueError):
+        dtw_distance(np.zeros((3, 2)), np.zeros((3, 2)), 'diagonal')
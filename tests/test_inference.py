@@ -0,0 +1,32 @@
+"""Batched MoveNet inference must match the single-frame path."""
+import numpy as np
+
+# Largest allowed |difference| of any keypoint coordinate or score
+# (both are in [0, 1]) between batched and single-frame inference
+TOLERANCE = 1e-5
+
+
+def test_batched_inference_matches_single_frame(app_module, movenet, video_frames):
+    single = np.stack([app_module.run_inference(movenet, frame) for frame in video_frames])
+    for batch_size in (1, 5, 8):
+        batched = np.concatenate([
+            app_module.run_inference_batch(movenet, video_frames[start:start + batch_size])
+            for start in range(0, len(video_frames), batch_size)
+        ])
+        assert batched.shape == single.shape
+        assert np.abs(batched - single).max() <= TOLERANCE
+
+
+def test_empty_batch(app_module, movenet):
+    assert app_module.run_inference_batch(movenet, []).shape == (0, 17, 3)
+
+
+def test_sampled_frame_indices_match_keypoints(app_module, movenet):
+    from conftest import VIDEO_PATH
+
+    stats = {}
+    samples = app_module.extract_keypoint_samples(movenet, VIDEO_PATH, batch_size=4, stats=stats, end_frame=40)
+    frame_indices, keypoints, start_frame, n_frames = samples
+    assert len(frame_indices) == len(keypoints) == stats['frames_processed']
+    assert np.all(np.diff(frame_indices) > 0)
+    assert start_frame == 0 and n_frames == 40
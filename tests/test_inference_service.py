@@ -0,0 +1,51 @@
+"""InferenceService must batch concurrent callers without changing keypoints."""
+import threading
+
+import numpy as np
+
+from inference_service import InferenceService
+
+SESSIONS = 4
+CHUNK = 4
+
+
+def test_concurrent_sessions_share_batches(movenet, video_frames):
+    chunks = [video_frames[start:start + CHUNK] for start in range(0, len(video_frames), CHUNK)]
+    expected = [movenet.infer_batch(chunk) for chunk in chunks]
+    # A long wait: batches go out once every session has a request in
+    service = InferenceService(movenet, max_batch_size=32, max_wait_ms=1000)
+    ready = threading.Barrier(SESSIONS)
+    results = [None] * SESSIONS
+
+    def session(index):
+        with service.session():
+            ready.wait()
+            results[index] = [service.infer_batch(chunk) for chunk in chunks]
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(SESSIONS)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+        stats = service.stats()
+    finally:
+        service.close()
+
+    for keypoints in results:
+        assert keypoints is not None
+        for actual, wanted in zip(keypoints, expected):
+            np.testing.assert_array_equal(actual, wanted)
+    assert stats['requests'] == SESSIONS * len(chunks)
+    assert stats['batches'] < stats['requests']
+
+
+def test_lone_caller_is_not_delayed(movenet, video_frames):
+    service = InferenceService(movenet, max_batch_size=32, max_wait_ms=10000)
+    try:
+        with service.session():
+            keypoints = service.infer_batch(video_frames[:CHUNK])
+        assert service.stats()['latency_ms']['p50'] < 5000
+    finally:
+        service.close()
+    assert keypoints.shape == (CHUNK, 17, 3)
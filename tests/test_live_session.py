@@ -0,0 +1,85 @@
+"""LiveSession driven by ScriptedFrameSource, with golden metric rows as frames."""
+import time
+
+import numpy as np
+import pytest
+
+from live_session import LiveSession, ScriptedFrameSource
+
+EXERCISE = 'Back Squat'
+REPLAYS = 3
+
+
+@pytest.fixture(scope="module")
+def golden(app_module):
+    golden = app_module.get_golden_data(EXERCISE)
+    assert golden is not None and golden.rep_model is not None
+    return golden
+
+
+def make_session(app_module, golden, pose_metrics=None, **limits):
+    """A live session whose 'frames' are row indices into the golden clip, replayed."""
+    n = len(golden.metrics)
+    template = golden.rep_template
+    return LiveSession(
+        'test', EXERCISE, golden.rep_model,
+        pose_metrics=pose_metrics or (lambda frames: golden.metrics[np.array(frames) % n]),
+        to_tracks=app_module.metrics_to_dict,
+        score_rep=lambda tracks: app_module.calculate_scores_v5(template, tracks, EXERCISE),
+        **limits,
+    )
+
+
+def test_reps_are_scored_on_their_own_frames(app_module, golden):
+    n = len(golden.metrics)
+    session = make_session(app_module, golden, frame_budget_ms=0)
+    for batch in ScriptedFrameSource(frames=list(range(REPLAYS * n))).batches(8):
+        update = session.process(batch)
+
+    summary = session.summary()
+    assert update['frames_processed'] == REPLAYS * n
+    assert update['frames_dropped'] == 0
+    assert summary['reps'] >= REPLAYS
+    template = golden.rep_template
+    for rep in summary['rep_results']:
+        rows = golden.metrics[np.arange(rep['start_frame'], rep['end_frame']) % n]
+        rows = rows[~np.isnan(rows).any(axis=1)]
+        expected = app_module.calculate_scores_v5(template, app_module.metrics_to_dict(rows), EXERCISE)
+        assert rep['frames'] == len(rows)
+        assert rep['scores'] == expected
+    assert summary['avg_rep_score'] == round(
+        np.mean([rep['scores']['Final Score'] for rep in summary['rep_results']]), 1
+    )
+
+
+def test_session_memory_is_bounded(app_module, golden):
+    n = len(golden.metrics)
+    session = make_session(app_module, golden, frame_budget_ms=0, max_frames=50, max_rep_frames=40, max_reps=2)
+    for batch in ScriptedFrameSource(frames=list(range(REPLAYS * n))).batches(8):
+        update = session.process(batch)
+        assert update['rep_in_progress_frames'] <= 40
+        assert len(session._recent) <= 50
+
+    summary = session.summary()
+    assert summary['reps'] > 2
+    assert [rep['rep'] for rep in summary['rep_results']] == [summary['reps'] - 1, summary['reps']]
+    assert any(rep['truncated'] for rep in summary['rep_results'])
+
+
+def test_frames_over_budget_are_dropped(app_module, golden):
+    n = len(golden.metrics)
+
+    def slow_pose_metrics(frames):
+        time.sleep(0.01 * len(frames))
+        return golden.metrics[np.array(frames) % n]
+
+    session = make_session(app_module, golden, pose_metrics=slow_pose_metrics, frame_budget_ms=25)
+    updates = [session.process(batch) for batch in ScriptedFrameSource(frames=list(range(40))).batches(8)]
+
+    # No cost estimate yet for the first batch, then ~10 ms a frame
+    assert updates[0]['dropped_in_batch'] == 0
+    for update in updates[1:]:
+        assert 8 - 3 <= update['dropped_in_batch'] <= 8 - 1
+    last = updates[-1]
+    assert last['frames_received'] == 40
+    assert last['frames_processed'] + last['frames_dropped'] == 40
@@ -0,0 +1,148 @@
+"""LLMClient deadline, retry, concurrency and circuit-breaker behaviour (offline)."""
+import threading
+import time
+
+import pytest
+
+import llm_client
+from llm_client import CircuitBreaker, LLMClient, LLMTimeout, LLMUnavailable, StubBackend
+
+
+class CountingBackend(StubBackend):
+    """StubBackend that records how many calls run at once."""
+
+    def __init__(self, delay=0.0, fail_rate=0.0):
+        super().__init__(delay, fail_rate)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+
+    def generate(self, contents, json_mode=False, timeout=None):
+        with self._lock:
+            self.active += 1
+            self.calls += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            return super().generate(contents, json_mode, timeout)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_call_stops_waiting_at_deadline():
+    client = LLMClient(StubBackend(delay=1.0), timeout=0.1, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate("prompt", endpoint="test")
+    assert time.monotonic() - started < 0.5
+    assert client.stats()['endpoints']['test']['errors'] == {'LLMTimeout': 1}
+
+
+def test_transient_errors_are_retried_with_jittered_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_client.time, 'sleep', sleeps.append)
+    backend = CountingBackend(fail_rate=1.0)
+    client = LLMClient(backend, timeout=30, max_retries=3, backoff_base=0.05, backoff_max=0.15,
+                       breaker=CircuitBreaker(failure_threshold=100))
+    with pytest.raises(ConnectionError):
+        client.generate("prompt", endpoint="test")
+
+    assert backend.calls == 4
+    assert client.stats()['endpoints']['test']['retries'] == 3
+    # Full jitter: uniform in [0, min(backoff_max, base * 2**attempt)]
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(0.15, 0.05 * 2 ** attempt)
+    assert len(set(sleeps)) > 1
+
+
+def test_retries_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(llm_client.time, 'sleep', lambda delay: None)
+    client = LLMClient(StubBackend(fail_rate=1.0), max_retries=2, breaker=CircuitBreaker(failure_threshold=100))
+    with caplog.at_level('WARNING', logger='llm_client'), pytest.raises(ConnectionError):
+        client.generate("prompt", endpoint="test")
+    retries = [record.getMessage() for record in caplog.records if record.name == 'llm_client']
+    assert len(retries) == 2
+    assert retries[0].startswith("LLM call for test failed (ConnectionError")
+
+
+def test_stream_retries_before_first_chunk(monkeypatch, caplog):
+    monkeypatch.setattr(llm_client.time, 'sleep', lambda delay: None)
+    client = LLMClient(StubBackend(fail_rate=1.0), max_retries=2, breaker=CircuitBreaker(failure_threshold=100))
+    with caplog.at_level('WARNING', logger='llm_client'), pytest.raises(ConnectionError):
+        list(client.stream("prompt", endpoint="test"))
+    assert client.stats()['endpoints']['test']['retries'] == 2
+    assert sum(record.name == 'llm_client' for record in caplog.records) == 2
+
+
+def test_non_retryable_errors_are_not_retried():
+    class Rejected(Exception):
+        pass
+
+    class RejectingBackend(StubBackend):
+        def generate(self, contents, json_mode=False, timeout=None):
+            raise Rejected("bad request")
+
+    client = LLMClient(RejectingBackend(), max_retries=3)
+    with pytest.raises(Rejected):
+        client.generate("prompt", endpoint="test")
+    assert client.stats()['endpoints']['test']['retries'] == 0
+    assert client.breaker.state == 'closed'
+
+
+def test_concurrency_is_bounded():
+    backend = CountingBackend(delay=0.2)
+    client = LLMClient(backend, timeout=10, max_concurrency=2)
+    threads = [threading.Thread(target=client.generate, args=("prompt",)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert backend.calls == 5
+    assert backend.peak == 2
+
+
+def test_no_free_slot_before_deadline_fails_fast():
+    client = LLMClient(StubBackend(delay=0.5), timeout=10, max_concurrency=1)
+    slow = threading.Thread(target=client.generate, args=("prompt",))
+    slow.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(LLMUnavailable):
+            client.generate("prompt", endpoint="test", timeout=0.1)
+        assert client.stats()['endpoints']['test']['errors'] == {'saturated': 1}
+    finally:
+        slow.join(5)
+
+
+def test_breaker_opens_then_half_opens():
+    backend = CountingBackend(fail_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+    client = LLMClient(backend, timeout=5, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.generate("prompt")
+    assert breaker.state == 'open'
+
+    # Open: refused without calling the backend
+    with pytest.raises(LLMUnavailable) as refused:
+        client.generate("prompt")
+    assert refused.value.retry_after > 0
+    assert backend.calls == 2
+
+    # Half-open: one trial call; its failure re-opens the circuit
+    time.sleep(0.25)
+    with pytest.raises(ConnectionError):
+        client.generate("prompt")
+    assert backend.calls == 3
+    assert breaker.state == 'open'
+    with pytest.raises(LLMUnavailable):
+        client.generate("prompt")
+
+    # A successful trial closes it again
+    time.sleep(0.25)
+    backend.fail_rate = 0.0
+    assert client.generate("prompt").startswith("*Stub LLM response")
+    assert breaker.state == 'closed'
+    assert breaker.trips == 1
@@ -0,0 +1,46 @@
+"""Plan requests are cached by canonical fields but prompted with the values as sent."""
+import json
+
+import pytest
+
+from plan_cache import PlanCache
+
+WORKOUT = {
+    'goal': 'build muscle', 'experience_level': 'beginner', 'days_per_week': 3,
+    'hours_per_day': 1.1, 'available_equipment': 'Dumbbells, bench',
+}
+PLAN = {'title': 'Plan', 'days': [{}, {}, {}]}
+
+
+@pytest.fixture
+def client(app_module, monkeypatch, tmp_path):
+    prompts = []
+
+    def generate(contents, endpoint='default', json_mode=False, timeout=None):
+        prompts.append(contents[1])
+        return json.dumps(PLAN)
+
+    monkeypatch.setattr(app_module, 'plan_cache', PlanCache(str(tmp_path / 'plans.sqlite3')))
+    monkeypatch.setattr(app_module.llm_client, 'generate', generate)
+    with app_module.app.test_client() as client:
+        client.prompts = prompts
+        yield client
+
+
+def test_prompt_keeps_raw_values(client):
+    response = client.post('/generate-workout', json=WORKOUT)
+    assert response.status_code == 200
+    assert response.headers['X-Plan-Cache'] == 'miss'
+    prompt, = client.prompts
+    assert 'Goal: build muscle' in prompt
+    assert 'Hours/Day: 1.1' in prompt
+    assert 'Equipment: Dumbbells, bench' in prompt
+
+
+def test_equivalent_requests_share_a_cache_entry(client):
+    client.post('/generate-workout', json=WORKOUT)
+    same = dict(WORKOUT, goal='Build  Muscle', hours_per_day=1.0, available_equipment='bench, dumbbells')
+    response = client.post('/generate-workout', json=same)
+    assert response.headers['X-Plan-Cache'] == 'hit'
+    assert response.get_json() == PLAN
+    assert len(client.prompts) == 1
@@ -0,0 +1,49 @@
+"""The TFLite backend must match the TF SavedModel backend."""
+import numpy as np
+import pytest
+import tensorflow as tf
+
+from conftest import StubMoveNet
+from pose_backends import PoseBackend, TFLiteBackend, TFSavedModelBackend
+
+# Largest allowed |difference| of any keypoint coordinate or score; the
+# backends letterbox with different resizers (TF vs OpenCV bilinear),
+# which moves the stub model's outputs by about 2e-6
+KEYPOINT_TOLERANCE = 1e-4
+# Largest allowed difference of any category score (0-100)
+SCORE_TOLERANCE = 2
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    stub = StubMoveNet()
+    signature = stub.__call__.get_concrete_function()
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([signature], stub)
+    model_path = tmp_path_factory.mktemp("tflite") / "model.tflite"
+    model_path.write_bytes(converter.convert())
+    return TFSavedModelBackend(signature, 256), TFLiteBackend(str(model_path))
+
+
+def test_tflite_keypoints_match_tf(backends, video_frames):
+    tf_backend, tflite_backend = backends
+    expected = tf_backend.infer_batch(video_frames)
+    actual = tflite_backend.infer_batch(video_frames)
+    assert actual.shape == expected.shape == (len(video_frames), 17, 3)
+    assert np.abs(actual - expected).max() <= KEYPOINT_TOLERANCE
+
+
+def test_tflite_scores_match_tf(app_module, backends, video_frames):
+    exercise = app_module.get_available_exercises()[0]
+    golden = app_module.get_golden_data(exercise)
+    scores = []
+    for backend in backends:
+        metrics, _ = app_module.keypoints_to_metrics(backend.infer_batch(video_frames))
+        scores.append(app_module.calculate_scores_v5(golden, app_module.metrics_to_dict(metrics), exercise))
+    for key, value in scores[0].items():
+        if isinstance(value, (int, float)) and key.endswith('Score'):
+            assert abs(scores[1][key] - value) <= SCORE_TOLERANCE, key
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        PoseBackend(256)
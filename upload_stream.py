@@ -0,0 +1,265 @@
+"""Streaming uploads: start decoding a video while it is still arriving.
+
+The web process writes the request body to a spool file as it is
+received, hashing it on the way. The analysis (possibly in another
+process) reads that growing file through a named pipe: a feeder thread
+copies new bytes into the pipe as they land, so OpenCV/FFmpeg decodes
+and MoveNet runs while the rest of the upload is still on the wire.
+
+Completion is signalled with a marker file next to the spool:
+`<spool>.complete` (holding the SHA-256 of the upload) or
+`<spool>.aborted`. This works across processes without extra IPC.
+
+Only containers that can be decoded front to back can be piped: MP4/MOV
+with the 'moov' index before the media data ("faststart"), WebM/MKV and
+MPEG-TS. Anything else has to be received completely and decoded from
+the seekable file, as before.
+
+Named pipes need `os.mkfifo` (POSIX). Elsewhere (Windows) the upload is
+still spooled to its temp file while it arrives, but decoding waits for
+the upload to finish and reads the complete file.
+
+This module only depends on the standard library.
+"""
+import errno
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+SNIFF_BYTES = 1 << 20
+COMPLETE_SUFFIX = '.complete'
+ABORTED_SUFFIX = '.aborted'
+# Named pipes are POSIX-only; without them uploads are decoded once complete
+PIPES_SUPPORTED = hasattr(os, 'mkfifo')
+
+
+class UploadAborted(Exception):
+    """Raised when an upload ends before all of its bytes arrived."""
+
+
+def streamable_container(head, sniff_bytes=SNIFF_BYTES):
+    """Return whether a video can be decoded from a pipe, given its first bytes.
+
+    True for faststart MP4/MOV, WebM/MKV and MPEG-TS; False for
+    everything else (e.g. MP4 with 'mdat' before 'moov'). None means
+    more bytes are needed to tell, until `sniff_bytes` have been seen.
+    """
+    head = bytes(head)
+    if head[:4] == b'\x1a\x45\xdf\xa3':  # EBML header: Matroska / WebM
+        return True
+    if len(head) > 188 and head[0] == 0x47 and head[188] == 0x47:  # MPEG-TS sync bytes
+        return True
+
+    # ISO base media (MP4/MOV): walk the top-level boxes
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box = struct.unpack('>I4s', head[offset:offset + 8])
+        if offset == 0 and box not in (b'ftyp', b'moov', b'mdat', b'free', b'skip', b'wide'):
+            return False
+        if box == b'moov':
+            return True
+        if box == b'mdat':
+            return False
+        if size == 1:
+            if offset + 16 > len(head):
+                break
+            size = struct.unpack('>Q', head[offset + 8:offset + 16])[0]
+        if size < 8:
+            return False  # size 0 (box runs to end of file) or corrupt
+        offset += size
+    return None if len(head) < sniff_bytes else False
+
+
+def upload_state(path):
+    """Return 'complete', 'aborted' or 'receiving' for a spool file."""
+    if os.path.exists(path + COMPLETE_SUFFIX):
+        return 'complete'
+    if os.path.exists(path + ABORTED_SUFFIX):
+        return 'aborted'
+    return 'receiving'
+
+
+def wait_for_upload(path, idle_timeout=60.0, poll_interval=0.05):
+    """Block until an upload is complete and return its SHA-256 hex digest.
+
+    Raises UploadAborted if it was aborted, or if the spool file stops
+    growing for `idle_timeout` seconds.
+    """
+    last_size, last_change = -1, time.monotonic()
+    while True:
+        state = upload_state(path)
+        if state == 'complete':
+            with open(path + COMPLETE_SUFFIX, 'r', encoding='ascii') as f:
+                return f.read().strip()
+        if state == 'aborted':
+            raise UploadAborted("Upload was interrupted.")
+        size = os.path.getsize(path) if os.path.exists(path) else -1
+        if size != last_size:
+            last_size, last_change = size, time.monotonic()
+        elif time.monotonic() - last_change > idle_timeout:
+            raise UploadAborted(f"Upload stalled for {idle_timeout:.0f}s.")
+        time.sleep(poll_interval)
+
+
+def discard_upload(path):
+    """Remove a spool file and its markers. Returns True if the file existed."""
+    existed = False
+    for name in (path, path + COMPLETE_SUFFIX, path + ABORTED_SUFFIX):
+        try:
+            os.remove(name)
+            existed = existed or name == path
+        except OSError:
+            pass
+    return existed
+
+
+class UploadSpool:
+    """Write side of a spooled upload: the bytes, their digest and the markers."""
+
+    def __init__(self, directory=None, suffix='.mp4', sniff_bytes=SNIFF_BYTES):
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=suffix)
+        self._file = os.fdopen(fd, 'wb')
+        self._digest = hashlib.sha256()
+        self._sniff_bytes = sniff_bytes
+        self.head = bytearray()
+        self.bytes_received = 0
+        self.digest = None
+
+    def write(self, chunk):
+        self._file.write(chunk)
+        # Flush every chunk so readers in other processes see it at once
+        self._file.flush()
+        self._digest.update(chunk)
+        self.bytes_received += len(chunk)
+        if len(self.head) < self._sniff_bytes:
+            self.head += chunk[:self._sniff_bytes - len(self.head)]
+
+    def streamable(self):
+        """streamable_container() of what has been received so far."""
+        return streamable_container(self.head, self._sniff_bytes)
+
+    def receive(self, stream, chunk_size=1 << 16, until_decided=False):
+        """Copy `stream` into the spool until EOF and mark it complete.
+
+        With `until_decided`, stop as soon as streamable() is known
+        instead (without marking anything) and return it. On a read
+        error the spool is marked aborted and the error re-raised.
+        """
+        try:
+            while True:
+                if until_decided:
+                    decided = self.streamable()
+                    if decided is not None:
+                        return decided
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                self.write(chunk)
+        except Exception:
+            self.abort()
+            raise
+        self.finish()
+        return False if until_decided else None
+
+    def finish(self):
+        """Mark the upload complete and record its digest."""
+        self._file.close()
+        self.digest = self._digest.hexdigest()
+        self._mark(COMPLETE_SUFFIX, self.digest)
+
+    def abort(self):
+        self._file.close()
+        self._mark(ABORTED_SUFFIX, '')
+
+    def _mark(self, suffix, content):
+        # The analysis may already have discarded the spool (e.g. job cancelled)
+        if not os.path.exists(self.path):
+            return
+        tmp_path = self.path + suffix + '.tmp'
+        with open(tmp_path, 'w', encoding='ascii') as f:
+            f.write(content)
+        os.replace(tmp_path, self.path + suffix)
+
+
+def _open_pipe_writer(pipe_path, stop_event, poll_interval):
+    """Open a FIFO for writing once a reader has opened it (None if stopped)."""
+    while not stop_event.is_set():
+        try:
+            fd = os.open(pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:  # ENXIO: no reader yet
+                raise
+            time.sleep(poll_interval)
+            continue
+        os.set_blocking(fd, True)
+        return os.fdopen(fd, 'wb')
+    return None
+
+
+@contextmanager
+def growing_file_pipe(path, idle_timeout=60.0, poll_interval=0.02, chunk_size=1 << 16):
+    """Yield a named pipe that replays a spool file as it grows.
+
+    A feeder thread copies the file into the pipe, waiting for new bytes
+    until the upload is marked complete, then closes the pipe (EOF for
+    the decoder). If the upload is aborted or stalls for `idle_timeout`
+    seconds, the pipe is closed early and UploadAborted is raised when
+    the block exits. A reader that stops early is not an error.
+
+    Without named pipes (PIPES_SUPPORTED is False), waits for the upload
+    to finish instead and yields the complete spool file itself; an
+    aborted or stalled upload raises UploadAborted before the block runs.
+    """
+    if not PIPES_SUPPORTED:
+        wait_for_upload(path, idle_timeout=idle_timeout)
+        yield path
+        return
+    pipe_dir = tempfile.mkdtemp(prefix='upload-pipe-')
+    pipe_path = os.path.join(pipe_dir, 'video' + os.path.splitext(path)[1])
+    os.mkfifo(pipe_path)
+    stop_event = threading.Event()
+    errors = []
+
+    def feed():
+        try:
+            out = _open_pipe_writer(pipe_path, stop_event, poll_interval)
+            if out is None:
+                return
+            with out, open(path, 'rb') as src:
+                last_data = time.monotonic()
+                while not stop_event.is_set():
+                    chunk = src.read(chunk_size)
+                    if chunk:
+                        out.write(chunk)
+                        last_data = time.monotonic()
+                        continue
+                    state = upload_state(path)
+                    if state == 'complete':
+                        # Anything written between the read and the marker
+                        shutil.copyfileobj(src, out)
+                        return
+                    if state == 'aborted':
+                        raise UploadAborted("Upload was interrupted.")
+                    if time.monotonic() - last_data > idle_timeout:
+                        raise UploadAborted(f"Upload stalled for {idle_timeout:.0f}s.")
+                    time.sleep(poll_interval)
+        except BrokenPipeError:
+            pass  # the decoder stopped reading
+        except Exception as e:
+            errors.append(e)
+
+    feeder = threading.Thread(target=feed, name="upload-pipe-feed", daemon=True)
+    feeder.start()
+    try:
+        yield pipe_path
+    finally:
+        stop_event.set()
+        feeder.join(timeout=5)
+        shutil.rmtree(pipe_dir, ignore_errors=True)
+    if errors:
+        raise errors[0]